@@ -0,0 +1,20 @@
+"""本工具自身数据（扫描索引、日志、清理日志等）的存放位置"""
+import os
+
+
+def get_app_data_dir():
+    """返回数据目录，不存在则创建
+
+    Windows 下为 %LOCALAPPDATA%\\CDriveCleaner，其他系统为
+    $XDG_DATA_HOME/cdrive-cleaner；可用环境变量 CDRIVE_CLEANER_HOME 覆盖。
+    """
+    path = os.getenv("CDRIVE_CLEANER_HOME")
+    if not path:
+        if os.name == 'nt':
+            base = os.getenv("LOCALAPPDATA") or os.path.expanduser("~")
+            path = os.path.join(base, "CDriveCleaner")
+        else:
+            base = os.getenv("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+            path = os.path.join(base, "cdrive-cleaner")
+    os.makedirs(path, exist_ok=True)
+    return path
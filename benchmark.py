@@ -0,0 +1,272 @@
+"""扫描/清理性能基准：生成合成垃圾目录树，分别测量扫描和删除
+
+    python benchmark.py --scale 1 --output bench.json
+    python benchmark.py --compare old.json new.json
+
+不依赖 Tk，可在普通 Linux 机器上运行。每个用例在独立子进程中执行，
+峰值内存（ru_maxrss）互不影响；装有 strace 时可加 --strace 统计系统调用次数。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from cleaner import clean_files, stream_clean
+from scan_index import ScanIndex
+from scanner import DEFAULT_SCAN_WORKERS, JunkScanner
+
+BENCH_VERSION = 1
+
+
+def _write(path, size):
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+
+
+def build_junk_tree(base, scale=1.0, seed=0):
+    """在 base 下生成形似 get_junk_paths() 各根目录的合成目录树，返回根目录列表
+
+    scale=1 时约 2 万个文件：
+      Chrome 缓存      Cache_Data 下的 f_xxxxxx 分片文件 + index 文件
+      Firefox 配置     Profiles/<profile>/cache2/entries 深层目录
+      Minidump         少量巨大的稀疏 dump 文件（不实际占用磁盘）
+      Temp             大量几十字节的小文件，部分在一层子目录中
+    """
+    rng = random.Random(seed)
+    n = lambda count: max(1, int(count * scale))
+    roots = []
+
+    chrome = os.path.join(base, "Google", "Chrome", "User Data", "Default", "Cache")
+    data = os.path.join(chrome, "Cache_Data")
+    os.makedirs(data)
+    for name in ("index", "data_0", "data_1", "data_2", "data_3"):
+        _write(os.path.join(data, name), rng.randint(8 * 1024, 256 * 1024))
+    for i in range(n(6000)):
+        _write(os.path.join(data, f"f_{i:06x}"), rng.randint(512, 64 * 1024))
+    roots.append(chrome)
+
+    profiles = os.path.join(base, "Mozilla", "Firefox", "Profiles")
+    for p in range(3):
+        entries = os.path.join(profiles, f"{rng.getrandbits(32):08x}.default-release", "cache2", "entries")
+        os.makedirs(entries)
+        os.makedirs(os.path.join(entries, "..", "doomed"))
+        for i in range(n(1500)):
+            _write(os.path.join(entries, f"{rng.getrandbits(80):020X}"), rng.randint(256, 32 * 1024))
+    roots.append(profiles)
+
+    minidump = os.path.join(base, "Windows", "Minidump")
+    os.makedirs(minidump)
+    for i in range(4):
+        with open(os.path.join(minidump, f"{i:06d}-01.dmp"), "wb") as f:
+            f.truncate(rng.randint(1, 4) * 1024**3)
+    roots.append(minidump)
+
+    temp = os.path.join(base, "AppData", "Local", "Temp")
+    os.makedirs(temp)
+    for i in range(n(6000)):
+        _write(os.path.join(temp, f"tmp{i:05d}.tmp"), rng.randint(0, 128))
+    for d in range(n(50)):
+        sub = os.path.join(temp, f"{{{rng.getrandbits(64):016x}}}")
+        os.makedirs(sub)
+        for i in range(40):
+            _write(os.path.join(sub, f"part{i}.dat"), rng.randint(0, 4096))
+    roots.append(temp)
+
+    return roots
+
+
+def _peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 返回字节，Linux 返回 KB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_case(case, roots, workdir):
+    """在当前进程中执行一个用例，返回测量结果"""
+    kind = case["kind"]
+    workers = case.get("workers", 1)
+    if kind == "scan":
+        start = time.perf_counter()
+        result = JunkScanner(roots, workers=workers, memory_budget=case.get("memory_budget")).scan()
+        seconds = time.perf_counter() - start
+        files, size = result.file_count, result.total_size
+    elif kind == "scan-index":
+        index = ScanIndex(os.path.join(workdir, "bench_index.db"))
+        JunkScanner(roots, workers=workers, index=index).scan()
+        # 让目录 mtime 脱离「太新不入索引」的窗口，再冷扫一次建立索引
+        old = time.time() - 3600
+        for root in roots:
+            for dirpath, _, _ in os.walk(root):
+                os.utime(dirpath, (old, old))
+        JunkScanner(roots, workers=workers, index=index).scan()
+        start = time.perf_counter()
+        result = JunkScanner(roots, workers=workers, index=index).scan()
+        seconds = time.perf_counter() - start
+        files, size = result.file_count, result.total_size
+        index.close()
+    elif kind == "clean":
+        result = JunkScanner(roots, workers=DEFAULT_SCAN_WORKERS).scan()
+        start = time.perf_counter()
+        stats = clean_files(result, workers=workers)
+        seconds = time.perf_counter() - start
+        files, size = stats.cleaned_count, stats.cleaned_size
+    elif kind == "stream-clean":
+        start = time.perf_counter()
+        _, stats = stream_clean(roots, workers=workers, scan_workers=DEFAULT_SCAN_WORKERS)
+        seconds = time.perf_counter() - start
+        files, size = stats.cleaned_count, stats.cleaned_size
+    else:
+        raise ValueError(f"未知用例类型: {kind}")
+
+    return {
+        "seconds": round(seconds, 4),
+        "files": files,
+        "bytes": size,
+        "files_per_sec": round(files / seconds, 1) if seconds else None,
+        "bytes_per_sec": round(size / seconds, 1) if seconds else None,
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+
+
+def default_cases(parallel_workers):
+    return [
+        {"name": "scan-serial", "kind": "scan", "workers": 1},
+        {"name": "scan-parallel", "kind": "scan", "workers": parallel_workers},
+        # 极小的内存预算，结果几乎全部溢出到磁盘，对比峰值内存
+        {"name": "scan-spill", "kind": "scan", "workers": 1, "memory_budget": 64 * 1024},
+        {"name": "scan-index-warm", "kind": "scan-index", "workers": 1},
+        {"name": "clean-serial", "kind": "clean", "workers": 1},
+        {"name": "clean-parallel", "kind": "clean", "workers": parallel_workers},
+        {"name": "stream-clean", "kind": "stream-clean", "workers": 4},
+    ]
+
+
+def _parse_strace_summary(path):
+    """解析 strace -c 的汇总输出，返回 {系统调用: 次数}"""
+    counts = {}
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            parts = line.split()
+            # % time  seconds  usecs/call  calls  [errors]  syscall
+            if len(parts) >= 5 and parts[0].replace(".", "", 1).isdigit() and parts[3].isdigit():
+                counts[parts[-1]] = int(parts[3])
+    return counts
+
+
+def run_case_in_subprocess(case, roots, workdir, use_strace=False):
+    cmd = [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(case),
+           "--roots", *roots, "--workdir", workdir]
+    strace_out = None
+    if use_strace:
+        strace_out = os.path.join(workdir, f"strace_{case['name']}.txt")
+        cmd = ["strace", "-f", "-c", "-o", strace_out] + cmd
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, check=True, universal_newlines=True)
+    measured = json.loads(proc.stdout.strip().splitlines()[-1])
+    if strace_out:
+        # 包含解释器启动的系统调用，版本间对比时这部分基本不变
+        syscalls = _parse_strace_summary(strace_out)
+        measured["syscalls"] = sum(syscalls.values())
+        measured["syscalls_by_name"] = syscalls
+    return measured
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmark(scale=1.0, seed=0, workers=DEFAULT_SCAN_WORKERS, use_strace=False, only=None):
+    cases = [case for case in default_cases(workers) if not only or case["name"] in only]
+    report = {
+        "version": BENCH_VERSION,
+        "revision": _git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": f"{platform.system()} {platform.release()}",
+        "cpu_count": os.cpu_count(),
+        "scale": scale,
+        "seed": seed,
+        "cases": [],
+    }
+    for case in cases:
+        # 每个用例使用全新的目录树（删除类用例会把树删掉）
+        workdir = tempfile.mkdtemp(prefix="cdrive_bench_")
+        try:
+            roots = build_junk_tree(os.path.join(workdir, "tree"), scale, seed)
+            measured = run_case_in_subprocess(case, roots, workdir, use_strace)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        entry = dict(case)
+        entry.update(measured)
+        report["cases"].append(entry)
+        print(f"{case['name']:<18} {measured['seconds']:>9.3f}s {measured['files_per_sec'] or 0:>12.0f} files/s "
+              f"{(measured['bytes_per_sec'] or 0) / 1024**2:>10.1f} MB/s  RSS {measured['peak_rss_kb']} KB",
+              file=sys.stderr)
+    return report
+
+
+def compare(old_path, new_path):
+    """对比两次基准结果，按用例输出耗时比"""
+    with open(old_path, encoding="utf-8") as f:
+        old = {case["name"]: case for case in json.load(f)["cases"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["cases"]
+    print(f"{'case':<18} {'old(s)':>9} {'new(s)':>9} {'speedup':>8} {'RSS old':>9} {'RSS new':>9}")
+    for case in new:
+        before = old.get(case["name"])
+        if before is None:
+            continue
+        speedup = before["seconds"] / case["seconds"] if case["seconds"] else float("inf")
+        print(f"{case['name']:<18} {before['seconds']:>9.3f} {case['seconds']:>9.3f} {speedup:>7.2f}x "
+              f"{before.get('peak_rss_kb') or 0:>9} {case.get('peak_rss_kb') or 0:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="C盘清理工具扫描/清理性能基准")
+    parser.add_argument("--scale", type=float, default=1.0, help="目录树规模倍数（1 约为 2 万个文件）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=DEFAULT_SCAN_WORKERS, help="并行用例的线程数")
+    parser.add_argument("--cases", nargs="+", metavar="NAME", help="只运行指定用例")
+    parser.add_argument("--strace", action="store_true", help="用 strace -c 统计每个用例的系统调用次数")
+    parser.add_argument("--output", metavar="FILE", help="结果 JSON 写入文件（默认输出到标准输出）")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="对比两次结果")
+    # 子进程内部使用
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--roots", nargs="+", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case), args.roots, args.workdir)))
+        return 0
+
+    report = run_benchmark(args.scale, args.seed, args.workers, args.strace, args.cases)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""浏览器缓存发现：读取各浏览器的配置文件列表，只返回确切的缓存目录
+
+Chromium 系（Chrome、Edge、Brave、Chromium）从用户数据目录下的
+Local State 读取 profile.info_cache 中的全部配置文件，Firefox 读取
+profiles.ini。每个配置文件只取缓存目录（Cache_Data、Code Cache、GPUCache、
+cache2），书签、密码、扩展等配置数据所在的目录不会被枚举。
+
+各函数都以目录为参数，可以用伪造的配置文件目录树测试。
+"""
+import configparser
+import json
+import os
+import sys
+
+# Chromium 配置文件中的缓存目录；新版 Chrome 的磁盘缓存在 Cache\Cache_Data 中
+CHROMIUM_CACHE_DIRS = ("Cache", "Code Cache", "GPUCache")
+
+FIREFOX_CACHE_DIR = "cache2"
+
+
+def _safe_name(name):
+    """配置文件中的目录名只能是单个路径分量，防止 .. 之类的名字指向别处"""
+    return bool(name) and name not in (os.curdir, os.pardir) and os.path.basename(name) == name \
+        and "/" not in name and "\\" not in name
+
+
+def chromium_profiles(user_data_dir):
+    """Chromium 用户数据目录中的配置文件目录名
+
+    以 Local State 为准；没有或无法解析时按目录名猜测（Default、Profile N）。
+    """
+    try:
+        with open(os.path.join(user_data_dir, "Local State"), encoding="utf-8") as f:
+            info_cache = json.load(f)["profile"]["info_cache"]
+        names = [name for name in info_cache if _safe_name(name)]
+    except (OSError, ValueError, KeyError, TypeError):
+        names = None
+    if names is None:
+        try:
+            names = sorted(name for name in os.listdir(user_data_dir)
+                           if name == "Default" or name.startswith("Profile "))
+        except OSError:
+            names = []
+    return [name for name in names if os.path.isdir(os.path.join(user_data_dir, name))]
+
+
+def chromium_cache_dirs(user_data_dir, cache_base=None):
+    """Chromium 系浏览器全部配置文件的缓存目录
+
+    cache_base 为磁盘缓存单独存放的位置（Linux 上的 ~/.cache/google-chrome），
+    其中按配置文件名分目录。
+    """
+    dirs = []
+    for name in chromium_profiles(user_data_dir):
+        bases = [os.path.join(user_data_dir, name)]
+        if cache_base:
+            bases.append(os.path.join(cache_base, name))
+        for base in bases:
+            for cache in CHROMIUM_CACHE_DIRS:
+                path = os.path.join(base, cache)
+                data = os.path.join(path, "Cache_Data")
+                if os.path.isdir(data):
+                    dirs.append(data)
+                elif os.path.isdir(path):
+                    dirs.append(path)
+    return dirs
+
+
+def firefox_profiles(config_dir):
+    """profiles.ini 中全部配置文件的 (相对路径或 None, 绝对路径)"""
+    parser = configparser.RawConfigParser()
+    try:
+        with open(os.path.join(config_dir, "profiles.ini"), encoding="utf-8") as f:
+            parser.read_file(f)
+    except (OSError, UnicodeDecodeError, configparser.Error):
+        return []
+    profiles = []
+    for section in parser.sections():
+        if not section.startswith("Profile") or not parser.has_option(section, "Path"):
+            continue
+        path = parser.get(section, "Path")
+        if parser.get(section, "IsRelative", fallback="1").strip() == "1":
+            parts = path.split("/")
+            if not all(_safe_name(part) for part in parts):
+                continue
+            rel = os.path.join(*parts)
+            profiles.append((rel, os.path.join(config_dir, rel)))
+        else:
+            profiles.append((None, path))
+    return profiles
+
+
+def firefox_cache_dirs(config_dir, local_dir=None):
+    """Firefox 全部配置文件的 cache2 目录
+
+    相对路径的配置文件，缓存位于 local_dir 下同样的相对路径中（Windows 的
+    %LOCALAPPDATA%\\Mozilla\\Firefox、Linux 的 ~/.cache/mozilla/firefox）。
+    """
+    dirs = []
+    for rel, profile in firefox_profiles(config_dir):
+        bases = [profile]
+        if rel is not None and local_dir:
+            bases.insert(0, os.path.join(local_dir, rel))
+        for base in bases:
+            path = os.path.join(base, FIREFOX_CACHE_DIR)
+            if os.path.isdir(path) and path not in dirs:
+                dirs.append(path)
+    return dirs
+
+
+def _default_locations():
+    """当前系统上各浏览器的 ([(用户数据目录, 磁盘缓存目录)], [(Firefox 配置目录, 本地目录)])"""
+    if os.name == 'nt':
+        local = os.getenv("LOCALAPPDATA") or os.path.expanduser(r"~\AppData\Local")
+        roaming = os.getenv("APPDATA") or os.path.expanduser(r"~\AppData\Roaming")
+        chromium = [(os.path.join(local, sub, "User Data"), None) for sub in (
+            r"Google\Chrome", r"Microsoft\Edge", r"BraveSoftware\Brave-Browser", "Chromium")]
+        firefox = [(os.path.join(roaming, r"Mozilla\Firefox"), os.path.join(local, r"Mozilla\Firefox"))]
+        return chromium, firefox
+    if sys.platform.startswith("linux"):
+        home = os.path.expanduser("~")
+        config = os.getenv("XDG_CONFIG_HOME") or os.path.join(home, ".config")
+        cache = os.getenv("XDG_CACHE_HOME") or os.path.join(home, ".cache")
+        chromium = [(os.path.join(config, sub), os.path.join(cache, sub)) for sub in (
+            "google-chrome", "microsoft-edge", os.path.join("BraveSoftware", "Brave-Browser"), "chromium")]
+        firefox = [(os.path.join(home, ".mozilla", "firefox"), os.path.join(cache, "mozilla", "firefox"))]
+        return chromium, firefox
+    return [], []
+
+
+def browser_cache_dirs(chromium=None, firefox=None):
+    """全部浏览器、全部配置文件的缓存目录；参数默认为当前系统上的位置"""
+    if chromium is None and firefox is None:
+        chromium, firefox = _default_locations()
+    dirs = []
+    for user_data_dir, cache_base in chromium or ():
+        dirs.extend(chromium_cache_dirs(user_data_dir, cache_base))
+    for config_dir, local_dir in firefox or ():
+        dirs.extend(firefox_cache_dirs(config_dir, local_dir))
+    return dirs
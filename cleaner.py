@@ -0,0 +1,660 @@
+"""清理引擎：删除扫描到的文件，不依赖 Tk"""
+import os
+import queue
+import stat
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+
+from rules import RESERVED_DIRNAME, RuleSet
+from scanner import JunkScanner, is_link_dir
+
+# 流式清理的默认删除线程数和队列长度
+DEFAULT_STREAM_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 1024
+
+# 普通清理的默认删除线程数（1 为逐个顺序删除）
+DEFAULT_CLEAN_WORKERS = 4
+
+# 并行删除时每个任务包含的文件数
+DELETE_BATCH_SIZE = 256
+
+
+# 支持基于目录文件描述符的相对路径操作时（Linux 等），整棵删除目录树时
+# 每个文件只需一次 unlinkat，不必每次从根解析完整路径
+_USE_DIR_FD = (os.open in os.supports_dir_fd and os.unlink in os.supports_dir_fd
+               and os.rmdir in os.supports_dir_fd and os.scandir in os.supports_fd)
+_DIR_OPEN_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0)
+
+
+def _unlink(name, dir_fd=None):
+    """删除一个文件，Windows 上遇到权限错误时解除只读并重试
+
+    返回 True 表示已删除，False 表示删除失败（被占用等），None 表示文件已不存在。
+    POSIX 上能否删除只取决于父目录的权限，不重试：chmod 会跟随符号链接，
+    在 /tmp 这类共享目录中会改动链接指向的任意文件。
+    """
+    try:
+        os.unlink(name, dir_fd=dir_fd)
+        return True
+    except FileNotFoundError:
+        return None
+    except PermissionError:
+        if os.name != 'nt':
+            return False
+    except OSError:
+        return False
+    try:
+        if stat.S_ISLNK(os.lstat(name, dir_fd=dir_fd).st_mode):
+            return False  # 不解除符号链接目标的只读
+        os.chmod(name, stat.S_IREAD | stat.S_IWRITE, dir_fd=dir_fd)  # 解除只读
+        os.unlink(name, dir_fd=dir_fd)
+        return True
+    except OSError:
+        # 文件被占用就跳过
+        return False
+
+
+def stop_wuauserv():
+    """停止 Windows Update 服务，释放 SoftwareDistribution 中被占用的文件（非 Windows 上什么也不做）"""
+    if os.name != 'nt':
+        return
+    os.system("net stop wuauserv 2>nul")
+    time.sleep(1)
+
+
+def start_wuauserv():
+    if os.name != 'nt':
+        return
+    os.system("net start wuauserv 2>nul")
+
+
+def empty_recycle_bin():
+    """清空回收站，返回是否成功（非 Windows 上总是 False）"""
+    try:
+        import ctypes
+        # SHEmptyRecycleBinW = 0 (清空所有盘符)，返回 HRESULT，负数为失败
+        return ctypes.windll.shell32.SHEmptyRecycleBinW(None, None, 0) >= 0
+    except:
+        return False
+
+
+def safe_remove(path):
+    """安全删除文件
+
+    返回 True 表示已删除，False 表示删除失败（被占用等），None 表示文件已不存在。
+    """
+    return _unlink(path)
+
+
+class CleanStats:
+    """清理统计：成功数、释放字节数、失败数"""
+
+    def __init__(self):
+        self.cleaned_count = 0
+        self.cleaned_size = 0
+        self.failed_count = 0
+        self.started_at = time.time()
+        self.first_freed_at = None  # 第一个文件删除成功的时间
+        self.finished_at = None
+
+    def add_cleaned(self, size, count=1):
+        if self.first_freed_at is None:
+            self.first_freed_at = time.time()
+        self.cleaned_count += count
+        self.cleaned_size += size
+
+    def merge(self, other):
+        self.cleaned_count += other.cleaned_count
+        self.cleaned_size += other.cleaned_size
+        self.failed_count += other.failed_count
+        if other.first_freed_at is not None:
+            if self.first_freed_at is None or other.first_freed_at < self.first_freed_at:
+                self.first_freed_at = other.first_freed_at
+
+
+class CleanCancelled(Exception):
+    """清理被用户取消，stats 为取消前已完成部分的 CleanStats"""
+
+    def __init__(self):
+        super().__init__("清理已取消")
+        self.stats = None
+
+
+class CleanControl:
+    """清理的暂停/继续/取消开关：界面线程调用，删除线程在每个文件前检查"""
+
+    def __init__(self):
+        self._running = threading.Event()
+        self._running.set()
+        self._cancelled = threading.Event()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def wait_while_paused(self):
+        """暂停时阻塞到继续或取消，不抛出异常（扫描线程中使用）"""
+        if not self._running.is_set():
+            self._running.wait()
+
+    def checkpoint(self):
+        """暂停时阻塞到继续；已取消时抛出 CleanCancelled"""
+        self.wait_while_paused()
+        if self._cancelled.is_set():
+            raise CleanCancelled()
+
+
+class RateLimiter:
+    """删除限速：每秒操作数和/或每秒字节数上限，多个删除线程共享
+
+    按虚拟时间排队：每次删除预约一段时间片（1/ops 秒，或 size/bps 秒），
+    时间片还没轮到就先睡眠。空闲时最多积攒 1 秒的额度。
+    """
+
+    def __init__(self, max_ops_per_sec=None, max_bytes_per_sec=None):
+        self.max_ops_per_sec = max_ops_per_sec
+        self.max_bytes_per_sec = max_bytes_per_sec
+        self._lock = threading.Lock()
+        self._ops_at = 0.0
+        self._bytes_at = 0.0
+
+    @classmethod
+    def create(cls, max_ops_per_sec=None, max_bytes_per_sec=None):
+        """两个上限都没有时返回 None，调用方据此跳过限速"""
+        if not max_ops_per_sec and not max_bytes_per_sec:
+            return None
+        return cls(max_ops_per_sec, max_bytes_per_sec)
+
+    def acquire(self, nbytes=0):
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.max_ops_per_sec:
+                start = max(self._ops_at, now - 1.0)
+                self._ops_at = start + 1.0 / self.max_ops_per_sec
+                wait = max(wait, start - now)
+            if self.max_bytes_per_sec and nbytes:
+                start = max(self._bytes_at, now - 1.0)
+                self._bytes_at = start + nbytes / self.max_bytes_per_sec
+                wait = max(wait, start - now)
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _batches(items, size):
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+class _Deleter:
+    """删除调度：固定数量的删除线程按批次执行 unlink，统一限速和计数
+
+    每批在一个线程内用本地 CleanStats 计数，结束时加锁并入总数，
+    多线程下 cleaned_count/cleaned_size/failed_count 与顺序删除一致。
+    传入 metrics（metrics.Metrics）时逐个文件计时，按根目录记录删除延迟；
+    传入 control（CleanControl）时每个文件前检查暂停/取消。
+    """
+
+    def __init__(self, workers=1, limiter=None, on_cleaned=None, metrics=None, control=None):
+        self.workers = max(1, workers)
+        self.limiter = limiter
+        self.on_cleaned = on_cleaned
+        self.metrics = metrics
+        self.control = control
+        self.stats = CleanStats()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(self.workers) if self.workers > 1 else None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def unlink_many(self, items, dir_fd=None, on_batch=None):
+        """删除 items 中的 (删除目标, 完整路径, 扫描时大小或 None)
+
+        大小为 None 的（无法取得大小）照删但不计数。
+        dir_fd 不为 None 时删除目标是相对该目录的文件名，调用方需保证
+        本方法返回前不关闭 dir_fd。返回是否没有删除失败的文件。
+        on_batch(count) 按 items 的顺序在每批完成后回调（之前的批次也都已完成），
+        供清理日志记录进度。
+        """
+        if self._executor is None:
+            ok = True
+            for batch in _batches(items, DELETE_BATCH_SIZE):
+                ok = self._unlink_batch(batch, dir_fd) and ok
+                if on_batch is not None:
+                    on_batch(len(batch))
+            return ok
+        ok = True
+        pending = deque()
+
+        def finish_oldest():
+            done = pending.popleft()
+            result = done.result()
+            if on_batch is not None:
+                on_batch(done.batch_size)
+            return result
+
+        try:
+            for batch in _batches(items, DELETE_BATCH_SIZE):
+                future = self._executor.submit(self._unlink_batch, batch, dir_fd)
+                future.batch_size = len(batch)
+                pending.append(future)
+                # 限制在途批次数，遍历大量文件时不把全部任务堆进内存
+                if len(pending) >= 2 * self.workers:
+                    ok = finish_oldest() and ok
+            while pending:
+                ok = finish_oldest() and ok
+        except BaseException:
+            # 取消或出错：撤销还没开始的批次，等正在执行的批次结束后再返回
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            raise
+        return ok
+
+    def drain(self, files):
+        """逐个删除队列 files 中的 (路径, 大小)，直到取到 None
+
+        供流式清理的删除线程使用：文件一到就删除，本线程的计数和指标
+        在结束时才加锁并入一次，不必每个文件都付出一个批次的开销。
+        """
+        local = CleanStats()
+        batch = self.metrics.new_batch() if self.metrics is not None else None
+        try:
+            while True:
+                item = files.get()
+                if item is None:
+                    return
+                path, size = item
+                self._unlink_items(((path, path, size),), None, local, batch)
+        finally:
+            self._merge(local, batch)
+
+    def _merge(self, local, batch):
+        with self._lock:
+            self.stats.merge(local)
+        if batch is not None:
+            self.metrics.merge_batch(batch)
+
+    def _unlink_batch(self, items, dir_fd):
+        local = CleanStats()
+        batch = self.metrics.new_batch() if self.metrics is not None else None
+        try:
+            return self._unlink_items(items, dir_fd, local, batch)
+        finally:
+            # 中途取消时已删除的文件也要计入
+            self._merge(local, batch)
+
+    def _unlink_items(self, items, dir_fd, local, batch):
+        control = self.control
+        ok = True
+        for target, path, size in items:
+            if control is not None:
+                control.checkpoint()
+            if self.limiter is not None:
+                self.limiter.acquire(size or 0)
+            if batch is None:
+                removed = _unlink(target, dir_fd)
+            else:
+                started = time.perf_counter()
+                removed = _unlink(target, dir_fd)
+                batch.record(path, size, started, time.perf_counter(), removed)
+            if removed:
+                if size is not None:
+                    local.add_cleaned(size)
+                    if self.on_cleaned:
+                        self.on_cleaned(path, size)
+            elif removed is False:
+                ok = False
+                if size is not None:
+                    local.failed_count += 1
+        return ok
+
+
+def stream_clean(roots, workers=DEFAULT_STREAM_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 scan_workers=1, on_cleaned=None, max_ops_per_sec=None, max_bytes_per_sec=None,
+                 metrics=None, rules=None):
+    """边扫描边删除（无人值守批处理用）
+
+    扫描线程作为生产者，把找到的文件放进长度为 queue_size 的有界队列，
+    workers 个删除线程并行消费。队列满时扫描会等待删除，不保留完整的
+    文件列表，内存占用与目录树大小无关。文件刚被枚举到，删除前不再
+    os.path.exists 检查。两个 max_* 参数为可选的删除限速。
+
+    on_cleaned(path, size) 在删除线程中对每个删除成功的文件回调。
+    metrics 为可选的 metrics.Metrics，记录扫描计数和删除延迟；
+    rules 为扫描使用的 rules.RuleSet（默认内置规则）。
+    返回 (ScanResult, CleanStats)。
+    """
+    files = queue.Queue(maxsize=queue_size)
+    limiter = RateLimiter.create(max_ops_per_sec, max_bytes_per_sec)
+    deleter = _Deleter(1, limiter, on_cleaned, metrics)
+    if metrics is not None:
+        metrics.register_roots(roots)
+
+    threads = [threading.Thread(target=deleter.drain, args=(files,), daemon=True) for _ in range(max(1, workers))]
+    for t in threads:
+        t.start()
+
+    scanner = JunkScanner(roots, workers=scan_workers, keep_files=False, rules=rules,
+                          on_file=lambda path, size: files.put((path, size)))
+    try:
+        result = scanner.scan()
+    finally:
+        for _ in threads:
+            files.put(None)
+        for t in threads:
+            t.join()
+
+    if metrics is not None:
+        metrics.record_scan(result)
+    stats = deleter.stats
+    stats.finished_at = time.time()
+    return result, stats
+
+
+class RuleFilter:
+    """没有扫描结果可对照时（溢出的结果、从清理日志继续），按根目录的规则
+    重新判断条目：与扫描相同的深度限制、包含/排除、年龄和大小条件
+    """
+
+    def __init__(self, rules, roots, now=None):
+        self.rules = rules
+        self.roots = set(roots)
+        self.now = time.time() if now is None else now
+        self._bound = {}  # 根目录 -> 规则
+        self._dirs = {}  # 目录 -> (规则, 根目录, 深度)，不在任何根目录下时为 None
+
+    def _locate(self, dirpath):
+        located = self._dirs.get(dirpath, ())
+        if located != ():
+            return located
+        path = dirpath
+        depth = 0
+        while path not in self.roots:
+            parent = os.path.dirname(path)
+            if parent == path:
+                self._dirs[dirpath] = None
+                return None
+            path = parent
+            depth += 1
+        rule = self._bound.get(path)
+        if rule is None:
+            rule = self._bound[path] = self.rules.for_root(path, self.now)
+        located = self._dirs[dirpath] = (rule, path, depth)
+        return located
+
+    def accepts(self, dirpath, name, size, mtime):
+        located = self._locate(dirpath)
+        if located is None:
+            return False
+        rule, root, depth = located
+        if depth > rule.max_depth:
+            return False
+        return not rule.filters or rule.accepts_file(rule.rel_prefix(root, dirpath), name, size, mtime)
+
+    def descends(self, dirpath, name):
+        located = self._locate(dirpath)
+        if located is None:
+            return False
+        rule, root, depth = located
+        if depth >= rule.max_depth or name == RESERVED_DIRNAME:
+            return False
+        return not (rule.filters and rule.excludes_dir(rule.rel_prefix(root, dirpath), name))
+
+
+class _TreeRemover:
+    """删除目录树中扫描到的文件，并删除因此变空的目录
+
+    expected(dirpath) 返回该目录中扫描到的 {文件名: 大小}，扫描没有枚举
+    过的目录返回 None：只删除扫描到的文件、只进入扫描过的子目录，扫描
+    之后新出现的文件和目录原样保留（其所在目录也就不会被删除）。
+    expected 为 None 时没有扫描结果可对照，由 rule_filter（RuleFilter）
+    按规则重新判断每个条目，按删除时的实际大小计数；两者都为 None 时
+    删除全部条目（隔离区中的批次）。目录由调用线程依次遍历，每个目录中的
+    文件交给 deleter 并行删除。指向目录的链接只删除链接本身，不进入。
+    """
+
+    def __init__(self, expected, deleter, rule_filter=None):
+        self.expected = expected
+        self.rule_filter = rule_filter
+        self.deleter = deleter
+
+    def remove(self, path, keep_root=False):
+        if self.expected is not None and self.expected(path) is None:
+            return
+        if _USE_DIR_FD:
+            try:
+                fd = os.open(path, _DIR_OPEN_FLAGS)
+            except OSError:
+                return
+            try:
+                empty = self._remove_entries(path, fd)
+            finally:
+                os.close(fd)
+        else:
+            empty = self._remove_entries(path, None)
+        if empty and not keep_root:
+            try:
+                os.rmdir(path)
+            except OSError:
+                pass
+
+    def _remove_entries(self, dirpath, dir_fd):
+        """删除目录中应删除的条目，返回目录是否已清空"""
+        if self.deleter.control is not None:
+            self.deleter.control.checkpoint()
+        expected = self.expected
+        rule_filter = self.rule_filter
+        known = expected(dirpath) if expected is not None else None
+        try:
+            with os.scandir(dirpath if dir_fd is None else dir_fd) as it:
+                entries = list(it)
+        except OSError:
+            return False
+
+        files = []
+        subdirs = []
+        kept = False  # 是否有保留下来的条目
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False) and not is_link_dir(entry)
+            except OSError:
+                is_dir = False
+            target = entry.name if dir_fd is not None else entry.path
+            path = os.path.join(dirpath, entry.name)
+            if is_dir:
+                if expected is not None:
+                    descend = expected(path) is not None
+                else:
+                    descend = rule_filter is None or rule_filter.descends(dirpath, entry.name)
+                if descend:
+                    subdirs.append((entry.name, target))
+                else:
+                    kept = True
+                continue
+            if known is not None:
+                if entry.name not in known:
+                    kept = True
+                    continue
+                size = known[entry.name]
+            else:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    st = None
+                if rule_filter is not None and (
+                        st is None or not rule_filter.accepts(dirpath, entry.name, st.st_size, st.st_mtime)):
+                    kept = True
+                    continue
+                size = st.st_size if st is not None else None
+            files.append((target, path, size))
+
+        empty = self.deleter.unlink_many(files, dir_fd) and not kept
+
+        for name, target in subdirs:
+            child = os.path.join(dirpath, name)
+            if dir_fd is not None:
+                try:
+                    child_fd = os.open(name, _DIR_OPEN_FLAGS, dir_fd=dir_fd)
+                except OSError:
+                    empty = False
+                    continue
+                try:
+                    child_empty = self._remove_entries(child, child_fd)
+                finally:
+                    os.close(child_fd)
+            else:
+                child_empty = self._remove_entries(child, None)
+            if child_empty:
+                try:
+                    os.rmdir(target, dir_fd=dir_fd)
+                    continue
+                except OSError:
+                    pass
+            empty = False
+        return empty
+
+
+def remove_tree(path, keep_root=False, expected=None, rule_filter=None, on_cleaned=None,
+                workers=1, max_ops_per_sec=None, max_bytes_per_sec=None, metrics=None, control=None):
+    """删除目录树（keep_root=True 时保留根目录本身），返回 CleanStats
+
+    expected、rule_filter 见 _TreeRemover，都不给出时删除全部条目，按实际大小计数。
+    """
+    deleter = _Deleter(workers, RateLimiter.create(max_ops_per_sec, max_bytes_per_sec), on_cleaned, metrics,
+                       control)
+    try:
+        _TreeRemover(expected, deleter, rule_filter).remove(path, keep_root)
+    finally:
+        deleter.close()
+    deleter.stats.finished_at = time.time()
+    return deleter.stats
+
+
+def remove_files(files, on_cleaned=None, workers=DEFAULT_CLEAN_WORKERS,
+                 max_ops_per_sec=None, max_bytes_per_sec=None, metrics=None, control=None):
+    """逐个删除 files 中的 (路径, 大小)（如重复文件的多余副本），返回 CleanStats"""
+    deleter = _Deleter(workers, RateLimiter.create(max_ops_per_sec, max_bytes_per_sec), on_cleaned, metrics,
+                       control)
+    try:
+        deleter.unlink_many((path, path, size) for path, size in files)
+    finally:
+        deleter.close()
+    deleter.stats.finished_at = time.time()
+    return deleter.stats
+
+
+def _store_expected(store):
+    """按目录查扫描到的 {文件名: 大小}，扫描没有枚举过的目录返回 None"""
+    starts, order = store.group_by_dir()
+
+    def expected(dirpath):
+        dir_id = store.dir_of(dirpath)
+        if dir_id is None:
+            return None
+        return {store.name(i): store.sizes[i] for i in order[starts[dir_id]:starts[dir_id + 1]]}
+    return expected
+
+
+def subtree_limits(result, rules=None):
+    """整棵删除 result 中的子树时对照的 (expected, rule_filter)，见 _TreeRemover
+
+    溢出的结果只能顺序读取，没有按目录的文件表，改为按 rules（默认内置规则）重新判断。
+    """
+    if not result.files.spilled:
+        return _store_expected(result.files), None
+    return None, RuleFilter(rules if rules is not None else RuleSet.default(), result.roots)
+
+
+def _run_plan(deleter, subtrees, expected, files, journal=None, rule_filter=None):
+    """先整棵删除子树，再逐个删除 files 中的 (路径, 大小)，返回 CleanStats
+
+    journal 不为 None 时从其记录的进度继续，并在每棵子树、每批文件完成后记录进度。
+    """
+    remover = _TreeRemover(expected, deleter, rule_filter)
+    start = journal.done_subtrees if journal is not None else 0
+    try:
+        for i in range(start, len(subtrees)):
+            dirpath, keep_root = subtrees[i]
+            remover.remove(dirpath, keep_root=keep_root)
+            if journal is not None:
+                journal.subtree_done(i + 1)
+        deleter.unlink_many(((path, path, size) for path, size in files),
+                            on_batch=journal.files_done if journal is not None else None)
+    except CleanCancelled as e:
+        e.stats = deleter.stats
+        raise
+    finally:
+        deleter.close()
+        deleter.stats.finished_at = time.time()
+    return deleter.stats
+
+
+def clean_files(result, on_cleaned=None, workers=DEFAULT_CLEAN_WORKERS,
+                max_ops_per_sec=None, max_bytes_per_sec=None, metrics=None, control=None, journal=None,
+                rules=None):
+    """删除一次扫描（ScanResult）找到的全部文件，返回 CleanStats
+
+    完整扫描过的子树（如整个 Chrome Cache 目录）按目录遍历删除，每个文件
+    一次 unlink，并顺带删除变空的目录；扫描之后新出现的条目不删除（溢出
+    的结果按 rules 重新判断，见 subtree_limits）。其余文件逐个 safe_remove。
+    workers 为并行删除线程数，max_ops_per_sec / max_bytes_per_sec 为
+    可选的限速上限（维护窗口内全速，生产负载下温和清理）。
+    on_cleaned(path, size) 在删除线程中对每个删除成功的文件回调。
+    metrics 为可选的 metrics.Metrics，按根目录记录删除延迟。
+
+    control（CleanControl）可暂停/取消清理，取消时抛出 CleanCancelled。
+    journal（journal.CleanJournal）不为 None 时先写入清理计划再开始删除，
+    并按批次记录进度，中断后可用 resume_clean 继续。
+    """
+    subtrees = result.complete_subtrees()
+    files = result.loose_files()
+    expected, rule_filter = subtree_limits(result, rules)
+    if journal is not None:
+        journal.write_plan(result.roots, subtrees, files)
+        files = journal.remaining_files()
+
+    deleter = _Deleter(workers, RateLimiter.create(max_ops_per_sec, max_bytes_per_sec), on_cleaned, metrics,
+                       control)
+    if metrics is not None:
+        metrics.register_roots(result.roots)
+    return _run_plan(deleter, subtrees, expected, files, journal, rule_filter)
+
+
+def resume_clean(journal, on_cleaned=None, workers=DEFAULT_CLEAN_WORKERS,
+                 max_ops_per_sec=None, max_bytes_per_sec=None, metrics=None, control=None, rules=None):
+    """按清理日志继续上次中断的清理，不重新扫描，返回本次的 CleanStats
+
+    剩余的子树没有扫描结果可对照，其中的条目按 rules（默认内置规则）
+    重新判断，按删除时的实际大小计数；日志中的文件直接删除，已不存在的
+    不计数，不再逐个 os.path.exists 检查。
+    """
+    deleter = _Deleter(workers, RateLimiter.create(max_ops_per_sec, max_bytes_per_sec), on_cleaned, metrics,
+                       control)
+    if metrics is not None:
+        metrics.register_roots(journal.plan["roots"])
+    rule_filter = RuleFilter(rules if rules is not None else RuleSet.default(), journal.plan["roots"])
+    return _run_plan(deleter, journal.subtrees, None, journal.remaining_files(), journal, rule_filter)
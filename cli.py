@@ -0,0 +1,517 @@
+"""无界面批处理模式：python main.py --headless scan|clean ...
+
+供计划任务、批量运维使用，不加载 Tk，与界面共用 get_junk_paths、
+扫描引擎和 safe_remove，结束时输出 JSON 报告。
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+from cleaner import (DEFAULT_CLEAN_WORKERS, DEFAULT_STREAM_WORKERS, clean_files, empty_recycle_bin,
+                     remove_files, resume_clean, start_wuauserv, stop_wuauserv, stream_clean)
+from daemon import DEFAULT_INTERVAL_HOURS, DEFAULT_MAX_CPU, DEFAULT_MAX_DISK_BUSY, CleanerDaemon
+from duplicates import find_duplicates, get_duplicate_roots
+from estimator import estimate_roots
+from file_store import DEFAULT_MEMORY_BUDGET
+from filelog import open_file_log
+from journal import CleanJournal
+from metrics import Metrics
+from priority import lower_thread_priority
+from quarantine import DEFAULT_RETENTION_HOURS, Quarantine
+from roots import get_junk_paths
+from rules import RuleError, load_rules
+from scan_index import ScanIndex
+from scanner import DEFAULT_SCAN_WORKERS, JunkScanner
+from snapshot import SnapshotError, aggregate_snapshots, diff_snapshots, find_snapshots, snapshot_name, write_snapshot
+from watcher import JunkWatcher
+
+REPORT_VERSION = 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py --headless",
+        description="C盘清理工具无界面模式：扫描/清理垃圾文件并输出 JSON 报告"
+    )
+    parser.add_argument("command", choices=["scan", "estimate", "clean", "duplicates", "quarantine", "daemon",
+                                            "watch", "diff"],
+                        help="scan 只扫描；estimate 抽样估计可清理空间（几百毫秒，给出 95%% 置信区间）；"
+                             "clean 扫描后删除；duplicates 查找下载文件夹中的重复文件；"
+                             "quarantine 列出/恢复/释放隔离区；daemon 以最低优先级定期清理，系统繁忙时暂停；"
+                             "watch 基线枚举后按文件变更通知实时输出垃圾总量；"
+                             "diff 比较扫描快照，输出各根目录和目录的增长")
+    parser.add_argument("--roots", nargs="+", metavar="DIR",
+                        help="自定义扫描根目录（默认使用 get_junk_paths()）")
+    parser.add_argument("--dry-run", action="store_true", help="clean 时只统计，不删除任何文件")
+    parser.add_argument("--resume", action="store_true",
+                        help="clean 时如有上次中断（Ctrl+C、关机等）的清理，按清理日志继续，不重新扫描")
+    parser.add_argument("--quarantine", action="store_true",
+                        help="clean 时把垃圾移入同卷的隔离区（保留期内可恢复），不立即删除")
+    parser.add_argument("--retention-hours", type=float, default=DEFAULT_RETENTION_HOURS, metavar="H",
+                        help="隔离区保留时间，过期后才会被 --purge 删除")
+    parser.add_argument("--restore", metavar="BATCH", help="quarantine 时把指定批次移回原位置")
+    parser.add_argument("--purge", action="store_true",
+                        help="quarantine 时以最低 I/O 优先级删除已过保留期的批次")
+    parser.add_argument("--purge-all", action="store_true", help="quarantine 时删除全部批次")
+    parser.add_argument("--remove-duplicates", action="store_true",
+                        help="duplicates 时删除每组中除保留文件外的副本")
+    parser.add_argument("--report", metavar="FILE", help="JSON 报告写入文件（默认输出到标准输出）")
+    parser.add_argument("--scan-workers", type=int,
+                        help=f"并行扫描线程数（默认 {DEFAULT_SCAN_WORKERS}，daemon 默认 1，尽量不影响前台）")
+    parser.add_argument("--clean-workers", type=int, default=DEFAULT_CLEAN_WORKERS, help="并行删除线程数")
+    parser.add_argument("--max-ops", type=float, metavar="N", help="每秒最多删除的文件数")
+    parser.add_argument("--max-bytes", type=float, metavar="N", help="每秒最多删除的字节数")
+    parser.add_argument("--stream", action="store_true",
+                        help="clean 时边扫描边删除，内存占用与文件数量无关")
+    parser.add_argument("--no-index", action="store_true", help="不使用增量扫描索引")
+    parser.add_argument("--memory-budget", type=int, default=DEFAULT_MEMORY_BUDGET // (1024 * 1024), metavar="MB",
+                        help="扫描结果的内存预算，超过后溢出到数据目录中的临时文件")
+    parser.add_argument("--rules", metavar="FILE",
+                        help="清理规则文件（JSON/TOML，默认为数据目录中的 rules.json 或内置规则）")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="按根目录导出扫描/删除指标（.json 为 JSON，其余为 Prometheus 文本格式）")
+    parser.add_argument("--once", action="store_true", help="daemon 只执行一轮（供计划任务调用）")
+    parser.add_argument("--interval-hours", type=float, default=DEFAULT_INTERVAL_HOURS, metavar="H",
+                        help="daemon 两轮清理之间的间隔")
+    parser.add_argument("--max-cpu", type=float, default=DEFAULT_MAX_CPU, metavar="PCT",
+                        help="daemon 在 CPU 使用率超过该值时暂停")
+    parser.add_argument("--max-disk-busy", type=float, default=DEFAULT_MAX_DISK_BUSY, metavar="PCT",
+                        help="daemon 在磁盘繁忙时间比例超过该值时暂停")
+    parser.add_argument("--max-load", type=float, metavar="N",
+                        help="daemon 在每个 CPU 的 1 分钟平均负载超过该值时暂停（类 Unix）")
+    parser.add_argument("--watch-seconds", type=float, metavar="S",
+                        help="watch 运行的秒数（默认直到 Ctrl+C）")
+    parser.add_argument("--snapshot", metavar="FILE|DIR",
+                        help="scan/clean 后把扫描结果保存为快照文件；给出目录时按主机名和时间自动命名")
+    parser.add_argument("--snapshots", nargs="+", metavar="FILE|DIR",
+                        help="diff 比较的快照：两个文件时比较旧、新两次快照；"
+                             "更多文件或目录时按主机分组，汇总每台主机最早与最新快照的增长")
+    parser.add_argument("--top", type=int, default=20, metavar="N", help="diff 报告中列出增长最多的目录数")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不在标准错误输出进度日志")
+    return parser
+
+
+class HeadlessRun:
+    """一次无界面运行：日志输出到标准错误和日志文件，结果汇总为报告"""
+
+    def __init__(self, args, rules):
+        self.args = args
+        self.rules = rules
+        self.file_log = open_file_log()
+        self.started_at = time.time()
+        # 只有需要导出时才对删除逐个计时
+        self.metrics = Metrics() if args.metrics else None
+
+    def log(self, message):
+        if not self.args.quiet:
+            print(message, file=sys.stderr, flush=True)
+        if self.file_log is not None:
+            self.file_log.info(message)
+
+    def get_roots(self):
+        if self.args.roots:
+            return [os.path.abspath(root) for root in self.args.roots if os.path.exists(root)]
+        if self.args.command == "duplicates":
+            downloads = os.path.join(os.path.expanduser("~"), "Downloads")
+            return get_duplicate_roots(get_junk_paths()) or ([downloads] if os.path.isdir(downloads) else [])
+        return get_junk_paths()
+
+    def run(self):
+        args = self.args
+        if args.command == "diff":
+            return self.run_diff()
+        roots = self.get_roots()
+        if args.command == "duplicates":
+            return self.run_duplicates(roots)
+        if args.command == "quarantine":
+            return self.run_quarantine()
+        if args.command == "daemon":
+            return self.run_daemon()
+        if args.command == "estimate":
+            return self.run_estimate(roots)
+        if args.command == "watch":
+            return self.run_watch(roots)
+        self.log(f"[扫描] 发现 {len(roots)} 个垃圾目录")
+
+        # 与界面的「立即清理」一致：只有清理默认垃圾目录时才停 Windows Update 服务、清空回收站
+        manage_system = os.name == 'nt' and not args.roots
+        deleting = args.command == "clean" and not args.dry_run
+        if deleting:
+            pending = self.recover_pending()
+            if pending is not None:
+                if args.resume:
+                    return self.run_resume(pending, manage_system)
+                pending.close()  # 新的清理会覆盖上次的日志
+
+        journal = None
+        if deleting and not args.stream:
+            try:
+                journal = CleanJournal.create()
+            except OSError:
+                self.log("[警告] 无法写入清理日志，中断后需要重新扫描")
+
+        def work():
+            if deleting and args.stream:
+                return stream_clean(
+                    roots,
+                    workers=max(args.clean_workers, DEFAULT_STREAM_WORKERS),
+                    scan_workers=args.scan_workers,
+                    max_ops_per_sec=args.max_ops,
+                    max_bytes_per_sec=args.max_bytes,
+                    metrics=self.metrics,
+                    rules=self.rules
+                )
+            result = self.scan(roots)
+            if not deleting:
+                return result, None
+            if args.quarantine:
+                self.log("[隔离] 移入隔离区...")
+                stats, batch = Quarantine(retention_hours=args.retention_hours).stage(result, rules=self.rules)
+                self.log(f"[隔离] 批次 {batch.id}，{args.retention_hours:g} 小时内可用 "
+                         f"quarantine --restore {batch.id} 恢复")
+                return result, stats
+            self.log("[清理] 开始清理临时文件...")
+            return result, clean_files(
+                result,
+                workers=args.clean_workers,
+                max_ops_per_sec=args.max_ops,
+                max_bytes_per_sec=args.max_bytes,
+                metrics=self.metrics,
+                journal=journal,
+                rules=self.rules
+            )
+
+        if deleting:
+            result, clean_stats = self.run_clean(work, journal, manage_system)
+        else:
+            result, clean_stats = work()
+
+        if deleting and manage_system and not args.quarantine and empty_recycle_bin():
+            self.log("[核弹] 已清空回收站")
+
+        self.log(f"[完成] 发现 {result.file_count} 个临时文件，总大小 {result.total_size/(1024**3):.2f}GB")
+        if clean_stats is not None:
+            self.log(f"[统计] 成功清理 {clean_stats.cleaned_count} 个文件，"
+                     f"释放空间 {clean_stats.cleaned_size/(1024**3):.2f}GB，失败 {clean_stats.failed_count} 个")
+        report = self.build_report(result, clean_stats)
+        if args.snapshot:
+            report["snapshot"] = self.save_snapshot(result)
+        return report
+
+    def save_snapshot(self, result):
+        path = self.args.snapshot
+        if os.path.isdir(path):
+            path = os.path.join(path, snapshot_name())
+        try:
+            write_snapshot(result, path)
+        except OSError as e:
+            self.log(f"[警告] 无法写入快照 {path}: {e}")
+            return None
+        self.log(f"[快照] 已保存到 {path}")
+        return path
+
+    def run_diff(self):
+        args = self.args
+        paths = find_snapshots(args.snapshots)
+        report = {"version": REPORT_VERSION, "command": args.command, "diff": None, "fleet": None}
+        if len(paths) == 2 and not any(os.path.isdir(p) for p in args.snapshots):
+            self.log(f"[比较] {paths[0]} → {paths[1]}")
+            try:
+                diff = diff_snapshots(paths[0], paths[1], top_n=args.top)
+            except (OSError, SnapshotError) as e:
+                self.log(f"[错误] {e}")
+                report["error"] = str(e)
+                return report
+            report["diff"] = diff.to_dict()
+            self.log(f"[完成] 垃圾增长 {diff.growth/(1024**3):+.2f}GB，"
+                     f"新增 {diff.added_dirs} 个目录，消失 {diff.removed_dirs} 个目录")
+            return report
+        self.log(f"[汇总] {len(paths)} 个快照")
+        fleet = aggregate_snapshots(paths, top_n=args.top)
+        report["fleet"] = fleet
+        self.log(f"[完成] {len(fleet['compared'])} 台主机，垃圾增长 {fleet['growth_bytes']/(1024**3):+.2f}GB")
+        return report
+
+    def run_clean(self, work, journal, manage_system):
+        """在停止 Windows Update 服务期间执行 work()
+
+        服务状态写入清理日志；work() 正常结束时删除日志，被 Ctrl+C 中断时
+        保留日志，供下次 --resume 继续。
+        """
+        if manage_system:
+            self.log("[准备] 正在停止Windows Update服务...")
+            stop_wuauserv()
+            if journal is not None:
+                journal.service_state(True)
+        finished = False
+        try:
+            value = work()
+            finished = True
+            return value
+        finally:
+            if manage_system:
+                self.log("[结束] 正在启动Windows Update服务...")
+                start_wuauserv()
+                if journal is not None:
+                    journal.service_state(False)
+            if journal is not None:
+                if finished:
+                    journal.finish()
+                else:
+                    journal.close()
+
+    def recover_pending(self):
+        """上次清理被中断且 Windows Update 服务未恢复时先启动服务，返回可继续的清理日志"""
+        journal = CleanJournal.open_pending()
+        if journal is None:
+            return None
+        if journal.service_stopped:
+            self.log("[恢复] 上次清理中断时 Windows Update 服务未恢复，正在启动...")
+            start_wuauserv()
+            journal.service_state(False)
+        if journal.resumable:
+            return journal
+        journal.finish()
+        return None
+
+    def run_resume(self, journal, manage_system):
+        """按清理日志继续上次中断的清理"""
+        plan = journal.plan
+        self.log(f"[清理] 从上次中断处继续：剩余 {len(plan['subtrees']) - journal.done_subtrees} 个目录、"
+                 f"{plan['file_count'] - journal.done_files} 个文件")
+        clean_stats = self.run_clean(
+            lambda: resume_clean(
+                journal,
+                workers=self.args.clean_workers,
+                max_ops_per_sec=self.args.max_ops,
+                max_bytes_per_sec=self.args.max_bytes,
+                metrics=self.metrics,
+                rules=self.rules
+            ),
+            journal, manage_system
+        )
+        if manage_system and not journal.recycle_bin_kept and empty_recycle_bin():
+            self.log("[核弹] 已清空回收站")
+        self.log(f"[统计] 成功清理 {clean_stats.cleaned_count} 个文件，"
+                 f"释放空间 {clean_stats.cleaned_size/(1024**3):.2f}GB，失败 {clean_stats.failed_count} 个")
+        report = self.build_report(None, clean_stats)
+        report["resumed"] = True
+        return report
+
+    def run_estimate(self, roots):
+        """抽样估计，不完整遍历"""
+        total, per_root = estimate_roots(roots, rules=self.rules)
+        low, high = total.size_interval()
+        self.log(f"[估计] 约 {round(total.files)} 个临时文件，{total.size/(1024**3):.2f}GB"
+                 f"（95% 区间 {low/(1024**3):.2f}-{high/(1024**3):.2f}GB），枚举 {total.dirs_listed} 个目录")
+        report = {"version": REPORT_VERSION, "command": self.args.command, "estimate": total.to_dict()}
+        report["roots"] = [dict(root=root, **estimate.to_dict()) for root, estimate in per_root.items()]
+        return report
+
+    def run_watch(self, roots):
+        """实时统计：总量每次变化输出一行日志，结束时报告各根目录的当前总量"""
+        def on_change(files, size):
+            self.log(f"[监视] {files} 个临时文件，{size/(1024**3):.3f}GB")
+
+        watcher = JunkWatcher(roots, rules=self.rules, on_change=on_change)
+        try:
+            watcher.start()
+        except OSError as e:
+            self.log(f"[监视] 无法开启：{e}")
+            return {"version": REPORT_VERSION, "command": self.args.command, "watch": None}
+        started = time.monotonic()
+        try:
+            watcher.ready.wait()
+            if watcher.unwatched:
+                self.log(f"[监视] {watcher.unwatched} 个目录超出系统监视数量上限，其中的变化不会反映")
+            seconds = self.args.watch_seconds
+            while seconds is None or time.monotonic() - started < seconds:
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            self.log("[监视] 已停止")
+        finally:
+            watcher.stop()
+        files, size = watcher.totals()
+        return {
+            "version": REPORT_VERSION,
+            "command": self.args.command,
+            "watch": {"files": files, "bytes": size, "events": watcher.events_handled,
+                      "unwatched": watcher.unwatched, "seconds": round(time.monotonic() - started, 3)},
+            "roots": [{"path": root, "files": f, "bytes": b} for root, (f, b) in watcher.root_totals().items()],
+        }
+
+    def run_daemon(self):
+        """守护模式：每轮重新取根目录，Ctrl+C 结束（进行中的清理进度留在清理日志中）"""
+        args = self.args
+        index = None if args.no_index else ScanIndex.open_default()
+        daemon = CleanerDaemon(
+            self.get_roots,
+            self.log,
+            rules=self.rules,
+            interval_hours=args.interval_hours,
+            thresholds=(args.max_cpu, args.max_disk_busy, args.max_load),
+            scan_workers=args.scan_workers,
+            index=index,
+            clean_workers=args.clean_workers,
+            max_ops_per_sec=args.max_ops,
+            max_bytes_per_sec=args.max_bytes,
+            memory_budget=args.memory_budget * 1024 * 1024,
+            metrics=self.metrics
+        )
+        try:
+            daemon.run(once=args.once)
+        except KeyboardInterrupt:
+            daemon.stop()
+            self.log("[守护] 已停止")
+        finally:
+            if index is not None:
+                index.close()
+        return {"version": REPORT_VERSION, "command": args.command, "passes": daemon.passes}
+
+    def run_quarantine(self):
+        """列出隔离区；--restore 恢复一批，--purge/--purge-all 以最低优先级删除"""
+        args = self.args
+        quarantine = Quarantine(retention_hours=args.retention_hours)
+        report = {"version": REPORT_VERSION, "command": args.command, "restored": None, "purge": None}
+        if args.restore:
+            batch = quarantine.get(args.restore)
+            if batch is None:
+                self.log(f"[隔离] 没有批次 {args.restore}")
+            else:
+                restored, failed = quarantine.restore(batch)
+                self.log(f"[隔离] 已恢复 {restored} 项，失败 {len(failed)} 项")
+                report["restored"] = {"batch": batch.id, "items": restored, "failed": failed}
+        if args.purge or args.purge_all:
+            lower_thread_priority()
+            stats = quarantine.purge(expired_only=not args.purge_all,
+                                     max_ops_per_sec=args.max_ops, max_bytes_per_sec=args.max_bytes)
+            self.log(f"[隔离] 已释放 {stats.cleaned_count} 个文件，{stats.cleaned_size/(1024**3):.2f}GB")
+            report["purge"] = {"cleaned_files": stats.cleaned_count, "cleaned_bytes": stats.cleaned_size,
+                               "failed_files": stats.failed_count}
+        report["batches"] = [batch.to_dict() for batch in quarantine.batches()]
+        return report
+
+    def run_duplicates(self, roots):
+        """查找重复文件，--remove-duplicates 时删除多余副本（--dry-run 时仍只统计）"""
+        self.log(f"[查重] 扫描 {len(roots)} 个目录")
+        result = self.scan(roots)
+        duplicates = find_duplicates(result.files, workers=self.args.clean_workers)
+        self.log(f"[查重] {len(duplicates.groups)} 组重复文件，可释放 {duplicates.wasted/(1024**2):.1f}MB；"
+                 f"完整哈希 {duplicates.full_hashed_bytes/(1024**2):.1f}MB / {duplicates.total_bytes/(1024**2):.1f}MB")
+        clean_stats = None
+        if self.args.remove_duplicates and not self.args.dry_run:
+            clean_stats = remove_files(
+                duplicates.removable_files(),
+                workers=self.args.clean_workers,
+                max_ops_per_sec=self.args.max_ops,
+                max_bytes_per_sec=self.args.max_bytes,
+                metrics=self.metrics
+            )
+            self.log(f"[统计] 删除 {clean_stats.cleaned_count} 个重复副本，"
+                     f"释放空间 {clean_stats.cleaned_size/(1024**3):.2f}GB，失败 {clean_stats.failed_count} 个")
+        report = self.build_report(result, clean_stats)
+        report["duplicates"] = duplicates.to_dict()
+        return report
+
+    def scan(self, roots):
+        index = None if self.args.no_index else ScanIndex.open_default()
+        scanner = JunkScanner(
+            roots,
+            on_root=lambda root: self.log(f"[扫描] 正在扫描: {root}"),
+            workers=self.args.scan_workers,
+            index=index,
+            rules=self.rules,
+            memory_budget=self.args.memory_budget * 1024 * 1024
+        )
+        try:
+            result = scanner.scan()
+        finally:
+            if index is not None:
+                index.close()
+        if self.metrics is not None:
+            self.metrics.record_scan(result)
+        return result
+
+    def build_report(self, result, clean_stats):
+        """result 为 None 时（从清理日志继续）没有扫描部分"""
+        finished_at = time.time()
+        report = {
+            "version": REPORT_VERSION,
+            "command": self.args.command,
+            "dry_run": self.args.dry_run,
+            "host": platform.node(),
+            "platform": f"{platform.system()} {platform.release()}",
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "duration_seconds": round(finished_at - self.started_at, 3),
+            "scan": None,
+            "roots": [],
+            "insights": None,
+            "clean": None,
+        }
+        if result is not None:
+            report["scan"] = {
+                "files": result.file_count,
+                "bytes": result.total_size,
+                "dirs": result.dir_count,
+                "cached_dirs": result.cached_dir_count,
+                "error_count": len(result.errors),
+                "errors": result.errors[:100],
+                "seconds": round(result.finished_at - result.started_at, 3),
+            }
+            report["roots"] = [stats.to_dict() for stats in result.root_stats.values()]
+            report["insights"] = result.insights.to_dict()
+        if clean_stats is not None:
+            report["clean"] = {
+                "cleaned_files": clean_stats.cleaned_count,
+                "cleaned_bytes": clean_stats.cleaned_size,
+                "failed_files": clean_stats.failed_count,
+                "seconds": round(clean_stats.finished_at - clean_stats.started_at, 3),
+                "first_freed_seconds": (
+                    round(clean_stats.first_freed_at - clean_stats.started_at, 3)
+                    if clean_stats.first_freed_at is not None else None
+                ),
+            }
+        return report
+
+
+def write_report(report, path=None):
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def main(argv=None):
+    """无界面入口，返回进程退出码"""
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = build_parser()
+    args = parser.parse_args([arg for arg in argv if arg != "--headless"])
+    if args.quarantine and args.stream:
+        parser.error("--quarantine 不能与 --stream 同时使用")
+    if args.snapshot and args.stream:
+        parser.error("--snapshot 不能与 --stream 同时使用（边扫描边删除不保留文件列表）")
+    if args.command == "diff" and not args.snapshots:
+        parser.error("diff 需要用 --snapshots 指定快照文件或目录")
+    if args.scan_workers is None:
+        args.scan_workers = 1 if args.command == "daemon" else DEFAULT_SCAN_WORKERS
+    try:
+        rules = load_rules(args.rules)
+    except RuleError as e:
+        parser.error(str(e))
+    run = HeadlessRun(args, rules)
+    try:
+        report = run.run()
+    except KeyboardInterrupt:
+        run.log("[取消] 已中断，清理进度已保存，可用 clean --resume 继续")
+        return 130
+    write_report(report, args.report)
+    if run.metrics is not None:
+        run.metrics.export(args.metrics)
+    return 0
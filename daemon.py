@@ -0,0 +1,228 @@
+"""后台清理守护进程：以最低优先级定期扫描和清理，系统繁忙时暂停
+
+与界面和无界面模式共用扫描引擎、clean_files 和清理日志。负载监视
+线程定期采样 CPU 使用率、磁盘繁忙度和平均负载，任一项超过阈值就
+暂停扫描和删除，连续几次低于阈值后从暂停处继续。进程被结束时清理
+日志保留进度，下次启动先按日志继续。
+
+守护进程不停止 Windows Update 服务、不清空回收站：这些操作会影响
+机器上正在运行的其他工作，只在用户主动清理时进行。
+"""
+import threading
+import time
+
+from cleaner import CleanCancelled, CleanControl, clean_files, resume_clean, start_wuauserv
+from journal import CleanJournal
+from priority import lower_process_priority
+from scanner import JunkScanner
+from sysload import LoadMonitor
+
+# 两次清理之间的默认间隔（小时）
+DEFAULT_INTERVAL_HOURS = 6
+
+# 默认暂停阈值（百分比）；平均负载阈值为每个 CPU 的 1 分钟负载
+DEFAULT_MAX_CPU = 60
+DEFAULT_MAX_DISK_BUSY = 40
+
+# 负载采样间隔（秒）
+SAMPLE_SECONDS = 2
+
+# 暂停后需要连续这么多次采样低于阈值才继续，避免在阈值附近频繁切换
+RESUME_SAMPLES = 3
+
+# 扫描时每隔这么多个文件检查一次暂停
+SCAN_CHECK_INTERVAL = 200
+
+
+class LoadThrottle:
+    """负载超过阈值时暂停 control，恢复平静后继续
+
+    阈值为 None 的项不检查。on_change(paused, reason) 在监视线程中回调。
+    """
+
+    def __init__(self, control, max_cpu=DEFAULT_MAX_CPU, max_disk_busy=DEFAULT_MAX_DISK_BUSY, max_load=None,
+                 interval=SAMPLE_SECONDS, on_change=None, monitor=None):
+        self.control = control
+        self.max_cpu = max_cpu
+        self.max_disk_busy = max_disk_busy
+        self.max_load = max_load
+        self.interval = interval
+        self.on_change = on_change
+        self.monitor = monitor or LoadMonitor()
+        self.paused_seconds = 0.0
+        self.pause_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def busy_reason(self, sample):
+        """超过阈值的项，都没超过返回 None"""
+        if self.max_cpu is not None and sample.cpu is not None and sample.cpu > self.max_cpu:
+            return f"CPU {sample.cpu:.0f}%"
+        if self.max_disk_busy is not None and sample.disk_busy is not None and sample.disk_busy > self.max_disk_busy:
+            return f"磁盘繁忙 {sample.disk_busy:.0f}%"
+        if self.max_load is not None and sample.load is not None and sample.load > self.max_load:
+            return f"负载 {sample.load:.2f}"
+        return None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.control.paused:
+            self.control.resume()
+
+    def _run(self):
+        calm = 0
+        paused_at = None
+        while not self._stop.wait(self.interval):
+            reason = self.busy_reason(self.monitor.sample())
+            if reason is not None:
+                calm = 0
+                if paused_at is None:
+                    paused_at = time.monotonic()
+                    self.pause_count += 1
+                    self.control.pause()
+                    if self.on_change:
+                        self.on_change(True, reason)
+            elif paused_at is not None:
+                calm += 1
+                if calm >= RESUME_SAMPLES:
+                    self.paused_seconds += time.monotonic() - paused_at
+                    paused_at = None
+                    self.control.resume()
+                    if self.on_change:
+                        self.on_change(False, None)
+        if paused_at is not None:
+            self.paused_seconds += time.monotonic() - paused_at
+
+
+class CleanerDaemon:
+    """get_roots() 返回每轮要清理的根目录，log(message) 输出日志
+
+    其余参数与 clean_files 相同；thresholds 为 LoadThrottle 的
+    (max_cpu, max_disk_busy, max_load)。
+    """
+
+    def __init__(self, get_roots, log, rules=None, interval_hours=DEFAULT_INTERVAL_HOURS,
+                 thresholds=(DEFAULT_MAX_CPU, DEFAULT_MAX_DISK_BUSY, None), scan_workers=1, index=None,
+                 clean_workers=1, max_ops_per_sec=None, max_bytes_per_sec=None, memory_budget=None,
+                 metrics=None):
+        self.get_roots = get_roots
+        self.log = log
+        self.rules = rules
+        self.interval_hours = interval_hours
+        self.thresholds = thresholds
+        self.scan_workers = scan_workers
+        self.index = index
+        self.clean_workers = clean_workers
+        self.max_ops_per_sec = max_ops_per_sec
+        self.max_bytes_per_sec = max_bytes_per_sec
+        self.memory_budget = memory_budget
+        self.metrics = metrics
+        self.passes = []  # 每轮的摘要
+        self._stop = threading.Event()
+        self._control = None
+
+    def stop(self):
+        """结束守护进程；正在进行的清理被取消，进度留在清理日志中"""
+        self._stop.set()
+        control = self._control
+        if control is not None:
+            control.cancel()
+
+    def _on_throttle(self, paused, reason):
+        if paused:
+            self.log(f"[守护] 系统繁忙（{reason}），暂停清理")
+        else:
+            self.log("[守护] 负载已恢复，继续清理")
+
+    def run_once(self):
+        """执行一轮：有未完成的清理日志时先继续，否则扫描后清理；返回本轮摘要"""
+        control = CleanControl()
+        self._control = control
+        max_cpu, max_disk_busy, max_load = self.thresholds
+        throttle = LoadThrottle(control, max_cpu, max_disk_busy, max_load, on_change=self._on_throttle)
+        started_at = time.time()
+        summary = {"started_at": started_at, "resumed": False, "scanned_files": None, "cancelled": False}
+        stats = None
+        journal = None
+        throttle.start()
+        try:
+            journal = CleanJournal.open_pending()
+            if journal is not None and journal.service_stopped:
+                # 界面清理被中断时留下的停止状态
+                self.log("[守护] 上次清理中断时 Windows Update 服务未恢复，正在启动...")
+                start_wuauserv()
+                journal.service_state(False)
+            if journal is not None and not journal.resumable:
+                journal.finish()
+                journal = None
+            if journal is not None:
+                summary["resumed"] = True
+                self.log("[守护] 按清理日志继续上次中断的清理")
+                stats = resume_clean(journal, workers=self.clean_workers, max_ops_per_sec=self.max_ops_per_sec,
+                                     max_bytes_per_sec=self.max_bytes_per_sec, metrics=self.metrics,
+                                     control=control, rules=self.rules)
+            else:
+                roots = self.get_roots()
+                scanner = JunkScanner(
+                    roots,
+                    # 暂停时扫描线程也停下，取消时扫描照常结束，由随后的清理抛出取消
+                    on_progress=lambda result: control.wait_while_paused(),
+                    progress_interval=SCAN_CHECK_INTERVAL,
+                    workers=self.scan_workers,
+                    index=self.index,
+                    rules=self.rules,
+                    memory_budget=self.memory_budget
+                )
+                result = scanner.scan()
+                if self.metrics is not None:
+                    self.metrics.record_scan(result)
+                summary["scanned_files"] = result.file_count
+                self.log(f"[守护] 发现 {result.file_count} 个临时文件，{result.total_size/(1024**3):.2f}GB")
+                try:
+                    journal = CleanJournal.create()
+                except OSError:
+                    journal = None
+                stats = clean_files(result, workers=self.clean_workers, max_ops_per_sec=self.max_ops_per_sec,
+                                    max_bytes_per_sec=self.max_bytes_per_sec, metrics=self.metrics,
+                                    control=control, journal=journal, rules=self.rules)
+            if journal is not None:
+                journal.finish()
+        except CleanCancelled as e:
+            stats = e.stats
+            summary["cancelled"] = True
+            if journal is not None:
+                journal.close()
+        finally:
+            throttle.stop()
+            self._control = None
+
+        summary.update({
+            "seconds": round(time.time() - started_at, 3),
+            "paused_seconds": round(throttle.paused_seconds, 3),
+            "pauses": throttle.pause_count,
+            "cleaned_files": stats.cleaned_count if stats is not None else 0,
+            "cleaned_bytes": stats.cleaned_size if stats is not None else 0,
+            "failed_files": stats.failed_count if stats is not None else 0,
+        })
+        self.passes.append(summary)
+        self.log(f"[守护] 本轮清理 {summary['cleaned_files']} 个文件，释放 {summary['cleaned_bytes']/(1024**3):.2f}GB，"
+                 f"因负载暂停 {summary['pauses']} 次共 {summary['paused_seconds']:.0f} 秒")
+        return summary
+
+    def run(self, once=False):
+        """降低进程优先级后循环执行，直到 stop()；once=True 时只执行一轮（供计划任务调用）"""
+        if lower_process_priority():
+            self.log("[守护] 已切换到最低 CPU/I/O 优先级")
+        while not self._stop.is_set():
+            self.run_once()
+            if once:
+                break
+            self.log(f"[守护] {self.interval_hours:g} 小时后进行下一轮")
+            self._stop.wait(self.interval_hours * 3600)
+        return self.passes
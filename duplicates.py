@@ -0,0 +1,218 @@
+"""重复文件查找：按大小分组 → 首尾 64KB 部分哈希 → 完整哈希，逐级缩小候选
+
+大小不同的文件不可能相同，部分哈希又能排除绝大多数大小碰巧相同的文件，
+只有首尾都相同的文件才读完整内容。完整哈希量大时放到进程池中并行计算。
+"""
+import hashlib
+import os
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# 部分哈希读取文件开头和结尾各这么多字节
+PARTIAL_SIZE = 64 * 1024
+
+# 完整哈希的读取块大小
+READ_SIZE = 1024 * 1024
+
+# 待完整哈希的总字节数超过该值才启动进程池，否则在线程中计算
+PROCESS_POOL_MIN_BYTES = 64 * 1024 * 1024
+
+# 下载重复时浏览器/系统生成的文件名后缀：setup (1).exe、报告 - 副本.docx、file(2).zip
+_COPY_NAME = re.compile(r"( ?\(\d+\)| - 副本( ?\(\d+\))?| - Copy( ?\(\d+\))?|\(copy\))$", re.IGNORECASE)
+
+
+def _hasher():
+    return hashlib.blake2b(digest_size=20)
+
+
+def partial_hash(path, size):
+    """文件开头和结尾各 PARTIAL_SIZE 字节的哈希；不大于 2*PARTIAL_SIZE 的文件即为完整哈希"""
+    h = _hasher()
+    with open(path, "rb") as f:
+        h.update(f.read(PARTIAL_SIZE))
+        if size > PARTIAL_SIZE:
+            f.seek(max(PARTIAL_SIZE, size - PARTIAL_SIZE))
+            h.update(f.read(PARTIAL_SIZE))
+    return h.digest()
+
+
+def full_hash(path):
+    """完整内容的哈希（进程池中执行，需为模块级函数）；读取失败返回 None"""
+    h = _hasher()
+    buf = bytearray(READ_SIZE)
+    view = memoryview(buf)
+    try:
+        with open(path, "rb", buffering=0) as f:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                h.update(view[:n])
+    except OSError:
+        return None
+    return h.digest()
+
+
+def _safe_partial_hash(item):
+    path, size = item
+    try:
+        return partial_hash(path, size)
+    except OSError:
+        return None
+
+
+def _partial_key(item):
+    """第二级分组的键 (大小, 部分哈希)；读取失败返回 None，该文件不参与分组"""
+    digest = _safe_partial_hash(item)
+    if digest is None:
+        return None
+    return item[1], digest
+
+
+class DuplicateGroup:
+    """内容相同的一组文件，keep 为建议保留的那一个"""
+
+    def __init__(self, size, digest, paths):
+        self.size = size
+        self.digest = digest
+        self.paths = paths
+        self.keep = choose_keeper(paths)
+
+    @property
+    def removable(self):
+        return [path for path in self.paths if path != self.keep]
+
+    @property
+    def wasted(self):
+        """删除多余副本后可释放的字节数"""
+        return self.size * (len(self.paths) - 1)
+
+
+class DuplicateReport:
+    """查找结果和各阶段的工作量"""
+
+    def __init__(self):
+        self.groups = []
+        self.files = 0  # 参与比较的文件数
+        self.total_bytes = 0
+        self.partial_hashed_files = 0
+        self.partial_hashed_bytes = 0
+        self.full_hashed_files = 0
+        self.full_hashed_bytes = 0
+
+    @property
+    def wasted(self):
+        return sum(group.wasted for group in self.groups)
+
+    def removable_files(self):
+        """[(路径, 大小)]：每组除保留文件外的副本"""
+        return [(path, group.size) for group in self.groups for path in group.removable]
+
+    def to_dict(self):
+        return {
+            "files": self.files,
+            "bytes": self.total_bytes,
+            "partial_hashed_bytes": self.partial_hashed_bytes,
+            "full_hashed_files": self.full_hashed_files,
+            "full_hashed_bytes": self.full_hashed_bytes,
+            "wasted_bytes": self.wasted,
+            "groups": [
+                {"size": group.size, "keep": group.keep, "remove": group.removable}
+                for group in self.groups
+            ],
+        }
+
+
+def choose_keeper(paths):
+    """每组保留一个：优先不带「(1)」「- 副本」等后缀的文件名，其次最早修改的，再次路径最短的"""
+    def key(path):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = float("inf")
+        return (_COPY_NAME.search(stem) is not None, mtime, len(path), path)
+    return min(paths, key=key)
+
+
+def _group(items, key_of, executor):
+    """按 key_of 的结果重新分组，返回 [(键, 组)]，丢弃读取失败（None）和只剩一个文件的组"""
+    groups = defaultdict(list)
+    for item, key in zip(items, executor.map(key_of, items)):
+        if key is not None:
+            groups[key].append(item)
+    return [(key, group) for key, group in groups.items() if len(group) > 1]
+
+
+def find_duplicates(files, min_size=1, workers=4, use_processes=True):
+    """在 files（(路径, 大小) 的可迭代对象，如 FileStore）中查找内容相同的文件
+
+    小于 min_size 的文件不参与比较（空文件内容总是相同，没有意义）。
+    返回 DuplicateReport，组按可释放字节数从大到小排列。
+    """
+    report = DuplicateReport()
+    by_size = defaultdict(list)
+    for path, size in files:
+        if size < min_size:
+            continue
+        report.files += 1
+        report.total_bytes += size
+        by_size[size].append(path)
+
+    # 第二级：大小相同的文件比较首尾部分哈希
+    candidates = [(path, size) for size, paths in by_size.items() if len(paths) > 1 for path in paths]
+    by_size.clear()
+    report.partial_hashed_files = len(candidates)
+    report.partial_hashed_bytes = sum(min(size, 2 * PARTIAL_SIZE) for _, size in candidates)
+    with ThreadPoolExecutor(max(1, workers)) as threads:
+        groups = _group(candidates, _partial_key, threads)
+
+    # 部分哈希已覆盖全部内容的小文件直接成组（部分哈希即完整哈希），其余再比较完整哈希
+    confirmed = []
+    pending = []
+    for (size, digest), group in groups:
+        if size <= 2 * PARTIAL_SIZE:
+            confirmed.append((size, digest, [path for path, _ in group]))
+        else:
+            pending.extend(group)
+
+    if pending:
+        report.full_hashed_files = len(pending)
+        report.full_hashed_bytes = sum(size for _, size in pending)
+        paths = [path for path, _ in pending]
+        digests = None
+        if use_processes and report.full_hashed_bytes >= PROCESS_POOL_MIN_BYTES:
+            try:
+                with ProcessPoolExecutor(max(1, min(workers, os.cpu_count() or 1))) as pool:
+                    digests = list(pool.map(full_hash, paths, chunksize=4))
+            except (OSError, RuntimeError):
+                # 进程池不可用（受限环境等）时退回线程，哈希计算期间同样会释放 GIL
+                digests = None
+        if digests is None:
+            with ThreadPoolExecutor(max(1, workers)) as threads:
+                digests = list(threads.map(full_hash, paths))
+        full = defaultdict(list)
+        for (path, size), digest in zip(pending, digests):
+            if digest is not None:
+                full[(size, digest)].append(path)
+        for (size, digest), group in full.items():
+            if len(group) > 1:
+                confirmed.append((size, digest, group))
+
+    report.groups = [DuplicateGroup(size, digest, sorted(paths)) for size, digest, paths in confirmed]
+    report.groups.sort(key=lambda group: group.wasted, reverse=True)
+    return report
+
+
+def get_duplicate_roots(roots):
+    """roots 中适合查重的目录（用户的下载文件夹）"""
+    return [root for root in roots if os.path.basename(root.rstrip("\\/")).lower() == "downloads"]
+
+
+def files_under(store, roots):
+    """FileStore 中位于 roots 之下的 (路径, 大小)"""
+    prefixes = tuple(root.rstrip("\\/") + os.sep for root in roots)
+    for path, size in store:
+        if path.startswith(prefixes):
+            yield path, size
@@ -0,0 +1,201 @@
+"""可清理空间的快速估计：每个根目录只枚举有限个目录，外推总量并给出置信区间
+
+先从根目录按层（广度优先）枚举一半预算的目录，这部分精确计入；树在
+预算内就走完时结果是精确的。否则用剩余预算做 Knuth 随机探测：从尚未
+枚举的边界目录中均匀选一个，沿随机子目录一路向下，每层把本目录的
+文件量乘以沿途各层子目录数之积（即该路径被选中概率的倒数），每次探测
+都是边界以下总量的无偏估计。多次探测取平均，用样本标准差给出 95%
+置信区间。探测中枚举过的目录会缓存，重复经过不计入预算。
+
+规则（扫描深度、包含/排除、年龄和大小条件）与 JunkScanner 一致，
+估计的是扫描后会得到的文件量，而不是目录的全部大小。
+"""
+import math
+import os
+import random
+import time
+from collections import deque
+
+from roots import normalize_roots
+from rules import RESERVED_DIRNAME, RuleSet
+from scanner import is_link_dir, should_skip_root
+
+# 每个根目录默认最多枚举的目录数
+DEFAULT_MAX_DIRS = 48
+
+# 探测次数上限为目录预算的倍数（探测经过的目录可能都已缓存）
+PROBES_PER_DIR = 4
+
+# 95% 置信区间对应的正态分位数
+Z_95 = 1.96
+
+
+class Estimate:
+    """文件数和字节数的估计值及 95% 置信区间；exact 为 True 时为精确值"""
+
+    def __init__(self, files=0.0, size=0.0, files_var=0.0, size_var=0.0, exact=True, dirs_listed=0,
+                 seconds=0.0):
+        self.files = files
+        self.size = size
+        self.known_files = files  # 已精确计入的部分，置信区间下限不低于它
+        self.known_size = size
+        self.files_var = files_var  # 估计量的方差（已除以探测次数）
+        self.size_var = size_var
+        self.exact = exact
+        self.dirs_listed = dirs_listed
+        self.seconds = seconds
+
+    @staticmethod
+    def _interval(value, var, floor):
+        half = Z_95 * math.sqrt(var)
+        return max(floor, value - half), value + half
+
+    def files_interval(self):
+        return self._interval(self.files, self.files_var, self.known_files)
+
+    def size_interval(self):
+        return self._interval(self.size, self.size_var, self.known_size)
+
+    def add(self, other):
+        """合并另一个根目录的估计（各根目录的估计相互独立，方差相加）"""
+        self.files += other.files
+        self.size += other.size
+        self.known_files += other.known_files
+        self.known_size += other.known_size
+        self.files_var += other.files_var
+        self.size_var += other.size_var
+        self.exact = self.exact and other.exact
+        self.dirs_listed += other.dirs_listed
+        self.seconds += other.seconds
+
+    def to_dict(self):
+        files_low, files_high = self.files_interval()
+        size_low, size_high = self.size_interval()
+        return {
+            "files": round(self.files),
+            "bytes": round(self.size),
+            "files_95": [round(files_low), round(files_high)],
+            "bytes_95": [round(size_low), round(size_high)],
+            "exact": self.exact,
+            "dirs_listed": self.dirs_listed,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+class _Lister:
+    """按规则枚举目录并缓存：(文件数, 字节数, [子目录])"""
+
+    def __init__(self, root, rule):
+        self.root = root
+        self.rule = rule
+        self.cache = {}
+
+    def list(self, dirpath, depth):
+        cached = self.cache.get(dirpath)
+        if cached is not None:
+            return cached
+        rule = self.rule
+        prefix = rule.rel_prefix(self.root, dirpath) if rule.filters else None
+        files = size = 0
+        subdirs = []
+        try:
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            if is_link_dir(entry):
+                                continue
+                            if depth < rule.max_depth and entry.name != RESERVED_DIRNAME \
+                                    and not (rule.filters and rule.excludes_dir(prefix, entry.name)):
+                                subdirs.append(entry.path)
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if rule.filters and not rule.accepts_file(prefix, entry.name, st.st_size, st.st_mtime):
+                        continue
+                    files += 1
+                    size += st.st_size
+        except OSError:
+            pass
+        cached = self.cache[dirpath] = (files, size, subdirs)
+        return cached
+
+
+def _estimate_root(root, rule, max_dirs, rng, deadline):
+    started = time.monotonic()
+    if os.path.isfile(root):
+        try:
+            st = os.lstat(root)
+        except OSError:
+            return Estimate(seconds=time.monotonic() - started)
+        accepted = not rule.filters or rule.accepts_file("", os.path.basename(root), st.st_size, st.st_mtime)
+        return Estimate(int(accepted), st.st_size if accepted else 0, seconds=time.monotonic() - started)
+
+    lister = _Lister(root, rule)
+    exact_files = exact_size = 0
+    frontier = []  # [(目录, 深度)]：第一阶段没来得及枚举的目录
+    queue = deque([(root, 0)])
+    while queue:
+        if len(lister.cache) >= max_dirs // 2 or time.monotonic() > deadline:
+            frontier.extend(queue)
+            break
+        dirpath, depth = queue.popleft()
+        files, size, subdirs = lister.list(dirpath, depth)
+        exact_files += files
+        exact_size += size
+        queue.extend((path, depth + 1) for path in subdirs)
+
+    estimate = Estimate(exact_files, exact_size)
+    if frontier:
+        samples = []
+        max_probes = max_dirs * PROBES_PER_DIR
+        # 至少探测两次才能估计方差，即使已经超时
+        while len(samples) < 2 or (len(lister.cache) < max_dirs and len(samples) < max_probes
+                                   and time.monotonic() <= deadline):
+            dirpath, depth = rng.choice(frontier)
+            weight = len(frontier)
+            probe_files = probe_size = 0.0
+            while True:
+                files, size, subdirs = lister.list(dirpath, depth)
+                probe_files += weight * files
+                probe_size += weight * size
+                if not subdirs:
+                    break
+                weight *= len(subdirs)
+                dirpath = rng.choice(subdirs)
+                depth += 1
+            samples.append((probe_files, probe_size))
+        estimate.exact = False
+        n = len(samples)
+        mean_files = sum(s[0] for s in samples) / n
+        mean_size = sum(s[1] for s in samples) / n
+        estimate.files += mean_files
+        estimate.size += mean_size
+        estimate.files_var = sum((s[0] - mean_files) ** 2 for s in samples) / (n - 1) / n
+        estimate.size_var = sum((s[1] - mean_size) ** 2 for s in samples) / (n - 1) / n
+    estimate.dirs_listed = len(lister.cache)
+    estimate.seconds = time.monotonic() - started
+    return estimate
+
+
+def estimate_roots(roots, rules=None, max_dirs=DEFAULT_MAX_DIRS, time_budget=0.3, seed=None):
+    """估计扫描 roots 会找到的文件数和总大小，返回 (合计 Estimate, {根目录: Estimate})
+
+    time_budget（秒）为全部根目录的总时间预算，按根目录平均分配。
+    """
+    rules = rules if rules is not None else RuleSet.default()
+    rng = random.Random(seed)
+    roots = [root for root in normalize_roots(roots) if not should_skip_root(root)]
+    total = Estimate()
+    per_root = {}
+    now = time.time()
+    started = time.monotonic()
+    for i, root in enumerate(roots):
+        # 前面的根目录用剩的时间留给后面的
+        remaining = time_budget - (time.monotonic() - started)
+        deadline = time.monotonic() + max(0.0, remaining) / (len(roots) - i)
+        estimate = _estimate_root(root, rules.for_root(root, now), max_dirs, rng, deadline)
+        per_root[root] = estimate
+        total.add(estimate)
+    return total, per_root
@@ -0,0 +1,215 @@
+"""按列存储扫描结果，替代每个文件一个 dict 的 found_files"""
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+from appdata import get_app_data_dir
+
+_FS_ENCODING = sys.getfilesystemencoding()
+_FS_ERRORS = sys.getfilesystemencodeerrors()
+
+# 默认内存预算（字节）：各列超过该大小后溢出到磁盘，约可在内存中保存 500 万个文件
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# 每个文件在 dir_ids、sizes、mtimes、name_ends 四列中占用的字节数
+_COLUMN_BYTES = 4 + 8 + 4 + 8
+
+# mtimes 列按整秒保存在无符号 32 位整数中
+_MAX_MTIME = 2**32 - 1
+
+# 溢出文件中每块的头部：文件数、名字表字节数
+_CHUNK_HEADER = struct.Struct('<qq')
+
+
+class FileStore:
+    """紧凑的文件列表
+
+    目录路径去重后存入目录表，每个文件只记录：
+      dir_ids     所在目录的编号          array('i')，4 字节
+      sizes       文件大小                array('q')，8 字节
+      mtimes      修改时间（整秒）         array('I')，4 字节，供按年龄排序
+      name_ends   文件名在名字表中的结束位置 array('q')，8 字节
+      names       所有文件名编码后首尾相接  bytearray，约等于文件名长度
+    平均每个文件 24 字节加文件名长度，total_size 和 len() 随添加实时更新，O(1)。
+
+    设置 memory_budget（字节）后，各列超过预算时整块追加写入数据目录中的
+    临时文件并清空，内存占用不随文件数增长（目录表仍在内存中）。溢出后
+    只能用 items()/迭代顺序读取，按下标访问的 name()/path()/group_by_dir()
+    只适用于未溢出（spilled 为 False）的结果。
+    """
+
+    def __init__(self, memory_budget=None):
+        self.memory_budget = memory_budget
+        self._segments = []  # 溢出数据：[(临时文件, 目录编号映射或 None)]
+        self._spill_file = None  # 本对象自己的溢出文件
+        self._spilled_count = 0
+        self.dirs = []
+        self._dir_index = {}
+        self.dir_ids = array('i')
+        self.sizes = array('q')
+        self.mtimes = array('I')
+        self.name_ends = array('q')
+        self.names = bytearray()
+        self.total_size = 0
+
+    def __len__(self):
+        return self._spilled_count + len(self.sizes)
+
+    @property
+    def spilled(self):
+        return bool(self._segments)
+
+    def add_dir(self, dirpath):
+        """登记目录并返回其编号，同一路径只登记一次"""
+        dir_id = self._dir_index.get(dirpath)
+        if dir_id is None:
+            dir_id = len(self.dirs)
+            self.dirs.append(dirpath)
+            self._dir_index[dirpath] = dir_id
+        return dir_id
+
+    def add(self, dir_id, name, size, mtime=0):
+        self.names += name.encode(_FS_ENCODING, _FS_ERRORS)
+        self.name_ends.append(len(self.names))
+        self.dir_ids.append(dir_id)
+        self.sizes.append(size)
+        self.mtimes.append(min(max(int(mtime or 0), 0), _MAX_MTIME))
+        self.total_size += size
+        budget = self.memory_budget
+        if budget is not None and len(self.names) + _COLUMN_BYTES * len(self.sizes) >= budget:
+            self.spill()
+
+    def spill(self):
+        """把内存中的各列作为一块追加到溢出文件，然后清空"""
+        if not self.sizes:
+            return
+        if self._spill_file is None:
+            try:
+                spill_dir = get_app_data_dir()
+            except OSError:
+                spill_dir = None
+            # 放在数据目录而不是 Temp：Temp 本身就是清理对象
+            self._spill_file = tempfile.TemporaryFile(prefix="scan_spill_", dir=spill_dir)
+            self._segments.append((self._spill_file, None))
+        f = self._spill_file
+        f.seek(0, os.SEEK_END)
+        f.write(_CHUNK_HEADER.pack(len(self.sizes), len(self.names)))
+        f.write(self.dir_ids.tobytes())
+        f.write(self.sizes.tobytes())
+        f.write(self.mtimes.tobytes())
+        f.write(self.name_ends.tobytes())
+        f.write(self.names)
+        self._spilled_count += len(self.sizes)
+        self.dir_ids = array('i')
+        self.sizes = array('q')
+        self.mtimes = array('I')
+        self.name_ends = array('q')
+        self.names = bytearray()
+
+    def extend(self, other):
+        """并入另一个 FileStore（并行扫描时合并各线程的结果）
+
+        other 已溢出的部分直接引用其溢出文件，只记录目录编号映射，不复制数据。
+        """
+        mapping = [self.add_dir(dirpath) for dirpath in other.dirs]
+        for f, other_mapping in other._segments:
+            if other_mapping is None:
+                self._segments.append((f, array('i', mapping)))
+            else:
+                self._segments.append((f, array('i', (mapping[d] for d in other_mapping))))
+        self._spilled_count += other._spilled_count
+        self.dir_ids.extend(mapping[dir_id] for dir_id in other.dir_ids)
+        base = len(self.names)
+        self.names += other.names
+        self.name_ends.extend(end + base for end in other.name_ends)
+        self.sizes.extend(other.sizes)
+        self.mtimes.extend(other.mtimes)
+        self.total_size += other.total_size
+        if self.memory_budget is not None and self.nbytes() >= self.memory_budget:
+            self.spill()
+
+    def _chunks(self):
+        """依次产出各块的 (dir_ids, sizes, mtimes, name_ends, names)：先是溢出文件中的块，最后是内存中的部分"""
+        for f, mapping in self._segments:
+            f.flush()
+            f.seek(0)
+            while True:
+                header = f.read(_CHUNK_HEADER.size)
+                if not header:
+                    break
+                count, names_len = _CHUNK_HEADER.unpack(header)
+                dir_ids = array('i')
+                dir_ids.frombytes(f.read(dir_ids.itemsize * count))
+                sizes = array('q')
+                sizes.frombytes(f.read(sizes.itemsize * count))
+                mtimes = array('I')
+                mtimes.frombytes(f.read(mtimes.itemsize * count))
+                name_ends = array('q')
+                name_ends.frombytes(f.read(name_ends.itemsize * count))
+                names = f.read(names_len)
+                if mapping is not None:
+                    dir_ids = array('i', (mapping[d] for d in dir_ids))
+                yield dir_ids, sizes, mtimes, name_ends, names
+        yield self.dir_ids, self.sizes, self.mtimes, self.name_ends, self.names
+
+    def close(self):
+        """删除溢出文件（对象被回收时也会自动删除）"""
+        for f, _ in self._segments:
+            f.close()
+
+    def name(self, i):
+        start = self.name_ends[i - 1] if i > 0 else 0
+        return self.names[start:self.name_ends[i]].decode(_FS_ENCODING, _FS_ERRORS)
+
+    def path(self, i):
+        return os.path.join(self.dirs[self.dir_ids[i]], self.name(i))
+
+    def items(self):
+        """依次产出 (目录编号, 路径, 大小)，已溢出时逐块从磁盘读回"""
+        dirs = self.dirs
+        for dir_ids, sizes, _, name_ends, names in self._chunks():
+            start = 0
+            for dir_id, end, size in zip(dir_ids, name_ends, sizes):
+                name = names[start:end].decode(_FS_ENCODING, _FS_ERRORS)
+                yield dir_id, os.path.join(dirs[dir_id], name), size
+                start = end
+
+    def columns(self):
+        """依次产出各块的 (dir_ids, sizes, mtimes)，不解码文件名，已溢出时逐块从磁盘读回"""
+        for dir_ids, sizes, mtimes, _, _ in self._chunks():
+            yield dir_ids, sizes, mtimes
+
+    def __iter__(self):
+        """依次产出 (路径, 大小)"""
+        for _, path, size in self.items():
+            yield path, size
+
+    def dir_of(self, dirpath):
+        """目录路径对应的编号，未登记返回 None"""
+        return self._dir_index.get(dirpath)
+
+    def group_by_dir(self):
+        """按目录分组的文件下标（计数排序，O(n)）
+
+        返回 (starts, order)：目录 d 的文件下标为 order[starts[d]:starts[d + 1]]。
+        """
+        starts = array('q', bytes(8 * (len(self.dirs) + 1)))
+        for dir_id in self.dir_ids:
+            starts[dir_id + 1] += 1
+        for d in range(len(self.dirs)):
+            starts[d + 1] += starts[d]
+        fill = array('q', starts)
+        order = array('q', bytes(8 * len(self.sizes)))
+        for i, dir_id in enumerate(self.dir_ids):
+            order[fill[dir_id]] = i
+            fill[dir_id] += 1
+        return starts, order
+
+    def nbytes(self):
+        """内存中各列占用的字节数（不含目录表和已溢出的部分）"""
+        return (len(self.names) + self.dir_ids.itemsize * len(self.dir_ids)
+                + self.sizes.itemsize * len(self.sizes)
+                + self.mtimes.itemsize * len(self.mtimes)
+                + self.name_ends.itemsize * len(self.name_ends))
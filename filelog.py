@@ -0,0 +1,44 @@
+"""完整日志写入滚动文件，写盘在后台线程中进行"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+
+from appdata import get_app_data_dir
+
+LOG_FILENAME = "cleaner.log"
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024  # 单个日志文件上限
+LOG_FILE_BACKUPS = 3  # 保留的历史日志文件数
+
+
+def open_file_log(path=None, max_bytes=LOG_FILE_MAX_BYTES, backup_count=LOG_FILE_BACKUPS):
+    """返回写入滚动日志文件的 logger，打不开日志文件时返回 None
+
+    logger.info() 只是把记录放进内存队列，由 QueueListener 的后台线程
+    写入 RotatingFileHandler，调用方（界面线程、扫描线程）不等待磁盘 I/O。
+    进程退出时自动把队列中剩余的记录写完。
+    """
+    if path is None:
+        try:
+            path = os.path.join(get_app_data_dir(), LOG_FILENAME)
+        except OSError:
+            return None
+    try:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+    except OSError:
+        return None
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s", "%Y-%m-%d %H:%M:%S"))
+
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger = logging.getLogger(f"cdrive_cleaner.{path}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    return logger
@@ -0,0 +1,106 @@
+"""扫描时顺带统计的空间分布：最大的 N 个文件、按大小和年龄的对数直方图
+
+每个文件 O(log N)（最小堆）加两次数组自增，不保留也不排序完整文件列表。
+"""
+import heapq
+import os
+import time
+
+# 默认保留的最大文件数
+DEFAULT_TOP_N = 50
+
+# 大小直方图：第 i 个桶为 bit_length == i 的文件，即 [2**(i-1), 2**i) 字节
+SIZE_BUCKETS = 48
+
+# 年龄直方图：按天数的 bit_length 分桶，第 0 桶为不满一天
+AGE_BUCKETS = 16
+
+_DAY = 86400
+
+# 界面显示用的分组：(标签, 起始桶, 结束桶)
+SIZE_GROUPS = [
+    ("<4K", 0, 13), ("4K", 13, 17), ("64K", 17, 21), ("1M", 21, 25),
+    ("16M", 25, 29), ("256M", 29, 33), ("≥4G", 33, SIZE_BUCKETS),
+]
+AGE_GROUPS = [
+    ("<1天", 0, 1), ("1-7天", 1, 4), ("1-4周", 4, 6), ("1-4月", 6, 8),
+    ("4-16月", 8, 10), (">16月", 10, AGE_BUCKETS),
+]
+
+
+class ScanInsights:
+    """largest 为 (大小, 目录, 文件名) 的最小堆，堆顶是当前第 N 大的文件"""
+
+    def __init__(self, top_n=DEFAULT_TOP_N, now=None):
+        self.top_n = top_n
+        self.now = time.time() if now is None else now
+        self.largest = []
+        self.size_counts = [0] * SIZE_BUCKETS
+        self.size_bytes = [0] * SIZE_BUCKETS
+        self.age_counts = [0] * AGE_BUCKETS
+        self.age_bytes = [0] * AGE_BUCKETS
+        self.unknown_age = 0  # 没有 mtime 的文件数
+
+    def add(self, dirpath, name, size, mtime):
+        bucket = size.bit_length()
+        if bucket >= SIZE_BUCKETS:
+            bucket = SIZE_BUCKETS - 1
+        self.size_counts[bucket] += 1
+        self.size_bytes[bucket] += size
+
+        if mtime is None:
+            self.unknown_age += 1
+        else:
+            days = int(self.now - mtime) // _DAY
+            bucket = days.bit_length() if days > 0 else 0
+            if bucket >= AGE_BUCKETS:
+                bucket = AGE_BUCKETS - 1
+            self.age_counts[bucket] += 1
+            self.age_bytes[bucket] += size
+
+        largest = self.largest
+        if len(largest) < self.top_n:
+            heapq.heappush(largest, (size, dirpath, name))
+        elif size > largest[0][0]:
+            heapq.heapreplace(largest, (size, dirpath, name))
+
+    def merge(self, other):
+        """并入另一份统计（并行扫描时各线程分别统计，结束时合并）"""
+        for i in range(SIZE_BUCKETS):
+            self.size_counts[i] += other.size_counts[i]
+            self.size_bytes[i] += other.size_bytes[i]
+        for i in range(AGE_BUCKETS):
+            self.age_counts[i] += other.age_counts[i]
+            self.age_bytes[i] += other.age_bytes[i]
+        self.unknown_age += other.unknown_age
+        for item in other.largest:
+            if len(self.largest) < self.top_n:
+                heapq.heappush(self.largest, item)
+            elif item[0] > self.largest[0][0]:
+                heapq.heapreplace(self.largest, item)
+
+    def top_files(self, n=None):
+        """从大到小返回 [(完整路径, 大小)]"""
+        items = sorted(self.largest, reverse=True)
+        if n is not None:
+            items = items[:n]
+        return [(os.path.join(dirpath, name), size) for size, dirpath, name in items]
+
+    @staticmethod
+    def _groups(groups, counts, sizes):
+        return [(label, sum(counts[lo:hi]), sum(sizes[lo:hi])) for label, lo, hi in groups]
+
+    def size_groups(self):
+        """[(标签, 文件数, 字节数)]"""
+        return self._groups(SIZE_GROUPS, self.size_counts, self.size_bytes)
+
+    def age_groups(self):
+        return self._groups(AGE_GROUPS, self.age_counts, self.age_bytes)
+
+    def to_dict(self):
+        return {
+            "largest": [{"path": path, "bytes": size} for path, size in self.top_files()],
+            "size_histogram": [{"bucket": label, "files": n, "bytes": b} for label, n, b in self.size_groups()],
+            "age_histogram": [{"bucket": label, "files": n, "bytes": b} for label, n, b in self.age_groups()],
+            "unknown_age_files": self.unknown_age,
+        }
@@ -0,0 +1,155 @@
+"""清理日志（journal）：记录清理计划和进度，中断后可从断点继续
+
+数据目录下的 clean_journal 目录中：
+  plan.json      清理计划：根目录、整棵删除的子树、文件数和总大小
+  files.txt      逐个删除的文件，每行一个 JSON [大小, 路径]
+  progress.log   追加写入的进度：subtrees k（前 k 棵子树已删完）、
+                 files n（前 n 个文件已处理）、service stopped/started、
+                 recycle_bin keep（只清理了部分勾选的文件，不清空回收站）
+进度按批次追加并 flush，程序被关闭后下次启动可直接按计划继续，
+不必重新扫描；停止过的 Windows Update 服务也能据此恢复。
+"""
+import json
+import os
+import shutil
+import time
+
+from appdata import get_app_data_dir
+
+JOURNAL_DIRNAME = "clean_journal"
+
+JOURNAL_VERSION = 1
+
+
+class CleanJournal:
+    def __init__(self, path):
+        self.path = path
+        self.plan = None
+        self.done_subtrees = 0
+        self.done_files = 0
+        self.service_stopped = False  # Windows Update 服务被停止且尚未恢复
+        self.recycle_bin_kept = False  # 回收站中有未勾选的文件，继续清理后也不清空回收站
+        self._progress = None
+
+    @staticmethod
+    def default_path():
+        return os.path.join(get_app_data_dir(), JOURNAL_DIRNAME)
+
+    @classmethod
+    def create(cls, path=None):
+        """开始一次新的清理（覆盖之前未完成的日志）"""
+        journal = cls(path or cls.default_path())
+        shutil.rmtree(journal.path, ignore_errors=True)
+        os.makedirs(journal.path)
+        journal._progress = open(os.path.join(journal.path, "progress.log"), "a", encoding="utf-8")
+        return journal
+
+    @classmethod
+    def open_pending(cls, path=None):
+        """读取上次没有完成的清理日志，没有时返回 None"""
+        try:
+            journal = cls(path or cls.default_path())
+        except OSError:
+            return None
+        if not os.path.isdir(journal.path):
+            return None
+        try:
+            with open(os.path.join(journal.path, "plan.json"), encoding="utf-8") as f:
+                plan = json.load(f)
+            if plan.get("version") == JOURNAL_VERSION:
+                journal.plan = plan
+        except (OSError, ValueError):
+            pass
+        try:
+            with open(os.path.join(journal.path, "progress.log"), encoding="utf-8") as f:
+                for line in f:
+                    journal._apply(line.split())
+        except OSError:
+            pass
+        journal._progress = open(os.path.join(journal.path, "progress.log"), "a", encoding="utf-8")
+        return journal
+
+    def _apply(self, fields):
+        if len(fields) != 2:
+            return  # 写到一半被中断的行
+        key, value = fields
+        if key == "subtrees" and value.isdigit():
+            self.done_subtrees = int(value)
+        elif key == "files" and value.isdigit():
+            self.done_files = int(value)
+        elif key == "service":
+            self.service_stopped = value == "stopped"
+        elif key == "recycle_bin":
+            self.recycle_bin_kept = value == "keep"
+
+    def _record(self, line):
+        self._progress.write(line + "\n")
+        self._progress.flush()
+
+    @property
+    def resumable(self):
+        """是否有写好的清理计划可以继续"""
+        return self.plan is not None
+
+    def write_plan(self, roots, subtrees, files):
+        """写入清理计划：subtrees 为 [(目录, 是否保留目录本身)]，files 为逐个删除的 (路径, 大小)"""
+        file_count = 0
+        total_size = 0
+        with open(os.path.join(self.path, "files.txt"), "w", encoding="utf-8") as f:
+            for path, size in files:
+                f.write(json.dumps([size, path]) + "\n")
+                file_count += 1
+                total_size += size
+        plan = {
+            "version": JOURNAL_VERSION,
+            "created_at": time.time(),
+            "roots": list(roots),
+            "subtrees": [[path, keep_root] for path, keep_root in subtrees],
+            "file_count": file_count,
+            "file_bytes": total_size,
+        }
+        tmp = os.path.join(self.path, "plan.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(plan, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.path, "plan.json"))
+        self.plan = plan
+
+    @property
+    def subtrees(self):
+        return [(path, keep_root) for path, keep_root in self.plan["subtrees"]]
+
+    def remaining_files(self):
+        """计划中尚未处理的 (路径, 大小)"""
+        with open(os.path.join(self.path, "files.txt"), encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                if i < self.done_files:
+                    continue
+                size, path = json.loads(line)
+                yield path, size
+
+    def subtree_done(self, count):
+        self.done_subtrees = count
+        self._record(f"subtrees {count}")
+
+    def files_done(self, count):
+        """又有 count 个文件处理完（按计划顺序）"""
+        self.done_files += count
+        self._record(f"files {self.done_files}")
+
+    def service_state(self, stopped):
+        self.service_stopped = stopped
+        self._record(f"service {'stopped' if stopped else 'started'}")
+
+    def keep_recycle_bin(self):
+        self.recycle_bin_kept = True
+        self._record("recycle_bin keep")
+
+    def close(self):
+        if self._progress is not None:
+            self._progress.close()
+            self._progress = None
+
+    def finish(self):
+        """清理完成（或放弃继续），删除日志"""
+        self.close()
+        shutil.rmtree(self.path, ignore_errors=True)
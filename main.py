@@ -1,5 +1,16 @@
+import sys
+
+if __name__ == "__main__":
+    # 打包为 exe 后，查重用的进程池子进程也从这里启动
+    import multiprocessing
+    multiprocessing.freeze_support()
+    if "--headless" in sys.argv[1:]:
+        # 无界面批处理模式：不加载 Tk
+        from cli import main as headless_main
+        sys.exit(headless_main(sys.argv[1:]))
+
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import filedialog, messagebox, ttk
 import math
 import os
 import shutil
@@ -8,6 +19,32 @@ from datetime import datetime
 import threading
 import time
 import ctypes
+from collections import deque
+
+from cleaner import (DEFAULT_CLEAN_WORKERS, CleanCancelled, CleanControl, clean_files, empty_recycle_bin,
+                     remove_files, resume_clean, safe_remove, start_wuauserv, stop_wuauserv)
+from duplicates import files_under, find_duplicates, get_duplicate_roots
+from estimator import estimate_roots
+from file_store import DEFAULT_MEMORY_BUDGET
+from filelog import open_file_log
+from journal import CleanJournal
+from metrics import Metrics
+from quarantine import DEFAULT_RETENTION_HOURS, Quarantine
+from result_tree import CHECKED, FILE, PARTIAL, SORT_AGE, SORT_SIZE, ResultTree
+from roots import get_junk_paths, is_recycle_bin
+from rules import RuleError, RuleSet, load_rules
+from scan_index import ScanIndex
+from scanner import DEFAULT_SCAN_WORKERS, JunkScanner
+from watcher import JunkWatcher
+
+# 界面刷新周期（毫秒，约 30Hz）
+UI_TICK_MS = 33
+
+# 日志窗口最多保留的行数，更早的行只保存在日志文件中
+LOG_MAX_LINES = 2000
+
+# 结果浏览器的行高（像素），据此计算可见行数
+RESULT_ROW_HEIGHT = 22
 
 class CDriveCleaner(tk.Tk):
     def __init__(self):
@@ -23,14 +60,47 @@ class CDriveCleaner(tk.Tk):
         self.is_scanning = False
         self.is_cleaning = False
         self.found_files = []
+        self.last_scan = None  # 最近一次扫描结果，新鲜时「开始扫描」直接复用
+        self.scan_insights = None  # 最近一次扫描的最大文件和大小/年龄分布
+        self.scan_workers = DEFAULT_SCAN_WORKERS  # 并行扫描线程数，1 为串行
+        self.memory_budget = DEFAULT_MEMORY_BUDGET  # 扫描结果的内存预算，超过后溢出到磁盘
+        self.scan_index = ScanIndex.open_default()  # 增量扫描索引，打不开时为 None（全量扫描）
+        self.clean_workers = DEFAULT_CLEAN_WORKERS  # 并行删除线程数
+        self.clean_max_ops = None  # 每秒最多删除的文件数，None 为不限
+        self.clean_max_bytes = None  # 每秒最多删除的字节数，None 为不限
+        self.clean_control = None  # 清理进行中时的暂停/取消开关
+        self.watcher = None  # 实时统计开启时的 JunkWatcher
+        try:
+            self.quarantine = Quarantine()  # 隔离区，数据目录不可用时为 None
+        except OSError:
+            self.quarantine = None
+        self.metrics = Metrics()  # 按根目录的扫描/删除指标，显示在系统信息面板
+        try:
+            self.rules = load_rules()  # 数据目录中的 rules.json，没有时为内置规则
+        except RuleError as e:
+            self.rules = RuleSet.default()
+            self.rules_error = str(e)
+        else:
+            self.rules_error = None
         self.cleaned_size = 0
         self.temp_files_size = 0
         self.temp_files_count = 0
+        self.temp_estimate = None  # 启动时的抽样估计，扫描后为 None（卡片显示精确值）
+        self.temp_files_known = False
+        
+        # 工作线程 → 界面线程：待写入的日志行和待执行的控件操作
+        self.log_queue = deque()
+        self.ui_calls = deque()
+        self.log_max_lines = LOG_MAX_LINES
+        self.log_line_count = 0
+        self.file_log = open_file_log()  # 完整日志，打不开日志文件时为 None
+        self.drawn_progress = 0
+        self.drawn_stats = None
         
         # 获取初始磁盘信息
         self.update_disk_info()
         
-        # 启动后台线程计算临时文件
+        # 启动后台线程估计临时文件
         self.start_temp_calculation()
         
         # 创建界面
@@ -40,6 +110,15 @@ class CDriveCleaner(tk.Tk):
         if not self.is_admin():
             self.add_log("⚡ 提示：右键 → 以管理员身份运行，可再多删 8GB")
         
+        # 上次清理被中断时恢复服务，并询问是否继续
+        self.check_pending_clean()
+        
+        # 后台以最低优先级删除隔离区中已过保留期的文件
+        self.start_quarantine_purge()
+        
+        # 启动界面刷新循环
+        self.ui_tick()
+        
     def is_admin(self):
         try: 
             return ctypes.windll.shell32.IsUserAnAdmin()
@@ -47,11 +126,10 @@ class CDriveCleaner(tk.Tk):
             return False
          
     def stop_wuauserv(self):
-        os.system("net stop wuauserv 2>nul")
-        time.sleep(1)
+        stop_wuauserv()
 
     def start_wuauserv(self):
-        os.system("net start wuauserv 2>nul")
+        start_wuauserv()
         
     def update_disk_info(self):
         """获取C盘实时信息"""
@@ -72,52 +150,7 @@ class CDriveCleaner(tk.Tk):
             
     def get_junk_paths(self):
         """返回所有能删的大垃圾路径（按体积排序）"""
-        paths = []
-        if os.name != 'nt':
-            return paths
-
-        # 1. Windows Update 缓存（最大头目，动辄 5-15GB）
-        paths.append(r"C:\Windows\SoftwareDistribution\Download")
-
-        # 2. 旧版系统升级残留（Win10→Win11 后留下的 Windows.old，20-40GB）
-        paths.append(r"C:\Windows.old")
-
-        # 3. 系统错误转储 + 内存 dump（单文件 1-8GB）
-        paths.append(r"C:\Windows\Minidump")
-        paths.append(r"C:\Windows\Memory.dmp")
-
-        # 4. 升级日志 + 安装缓存
-        paths.append(r"C:\Windows\Logs")
-        paths.append(r"C:\Windows\Panther")
-        paths.append(r"C:\Windows\Temp")
-        paths.append(r"C:\Windows\Prefetch")
-
-        # 5. 磁盘清理向导的隐藏缓存
-        paths.append(r"C:\Windows\ServiceProfiles\LocalService\AppData\Local\Microsoft\Windows\DeliveryOptimization\Cache")
-
-        # 6. 浏览器 200GB 缓存（Edge/Chrome/Firefox）
-        appdata = os.getenv("LOCALAPPDATA")
-        userprof = os.getenv("USERPROFILE")
-        paths.extend([
-            os.path.join(appdata, r"Google\Chrome\User Data\Default\Cache"),
-            os.path.join(appdata, r"Google\Chrome\User Data\Default\Code Cache"),
-            os.path.join(appdata, r"Google\Chrome\User Data\Default\Media Cache"),
-            os.path.join(appdata, r"Microsoft\Edge\User Data\Default\Cache"),
-            os.path.join(appdata, r"Mozilla\Firefox\Profiles"),  # 内部再递归 cache2
-            os.path.join(userprof, r"AppData\Local\Temp"),
-        ])
-
-        # 7. 回收站（所有盘符）
-        for drive in "CDEFG":
-            recycle = f"{drive}:\\$Recycle.Bin"
-            if os.path.exists(recycle):
-                paths.append(recycle)
-
-        # 8. 用户下载临时包（微信/QQ/钉钉）
-        paths.append(os.path.join(userprof, r"Downloads"))
-        paths.append(os.path.join(userprof, r"AppData\Local\Temp"))
-
-        return [p for p in paths if os.path.exists(p)]
+        return get_junk_paths()
         
     def create_widgets(self):
         # 标题栏
@@ -167,7 +200,7 @@ class CDriveCleaner(tk.Tk):
             highlightthickness=0
         )
         self.canvas.pack()
-        self.draw_circular_progress()
+        self.create_circular_progress()
         
         # 右侧 - 按钮
         right_frame = tk.Frame(top_frame, bg="#3d5a80")
@@ -204,6 +237,36 @@ class CDriveCleaner(tk.Tk):
         )
         self.clean_btn.pack(pady=10)
         
+        # 隔离模式：移到隔离区，保留期内可恢复，之后在后台删除
+        self.quarantine_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            right_frame,
+            text=f"隔离模式（{DEFAULT_RETENTION_HOURS}小时内可恢复）",
+            variable=self.quarantine_var,
+            font=("Microsoft YaHei UI", 9),
+            bg="#3d5a80",
+            fg="white",
+            selectcolor="#2d4a6f",
+            activebackground="#3d5a80",
+            activeforeground="white",
+            state="normal" if self.quarantine is not None else "disabled"
+        ).pack()
+        
+        # 实时统计：按文件变更通知更新临时文件卡片，扫描和清理直接使用维护的结果
+        self.watch_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            right_frame,
+            text="实时统计",
+            variable=self.watch_var,
+            command=self.toggle_watch,
+            font=("Microsoft YaHei UI", 9),
+            bg="#3d5a80",
+            fg="white",
+            selectcolor="#2d4a6f",
+            activebackground="#3d5a80",
+            activeforeground="white"
+        ).pack()
+        
         # 统计信息卡片区域
         self.stats_frame = tk.Frame(main_frame, bg="#4a6fa5", relief="flat")
         self.stats_frame.pack(fill="x", padx=30, pady=10)
@@ -252,6 +315,10 @@ class CDriveCleaner(tk.Tk):
         self.add_log("[系统] C盘清理工具已启动")
         self.add_log(f"[信息] 系统：{self.get_os_info()}")
         self.add_log(f"[信息] Python版本：{self.get_python_version()}")
+        if self.rules_error:
+            self.add_log(f"[警告] 规则文件有误，已改用内置规则：{self.rules_error}")
+        elif self.rules.source:
+            self.add_log(f"[信息] 已加载清理规则：{self.rules.source}")
         
         # 右侧 - 系统信息
         info_frame = tk.Frame(bottom_frame, bg="#2d4a6f", relief="flat", width=280)
@@ -298,19 +365,78 @@ class CDriveCleaner(tk.Tk):
         )
         self.scan_time_label.pack(fill="x", padx=20, pady=5)
         
-        # 图表区域
-        self.chart_canvas = tk.Canvas(info_frame, width=240, height=100, bg="#2d4a6f", highlightthickness=0)
-        self.chart_canvas.pack(padx=20, pady=20)
+        # 每个根目录的扫描/删除指标
+        self.metrics_label = tk.Label(
+            info_frame,
+            text="指标：未扫描",
+            font=("Microsoft YaHei UI", 8),
+            bg="#2d4a6f",
+            fg="#c8d8e8",
+            anchor="w",
+            justify="left",
+            wraplength=240
+        )
+        self.metrics_label.pack(fill="x", padx=20, pady=5)
+        
+        info_btn_frame = tk.Frame(info_frame, bg="#2d4a6f")
+        info_btn_frame.pack(fill="x", padx=20, pady=5)
+        
+        export_btn = tk.Button(
+            info_btn_frame,
+            text="导出指标",
+            font=("Microsoft YaHei UI", 9),
+            bg="#3d5a80",
+            fg="white",
+            relief="flat",
+            cursor="hand2",
+            command=self.export_metrics
+        )
+        export_btn.pack(side="left")
+        
+        largest_btn = tk.Button(
+            info_btn_frame,
+            text="最大文件",
+            font=("Microsoft YaHei UI", 9),
+            bg="#3d5a80",
+            fg="white",
+            relief="flat",
+            cursor="hand2",
+            command=self.show_largest_files
+        )
+        largest_btn.pack(side="left", padx=(10, 0))
+        
+        duplicates_btn = tk.Button(
+            info_btn_frame,
+            text="重复文件",
+            font=("Microsoft YaHei UI", 9),
+            bg="#3d5a80",
+            fg="white",
+            relief="flat",
+            cursor="hand2",
+            command=self.start_find_duplicates
+        )
+        duplicates_btn.pack(side="left", padx=(10, 0))
+        
+        quarantine_btn = tk.Button(
+            info_btn_frame,
+            text="隔离区",
+            font=("Microsoft YaHei UI", 9),
+            bg="#3d5a80",
+            fg="white",
+            relief="flat",
+            cursor="hand2",
+            command=self.show_quarantine
+        )
+        quarantine_btn.pack(side="left", padx=(10, 0))
+        
+        # 图表区域：按大小、按年龄的空间分布
+        self.chart_canvas = tk.Canvas(info_frame, width=240, height=130, bg="#2d4a6f", highlightthickness=0)
+        self.chart_canvas.pack(padx=20, pady=10)
         self.draw_chart()
     
-    def create_stats_cards(self):
-        """创建统计卡片"""
-        # 清空旧卡片
-        for widget in self.stats_frame.winfo_children():
-            widget.destroy()
-        
-        # 三个统计卡片
-        stats_data = [
+    def get_stats_data(self):
+        """三个统计卡片的 (标题, 数值, 图标, 进度)"""
+        return [
             ("磁盘使用情况", 
              f"{self.disk_usage_percent:.1f}% 已用 ({self.disk_used_gb:.1f}GB/{self.disk_total_gb:.1f}GB)", 
              "📊",
@@ -324,8 +450,13 @@ class CDriveCleaner(tk.Tk):
              "🕐",
              min(1.0, self.temp_files_size / 10.0) if self.temp_files_size > 0 else 0)
         ]
+    
+    def create_stats_cards(self):
+        """创建统计卡片（只创建一次，之后由 update_stats_cards 就地更新）"""
+        self.card_value_labels = []
+        self.card_bars = []
         
-        for i, (title, value, icon, progress) in enumerate(stats_data):
+        for i, (title, value, icon, progress) in enumerate(self.get_stats_data()):
             card = tk.Frame(self.stats_frame, bg="#4a6fa5")
             card.pack(side="left", expand=True, padx=15, pady=20)
             
@@ -363,109 +494,72 @@ class CDriveCleaner(tk.Tk):
             progress_bar = tk.Canvas(card, width=200, height=4, bg="#4a6fa5", highlightthickness=0)
             progress_bar.pack(pady=5)
             progress_bar.create_rectangle(0, 0, 200, 4, fill="#2d4a6f", outline="")
-            progress_bar.create_rectangle(0, 0, int(200 * progress), 4, fill="#5b9dd9", outline="")
+            bar = progress_bar.create_rectangle(0, 0, int(200 * progress), 4, fill="#5b9dd9", outline="")
+            
+            self.card_value_labels.append(value_label)
+            self.card_bars.append((progress_bar, bar))
+    
+    def update_stats_cards(self):
+        """就地更新统计卡片的文字和进度条"""
+        for (title, value, icon, progress), label, (canvas, bar) in zip(
+                self.get_stats_data(), self.card_value_labels, self.card_bars):
+            label.config(text=value)
+            canvas.coords(bar, 0, 0, int(200 * progress), 4)
     
     def get_temp_files_display(self):
         """获取临时文件显示文本"""
-        if self.temp_files_count == 0:
+        if not self.temp_files_known:
             return "计算中..."
         
         size_text = f"{self.temp_files_size:.2f}GB" if self.temp_files_size >= 1 else f"{self.temp_files_size*1024:.0f}MB"
+        estimate = self.temp_estimate
+        if estimate is not None and not estimate.exact:
+            low, high = estimate.size_interval()
+            size_text += f" ±{(high - low) / 2 / (1024**3):.2f}GB"
         return f"约 {self.temp_files_count} 个文件 ({size_text})"
     
     def start_temp_calculation(self):
-        """启动后台计算临时文件"""
-        thread = threading.Thread(target=self.calculate_temp_files)
-        thread.daemon = True
-        thread.start()
+        """启动后台估计临时文件"""
+        self.temp_thread = threading.Thread(target=self.calculate_temp_files)
+        self.temp_thread.daemon = True
+        self.temp_thread.start()
     
     def calculate_temp_files(self):
-        """后台计算临时文件大小和数量"""
-        self.after(0, lambda: self.add_log("[后台] 正在计算临时文件信息..."))
-        
-        # 使用新的垃圾路径函数
-        temp_paths = self.get_junk_paths()
-        
-        total_size = 0
-        file_count = 0
-        
-        for temp_path in temp_paths:
-            try:
-                if not os.path.exists(temp_path):
-                    continue
-                
-                # 跳过需要管理员权限的某些系统文件夹
-                if 'System32' in temp_path or 'WinSxS' in temp_path:
-                    continue
-                
-                # 针对不同路径使用不同的扫描深度
-                max_depth = 1
-                if 'Chrome' in temp_path or 'Firefox' in temp_path or 'Edge' in temp_path:
-                    max_depth = 3  # 浏览器缓存扫描更深
-                elif 'Recycle' in temp_path:
-                    max_depth = 2  # 回收站扫描2层
-                elif 'Download' in temp_path:
-                    max_depth = 1  # Windows更新下载文件夹
-                elif 'Windows.old' in temp_path:
-                    max_depth = 1  # Windows.old 文件夹
-                elif 'SoftwareDistribution' in temp_path:
-                    max_depth = 2  # Windows更新缓存
-                
-                for dirpath, dirnames, filenames in os.walk(temp_path):
-                    # 计算当前深度
-                    depth = dirpath[len(temp_path):].count(os.sep)
-                    if depth >= max_depth:
-                        dirnames.clear()
-                    
-                    for filename in filenames:
-                        try:
-                            filepath = os.path.join(dirpath, filename)
-                            size = os.path.getsize(filepath)
-                            total_size += size
-                            file_count += 1
-                            
-                            # 每计算100个文件更新一次界面
-                            if file_count % 100 == 0:
-                                self.temp_files_size = total_size / (1024**3)
-                                self.temp_files_count = file_count
-                                self.after(0, self.create_stats_cards)
-                                
-                        except:
-                            continue
-                        
-            except:
-                continue
-        
-        # 最终更新
-        self.temp_files_size = total_size / (1024**3)
-        self.temp_files_count = file_count
-        self.after(0, self.create_stats_cards)
+        """抽样估计临时文件大小和数量（每个根目录只枚举少量目录），精确值在点击扫描后得到"""
+        estimate, _ = estimate_roots(self.get_junk_paths(), rules=self.rules)
+        self.temp_estimate = estimate
+        self.temp_files_size = estimate.size / (1024**3)
+        self.temp_files_count = round(estimate.files)
+        self.temp_files_known = True
         
         size_text = f"{self.temp_files_size:.2f}GB" if self.temp_files_size >= 1 else f"{self.temp_files_size*1024:.0f}MB"
-        self.after(0, lambda: self.add_log(f"[完成] 发现约 {file_count} 个临时文件，总大小 {size_text}"))
+        if estimate.exact:
+            self.add_log(f"[估计] 发现 {self.temp_files_count} 个临时文件，总大小 {size_text}")
+        else:
+            low, high = estimate.size_interval()
+            self.add_log(f"[估计] 约 {self.temp_files_count} 个临时文件，总大小约 {size_text}"
+                         f"（95% 区间 {low/(1024**3):.2f}-{high/(1024**3):.2f}GB，"
+                         f"用时 {estimate.seconds*1000:.0f} 毫秒），点击「开始扫描」获取精确值")
     
-    def draw_circular_progress(self):
-        """绘制圆形进度条"""
-        self.canvas.delete("all")
-        
+    def create_circular_progress(self):
+        """创建圆形进度条"""
         # 绘制背景圆
         self.canvas.create_oval(20, 20, 180, 180, outline="#4a6fa5", width=15)
         
         # 绘制进度圆弧
-        extent = -self.scan_progress * 3.6
-        self.canvas.create_arc(
+        self.progress_arc = self.canvas.create_arc(
             20, 20, 180, 180,
             start=90,
-            extent=extent,
+            extent=0,
             outline="#5bc9d9",
             width=15,
             style="arc"
         )
         
         # 添加文字
-        self.canvas.create_text(
+        self.progress_text = self.canvas.create_text(
             100, 85,
-            text=f"{self.scan_progress}%",
+            text="0%",
             font=("Microsoft YaHei UI", 32, "bold"),
             fill="white"
         )
@@ -475,25 +569,146 @@ class CDriveCleaner(tk.Tk):
             font=("Microsoft YaHei UI", 14),
             fill="white"
         )
+        self.draw_circular_progress()
+    
+    def draw_circular_progress(self):
+        """按 scan_progress 更新圆形进度条"""
+        self.drawn_progress = self.scan_progress
+        self.canvas.itemconfig(self.progress_arc, extent=-self.scan_progress * 3.6)
+        self.canvas.itemconfig(self.progress_text, text=f"{self.scan_progress}%")
     
     def draw_chart(self):
-        """绘制图表"""
+        """按最近一次扫描绘制空间分布：上半按文件大小，下半按文件年龄，柱高为字节数"""
         self.chart_canvas.delete("all")
-        bars = [30, 50, 35, 60, 45, 70, 55, 40, 65, 50]
-        bar_width = 20
-        for i, height in enumerate(bars):
-            x = i * (bar_width + 4)
-            self.chart_canvas.create_rectangle(
-                x, 100 - height, x + bar_width, 100,
-                fill="#4a6fa5",
-                outline=""
+        insights = self.scan_insights
+        if insights is None:
+            self.chart_canvas.create_text(
+                120, 65, text="扫描后显示空间分布", font=("Microsoft YaHei UI", 9), fill="#c8d8e8"
             )
+            return
+        self.draw_histogram(0, "按大小", insights.size_groups())
+        self.draw_histogram(65, "按年龄", insights.age_groups())
+    
+    def draw_histogram(self, top, title, groups):
+        """在 chart_canvas 的 [top, top+65) 区域绘制一组 (标签, 文件数, 字节数) 柱状图"""
+        canvas = self.chart_canvas
+        canvas.create_text(0, top + 6, text=title, anchor="w", font=("Microsoft YaHei UI", 8), fill="#c8d8e8")
+        peak = max(size for _, _, size in groups) or 1
+        slot = 240 // len(groups)
+        bottom = top + 50
+        for i, (label, count, size) in enumerate(groups):
+            x = i * slot
+            height = int(36 * size / peak)
+            canvas.create_rectangle(x + 3, bottom - height, x + slot - 3, bottom, fill="#5b9dd9", outline="")
+            canvas.create_text(x + slot // 2, bottom + 7, text=label, font=("Microsoft YaHei UI", 7), fill="#c8d8e8")
+    
+    def show_largest_files(self):
+        """最大文件面板：最近一次扫描中最大的文件（扫描时用定长堆统计）"""
+        insights = self.scan_insights
+        if insights is None:
+            messagebox.showinfo("提示", "请先扫描！")
+            return
+        window = tk.Toplevel(self)
+        window.title("最大文件")
+        window.geometry("640x400")
+        window.configure(bg="#2d4a6f")
+        
+        scrollbar = tk.Scrollbar(window)
+        scrollbar.pack(side="right", fill="y")
+        listbox = tk.Listbox(
+            window,
+            font=("Consolas", 10),
+            bg="#1e2836",
+            fg="#c8d8e8",
+            relief="flat",
+            yscrollcommand=scrollbar.set
+        )
+        listbox.pack(fill="both", expand=True, padx=10, pady=10)
+        scrollbar.config(command=listbox.yview)
+        for path, size in insights.top_files():
+            listbox.insert("end", f"{size/(1024*1024):>10.2f}MB  {path}")
     
     def add_log(self, message):
-        """添加日志"""
-        self.log_text.config(state="normal")
+        """添加日志（任意线程均可调用，由界面刷新批量写入）"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert("end", f"[{timestamp}] {message}\n")
+        self.log_queue.append(f"[{timestamp}] {message}\n")
+        if self.file_log is not None:
+            self.file_log.info(message)
+    
+    def toggle_watch(self):
+        """开启/关闭实时统计"""
+        if not self.watch_var.get():
+            watcher, self.watcher = self.watcher, None
+            if watcher is not None:
+                threading.Thread(target=watcher.stop, daemon=True).start()
+                self.add_log("[监视] 已关闭实时统计")
+            return
+        
+        def on_change(files, size):
+            if watcher is not self.watcher:
+                return
+            self.temp_files_size = size / (1024**3)
+            self.temp_files_count = files
+            self.temp_estimate = None
+            self.temp_files_known = True
+        
+        watcher = self.watcher = JunkWatcher(self.get_junk_paths(), rules=self.rules, on_change=on_change)
+        try:
+            watcher.start()
+        except OSError as e:
+            self.watcher = None
+            self.watch_var.set(False)
+            self.add_log(f"[警告] 无法开启实时统计：{e}")
+            return
+        self.add_log("[监视] 已开启实时统计，完成一次基线枚举后临时文件卡片随文件变化更新")
+        
+        def report():
+            watcher.ready.wait()
+            if watcher is self.watcher and watcher.unwatched:
+                self.add_log(f"[警告] {watcher.unwatched} 个目录超出系统监视数量上限，其中的变化不会实时反映")
+        threading.Thread(target=report, daemon=True).start()
+    
+    def post_ui(self, func):
+        """把需要操作控件的调用交给界面线程，在下一次界面刷新时执行"""
+        self.ui_calls.append(func)
+    
+    def ui_tick(self):
+        """界面刷新（约 30Hz）
+        
+        工作线程只写进度属性、日志队列和 ui_calls，不直接操作控件；
+        这里统一批量写日志，并在数据变化时就地更新进度条和统计卡片。
+        """
+        # 先预约下一次刷新：下面的调用可能弹出模态对话框或抛出异常
+        self.after(UI_TICK_MS, self.ui_tick)
+        
+        # deque 的 append/popleft 线程安全，只有这里一个消费者
+        while self.ui_calls:
+            self.ui_calls.popleft()()
+        
+        if self.log_queue:
+            lines = []
+            while self.log_queue:
+                lines.append(self.log_queue.popleft())
+            self.append_log_lines(lines)
+        
+        if self.scan_progress != self.drawn_progress:
+            self.draw_circular_progress()
+        
+        stats_snapshot = (self.temp_files_size, self.temp_files_count, self.disk_used_gb, self.disk_free_gb)
+        if stats_snapshot != self.drawn_stats:
+            self.drawn_stats = stats_snapshot
+            self.update_stats_cards()
+    
+    def append_log_lines(self, lines):
+        """写入一批日志行，日志窗口按环形缓冲只保留最近 log_max_lines 行"""
+        lines = lines[-self.log_max_lines:]
+        self.log_text.config(state="normal")
+        self.log_text.insert("end", "".join(lines))
+        self.log_line_count += len(lines)
+        excess = self.log_line_count - self.log_max_lines
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_line_count -= excess
         self.log_text.see("end")
         self.log_text.config(state="disabled")
     
@@ -533,93 +748,82 @@ class CDriveCleaner(tk.Tk):
         """扫描线程"""
         self.is_scanning = True
         
-        # 使用新的垃圾路径函数
-        temp_paths = self.get_junk_paths()
-        
-        # 添加发现垃圾目录数量的日志
-        self.add_log(f"[扫描] 发现 {len(temp_paths)} 个垃圾目录")
-        
-        total_size = 0
-        file_count = 0
+        # 启动时的估计还没结束就等它完成，避免扫描结果被估计值覆盖
+        self.temp_thread.join()
+        
+        result = self.last_scan
+        watcher = self.watcher
+        if watcher is not None and watcher.ready.is_set():
+            # 实时统计维护的结果与扫描等价，不必再遍历
+            result = watcher.snapshot(self.memory_budget)
+            self.last_scan = result
+            self.add_log("[扫描] 使用实时统计维护的结果，不重新扫描")
+        elif result is not None and result.is_fresh():
+            self.add_log(f"[扫描] 复用 {int(result.age())} 秒前的扫描结果")
+        else:
+            # 使用新的垃圾路径函数
+            temp_paths = self.get_junk_paths()
+            
+            # 添加发现垃圾目录数量的日志
+            self.add_log(f"[扫描] 发现 {len(temp_paths)} 个垃圾目录")
+            
+            def on_progress(result):
+                # 更新进度
+                self.scan_progress = min(90, int((result.file_count / 1000) * 90))
+            
+            scanner = JunkScanner(
+                temp_paths,
+                on_root=lambda root: self.add_log(f"[扫描] 正在扫描: {root}"),
+                on_progress=on_progress,
+                progress_interval=50,
+                workers=self.scan_workers,
+                index=self.scan_index,
+                rules=self.rules,
+                memory_budget=self.memory_budget
+            )
+            result = scanner.scan()
+            self.last_scan = result
+            self.metrics.record_scan(result)
+            self.post_ui(self.update_metrics_label)
+            
+            if result.cached_dir_count:
+                self.add_log(f"[扫描] {result.cached_dir_count}/{result.dir_count} 个目录未变化，直接使用索引")
+            
+            for temp_path in result.errors:
+                if temp_path in temp_paths:
+                    self.add_log(f"[警告] 无法访问: {temp_path}")
         
-        for temp_path in temp_paths:
-            try:
-                if not os.path.exists(temp_path):
-                    continue
-                    
-                self.add_log(f"[扫描] 正在扫描: {temp_path}")
-                
-                # 针对不同类型设置不同的扫描深度
-                max_depth = 1
-                if 'Chrome' in temp_path or 'Firefox' in temp_path or 'Edge' in temp_path:
-                    max_depth = 3  # 浏览器缓存深度扫描
-                elif 'Recycle' in temp_path:
-                    max_depth = 2  # 回收站
-                elif 'Download' in temp_path or 'Prefetch' in temp_path:
-                    max_depth = 1  # Windows更新下载和预读取
-                elif 'Explorer' in temp_path:
-                    max_depth = 2  # 缩略图缓存
-                elif 'Windows.old' in temp_path:
-                    max_depth = 1  # Windows.old 文件夹
-                elif 'SoftwareDistribution' in temp_path:
-                    max_depth = 2  # Windows更新缓存
-                
-                for dirpath, dirnames, filenames in os.walk(temp_path):
-                    # 计算当前深度
-                    depth = dirpath[len(temp_path):].count(os.sep)
-                    if depth >= max_depth:
-                        dirnames.clear()
-                    
-                    for filename in filenames:
-                        try:
-                            filepath = os.path.join(dirpath, filename)
-                            size = os.path.getsize(filepath)
-                            total_size += size
-                            file_count += 1
-                            
-                            self.found_files.append({
-                                'path': filepath,
-                                'size': size,
-                                'name': filename
-                            })
-                            
-                            # 更新进度
-                            if file_count % 50 == 0:
-                                progress = min(90, int((file_count / 1000) * 90))
-                                self.scan_progress = progress
-                                self.after(0, self.draw_circular_progress)
-                                
-                            # 记录大文件
-                            if size > 5 * 1024 * 1024:  # 大于5MB
-                                self.after(0, lambda: self.add_log(f"[发现] {filename} ({size/(1024*1024):.2f}MB)"))
-                                
-                        except Exception as e:
-                            continue
-                        
-            except Exception as e:
-                self.after(0, lambda: self.add_log(f"[警告] 无法访问: {temp_path}"))
+        self.found_files = result.files
+        total_size = result.total_size
+        file_count = result.file_count
         
         # 更新临时文件大小和数量
         temp_gb = total_size / (1024**3)
         self.temp_files_size = temp_gb
         self.temp_files_count = file_count
-        self.after(0, self.create_stats_cards)
+        self.temp_estimate = None
+        self.temp_files_known = True
         
         # 完成扫描
         self.scan_progress = 100
-        self.after(0, self.draw_circular_progress)
         
-        self.after(0, lambda: self.add_log(f"[完成] 扫描完成！发现 {file_count} 个临时文件"))
-        self.after(0, lambda: self.add_log(f"[统计] 临时文件总大小: {temp_gb:.2f}GB"))
+        self.add_log(f"[完成] 扫描完成！发现 {file_count} 个临时文件")
+        self.add_log(f"[统计] 临时文件总大小: {temp_gb:.2f}GB")
+        
+        # 只记录最大的几个文件，完整列表见「最大文件」
+        self.scan_insights = result.insights
+        for path, size in result.insights.top_files(5):
+            self.add_log(f"[最大] {os.path.basename(path)} ({size/(1024*1024):.2f}MB)")
+        self.post_ui(self.draw_chart)
         
         # 更新扫描时间
         scan_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.after(0, lambda: self.scan_time_label.config(text=f"上次扫描：{scan_time}"))
+        self.post_ui(lambda: self.scan_time_label.config(text=f"上次扫描：{scan_time}"))
         
         # 启用清理按钮
-        self.after(0, lambda: self.clean_btn.config(state="normal"))
-        self.after(0, lambda: self.scan_btn.config(state="normal"))
-        self.after(0, lambda: self.scan_btn.config(text=f"可清理 {temp_gb:.1f}GB"))
+        self.post_ui(lambda: self.clean_btn.config(state="normal"))
+        self.post_ui(lambda: self.scan_btn.config(state="normal"))
+        self.post_ui(lambda: self.scan_btn.config(text=f"可清理 {temp_gb:.1f}GB"))
         
         self.is_scanning = False
     
@@ -629,119 +833,643 @@ class CDriveCleaner(tk.Tk):
             messagebox.showwarning("警告", "正在清理中，请稍候...")
             return
         
-        if not self.found_files:
+        if not self.found_files or self.last_scan is None:
             messagebox.showinfo("提示", "没有发现需要清理的文件，请先扫描！")
             return
         
+        if not self.last_scan.files.spilled:
+            # 在结果浏览器中勾选要清理的条目；分组和汇总在后台线程中计算
+            self.clean_btn.config(state="disabled")
+            result = self.last_scan
+            
+            def build():
+                tree = ResultTree(result)
+                self.post_ui(lambda: self.show_results(tree))
+            threading.Thread(target=build, daemon=True).start()
+            return
+        
+        # 结果已溢出到磁盘时不能逐项浏览，只能全部清理
+        self.add_log("[清理] 扫描结果较大，已溢出到磁盘，不能逐项选择")
         # 确认对话框
         result = messagebox.askyesno(
             "确认清理",
             f"发现 {len(self.found_files)} 个临时文件\n"
-            f"总大小约 {sum(f['size'] for f in self.found_files)/(1024**3):.2f}GB\n\n"
+            f"总大小约 {self.found_files.total_size/(1024**3):.2f}GB\n\n"
             "确定要清理这些文件吗？"
         )
         
         if not result:
             return
         
-        # 禁用按钮
-        self.clean_btn.config(state="disabled")
-        self.scan_btn.config(state="disabled")
-        
         self.add_log("[清理] 开始清理临时文件...")
+        self.begin_clean()
+    
+    def show_results(self, tree):
+        """结果浏览器：按根目录/目录分组，按大小或年龄排序，勾选要清理的条目
+        
+        Treeview 中只有当前可见的几十行，滚动时按 tree.row(i) 重新填充，
+        文件数量再多也不会为每个文件创建控件。
+        """
+        self.clean_btn.config(state="normal")
+        window = tk.Toplevel(self)
+        window.title("扫描结果")
+        window.geometry("860x560")
+        window.configure(bg="#2d4a6f")
+        state = {"offset": 0, "rows": 20}
+        
+        top_frame = tk.Frame(window, bg="#2d4a6f")
+        top_frame.pack(fill="x", padx=10, pady=(10, 0))
+        sort_var = tk.StringVar(value=tree.sort)
+        flat_var = tk.BooleanVar(value=False)
+        status = tk.Label(top_frame, font=("Microsoft YaHei UI", 9), bg="#2d4a6f", fg="#c8d8e8")
+        
+        body = tk.Frame(window, bg="#2d4a6f")
+        body.pack(fill="both", expand=True, padx=10, pady=10)
+        style = ttk.Style(window)
+        style.configure("Results.Treeview", rowheight=RESULT_ROW_HEIGHT)
+        view = ttk.Treeview(body, columns=("check", "size", "files", "age"), style="Results.Treeview",
+                            selectmode="browse")
+        view.heading("#0", text="路径")
+        view.heading("check", text="清理")
+        view.heading("size", text="大小")
+        view.heading("files", text="文件数")
+        view.heading("age", text="最旧")
+        view.column("#0", width=460)
+        view.column("check", width=50, anchor="center")
+        view.column("size", width=110, anchor="e")
+        view.column("files", width=80, anchor="e")
+        view.column("age", width=80, anchor="e")
+        scrollbar = tk.Scrollbar(body)
+        scrollbar.pack(side="right", fill="y")
+        view.pack(side="left", fill="both", expand=True)
+        
+        marks = {CHECKED: "☑", PARTIAL: "◪"}
+        now = time.time()
+        
+        def render():
+            total = len(tree)
+            rows = state["rows"]
+            state["offset"] = offset = max(0, min(state["offset"], total - rows))
+            view.delete(*view.get_children())
+            for i in range(offset, min(total, offset + rows)):
+                level, kind, key = tree.row(i)
+                files, size, oldest = tree.totals(kind, key)
+                label = tree.label(kind, key) if not (kind == FILE and tree.flat) else tree.store.path(key)
+                if kind != FILE:
+                    label = ("▾ " if tree.expanded(kind, key) else "▸ ") + label
+                view.insert("", "end", iid=str(i), text="    " * level + label, values=(
+                    marks.get(tree.check_state(kind, key), "☐"),
+                    f"{size/(1024**2):.2f}MB",
+                    files,
+                    f"{max(0, now - oldest)/86400:.0f} 天"
+                ))
+            if total:
+                scrollbar.set(offset / total, min(1.0, (offset + rows) / total))
+            else:
+                scrollbar.set(0, 1)
+            status.config(text=f"已选 {tree.checked_files} 个文件，{tree.checked_bytes/(1024**3):.2f}GB"
+                               f"（共 {len(tree.store)} 个）")
+        
+        def scroll_to(offset):
+            state["offset"] = int(offset)
+            render()
+        
+        def on_scrollbar(action, amount, unit=None):
+            if action == "moveto":
+                scroll_to(float(amount) * len(tree))
+            elif unit == "pages":
+                scroll_to(state["offset"] + int(amount) * state["rows"])
+            else:
+                scroll_to(state["offset"] + int(amount))
+        scrollbar.config(command=on_scrollbar)
+        
+        def on_wheel(event):
+            step = -3 if (event.num == 4 or getattr(event, "delta", 0) > 0) else 3
+            scroll_to(state["offset"] + step)
+            return "break"
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            view.bind(sequence, on_wheel)
+        
+        def on_resize(event):
+            rows = max(1, (event.height - RESULT_ROW_HEIGHT) // RESULT_ROW_HEIGHT)
+            if rows != state["rows"]:
+                state["rows"] = rows
+                render()
+        view.bind("<Configure>", on_resize)
+        
+        def on_click(event):
+            iid = view.identify_row(event.y)
+            if not iid:
+                return
+            _, kind, key = tree.row(int(iid))
+            if view.identify_column(event.x) == "#1":
+                tree.toggle_check(kind, key)
+                render()
+                return "break"
+            if kind != FILE and view.identify_column(event.x) == "#0":
+                tree.toggle_expand(kind, key)
+                render()
+                return "break"
+        view.bind("<Button-1>", on_click)
+        
+        def on_key(event):
+            moves = {"Up": -1, "Down": 1, "Prior": -state["rows"], "Next": state["rows"]}
+            if event.keysym in moves:
+                scroll_to(state["offset"] + moves[event.keysym])
+                return "break"
+        view.bind("<Key>", on_key)
+        
+        def apply_view(sort, flat):
+            tree.set_sort(sort)
+            tree.set_flat(flat)
+            state["offset"] = 0
+            render()
+        
+        def change_view():
+            sort, flat = sort_var.get(), flat_var.get()
+            if not flat:
+                apply_view(sort, flat)
+                return
+            # 全部文件的排序下标较慢，在后台线程中算好再切换
+            status.config(text="正在排序...")
+            
+            def prepare():
+                tree.sorted_all(sort)
+                self.post_ui(lambda: apply_view(sort, flat))
+            threading.Thread(target=prepare, daemon=True).start()
+        
+        for text, value in (("按大小", SORT_SIZE), ("按年龄", SORT_AGE)):
+            tk.Radiobutton(
+                top_frame, text=text, value=value, variable=sort_var, command=change_view,
+                font=("Microsoft YaHei UI", 9), bg="#2d4a6f", fg="white", selectcolor="#1e2836",
+                activebackground="#2d4a6f", activeforeground="white"
+            ).pack(side="left")
+        tk.Checkbutton(
+            top_frame, text="平铺全部文件", variable=flat_var, command=change_view,
+            font=("Microsoft YaHei UI", 9), bg="#2d4a6f", fg="white", selectcolor="#1e2836",
+            activebackground="#2d4a6f", activeforeground="white"
+        ).pack(side="left", padx=(10, 0))
+        for text, value in (("全选", True), ("全不选", False)):
+            tk.Button(
+                top_frame, text=text, font=("Microsoft YaHei UI", 9), bg="#5b9dd9", fg="white",
+                relief="flat", cursor="hand2",
+                command=lambda value=value: (tree.set_all(value), render())
+            ).pack(side="left", padx=(10, 0))
+        status.pack(side="right")
+        
+        def clean_selected():
+            if not tree.checked_files:
+                messagebox.showinfo("提示", "没有勾选要清理的文件", parent=window)
+                return
+            if not messagebox.askyesno(
+                "确认清理",
+                f"清理勾选的 {tree.checked_files} 个文件\n"
+                f"总大小约 {tree.checked_bytes/(1024**3):.2f}GB\n\n"
+                "确定要清理这些文件吗？",
+                parent=window
+            ):
+                return
+            # 回收站根目录有未勾选的文件时不清空回收站，否则未勾选的文件也会被删除
+            empty_bin = all(tree.root_checked(root) for root in tree.result.roots if is_recycle_bin(root))
+            window.destroy()
+            self.add_log(f"[清理] 开始清理勾选的 {tree.checked_files} 个临时文件...")
+            self.begin_clean(result=tree.selection(), empty_bin=empty_bin)
+        
+        tk.Button(
+            window,
+            text="清理所选",
+            font=("Microsoft YaHei UI", 11, "bold"),
+            bg="#5b9dd9",
+            fg="white",
+            relief="flat",
+            cursor="hand2",
+            command=clean_selected
+        ).pack(pady=(0, 10))
+        render()
+    
+    def begin_clean(self, pending=None, result=None, empty_bin=True):
+        """启动清理线程；pending 为要继续的清理日志，result 为要清理的扫描结果（默认为最近一次扫描）
+        
+        empty_bin 为 False 时清理完成后不清空回收站（回收站中有未勾选的文件）。
+        清理期间「开始扫描」变为暂停/继续，「立即清理」变为取消清理。
+        """
+        self.is_cleaning = True
+        self.clean_control = CleanControl()
+        self.scan_btn.config(text="暂停", command=self.toggle_pause_clean, state="normal")
+        self.clean_btn.config(text="取消清理", command=self.cancel_clean, state="normal")
         
         # 在新线程中执行清理
-        thread = threading.Thread(target=self.clean_thread)
+        thread = threading.Thread(target=self.clean_thread, args=(pending, result, empty_bin))
         thread.daemon = True
         thread.start()
     
-    def clean_thread(self):
-        """清理线程"""
-        self.is_cleaning = True
-        
-        # 停止Windows Update服务
-        self.add_log("[准备] 正在停止Windows Update服务...")
-        self.stop_wuauserv()
-        self.add_log("[准备] Windows Update服务已停止")
-        
-        cleaned_count = 0
-        cleaned_size = 0
-        failed_count = 0
-        
-        for file_info in self.found_files:
+    def toggle_pause_clean(self):
+        """暂停/继续清理"""
+        control = self.clean_control
+        if control is None:
+            return
+        if control.paused:
+            control.resume()
+            self.scan_btn.config(text="暂停")
+            self.add_log("[清理] 继续清理")
+        else:
+            control.pause()
+            self.scan_btn.config(text="继续")
+            self.add_log("[清理] 已暂停")
+    
+    def cancel_clean(self):
+        """取消清理，已完成的进度保存在清理日志中"""
+        if self.clean_control is None:
+            return
+        self.clean_control.cancel()
+        self.scan_btn.config(state="disabled")
+        self.clean_btn.config(state="disabled")
+        self.add_log("[清理] 正在取消...")
+    
+    def reset_clean_buttons(self):
+        self.scan_btn.config(text="开始扫描", command=self.start_scan, state="normal")
+        self.clean_btn.config(text="立即清理", command=self.clean_now, state="disabled")
+    
+    def clean_thread(self, pending=None, result=None, empty_bin=True):
+        """清理线程；pending 不为 None 时按上次的清理日志继续，不重新扫描
+        
+        清理出错时记录日志；无论成败都会恢复 Windows Update 服务和按钮。
+        """
+        if result is None:
+            result = self.last_scan
+        journal = pending
+        cancelled = False
+        finished = False
+        manage_service = os.name == 'nt'  # 只有 Windows 上需要停止 Windows Update 服务
+        try:
+            if journal is None:
+                try:
+                    journal = CleanJournal.create()
+                except OSError:
+                    # 数据目录不可写时照常清理，只是中断后无法继续
+                    self.add_log("[警告] 无法写入清理日志，中断后需要重新扫描")
+                else:
+                    if not empty_bin:
+                        journal.keep_recycle_bin()
+            else:
+                empty_bin = not journal.recycle_bin_kept
+            
+            # 停止Windows Update服务
+            if manage_service:
+                self.add_log("[准备] 正在停止Windows Update服务...")
+                self.stop_wuauserv()
+                if journal is not None:
+                    journal.service_state(True)  # 程序被关闭时，下次启动据此恢复服务
+                self.add_log("[准备] Windows Update服务已停止")
+            
+            def on_cleaned(filepath, size):
+                if size > 10 * 1024 * 1024:  # 大于10MB的文件记录
+                    self.add_log(f"[已清理] {os.path.basename(filepath)} ({size/(1024*1024):.2f}MB)")
+            
+            quarantined = pending is None and self.quarantine is not None and self.quarantine_var.get()
             try:
-                filepath = file_info['path']
-                size = file_info['size']
-                
-                if os.path.exists(filepath):
-                    # 使用安全删除方法
-                    if self.safe_remove(filepath):
-                        cleaned_count += 1
-                        cleaned_size += size
-                        
-                        if size > 10 * 1024 * 1024:  # 大于10MB的文件记录
-                            self.add_log(f"[已清理] {file_info['name']} ({size/(1024*1024):.2f}MB)")
+                if quarantined:
+                    # 整棵移入隔离区，真正的删除留给后台 purge
+                    stats, _ = self.quarantine.stage(result, on_cleaned=on_cleaned, rules=self.rules)
+                elif pending is None:
+                    # 完整扫描过的子树按目录遍历删除扫描到的文件，其余文件逐个安全删除
+                    stats = clean_files(
+                        result,
+                        on_cleaned=on_cleaned,
+                        workers=self.clean_workers,
+                        max_ops_per_sec=self.clean_max_ops,
+                        max_bytes_per_sec=self.clean_max_bytes,
+                        metrics=self.metrics,
+                        control=self.clean_control,
+                        journal=journal,
+                        rules=self.rules
+                    )
+                else:
+                    stats = resume_clean(
+                        pending,
+                        on_cleaned=on_cleaned,
+                        workers=self.clean_workers,
+                        max_ops_per_sec=self.clean_max_ops,
+                        max_bytes_per_sec=self.clean_max_bytes,
+                        metrics=self.metrics,
+                        control=self.clean_control,
+                        rules=self.rules
+                    )
+            except CleanCancelled as e:
+                stats = e.stats
+                cancelled = True
+            finished = not cancelled
+            self.post_ui(self.update_metrics_label)
+            cleaned_count = stats.cleaned_count
+            cleaned_size = stats.cleaned_size
+            failed_count = stats.failed_count
+            
+            # 清理完成
+            self.cleaned_size = cleaned_size / (1024**3)
+            
+            if cancelled:
+                self.add_log(f"[取消] 清理已取消，下次启动可从中断处继续")
+            else:
+                self.add_log(f"[完成] 清理完成！")
+            self.add_log(f"[统计] 成功清理 {cleaned_count} 个文件")
+            if quarantined:
+                self.add_log(f"[隔离] {self.cleaned_size:.2f}GB 已移入隔离区，"
+                             f"{self.quarantine.retention_hours} 小时内可在「隔离区」恢复，之后在后台释放")
+            else:
+                self.add_log(f"[统计] 释放空间: {self.cleaned_size:.2f}GB")
+            if failed_count > 0:
+                self.add_log(f"[警告] {failed_count} 个文件清理失败（可能正在使用）")
+            
+            if not cancelled and not quarantined and empty_bin:
+                # 清空回收站
+                if self.empty_recycle_bin():
+                    self.add_log("[核弹] 已清空回收站")
+        except Exception as e:
+            self.add_log(f"[错误] 清理失败: {e}")
+            self.post_ui(lambda: messagebox.showerror("清理失败", str(e)))
+            return
+        finally:
+            # 更新磁盘信息
+            self.update_disk_info()
+            
+            # 清空已找到的文件列表，之前的扫描结果也随之失效
+            self.found_files = []
+            self.last_scan = None
+            
+            # 启动Windows Update服务
+            if manage_service:
+                self.add_log("[结束] 正在启动Windows Update服务...")
+                self.start_wuauserv()
+            if journal is not None:
+                try:
+                    if manage_service:
+                        journal.service_state(False)
+                    if finished:
+                        journal.finish()
                     else:
-                        failed_count += 1
-                        
-            except Exception as e:
-                failed_count += 1
-        
-        # 清理完成
-        self.cleaned_size = cleaned_size / (1024**3)
-        
-        self.add_log(f"[完成] 清理完成！")
-        self.add_log(f"[统计] 成功清理 {cleaned_count} 个文件")
-        self.add_log(f"[统计] 释放空间: {self.cleaned_size:.2f}GB")
-        if failed_count > 0:
-            self.add_log(f"[警告] {failed_count} 个文件清理失败（可能正在使用）")
+                        journal.close()  # 保留日志供下次继续
+                except OSError:
+                    pass
+            if manage_service:
+                self.add_log("[结束] Windows Update服务已启动")
+            
+            # 恢复按钮
+            self.clean_control = None
+            self.post_ui(self.reset_clean_buttons)
+            
+            self.is_cleaning = False
         
-        # 更新磁盘信息
+        # 显示完成消息
+        title = "清理已取消" if cancelled else "清理完成"
+        self.post_ui(lambda: messagebox.showinfo(
+            title,
+            f"成功清理 {cleaned_count} 个文件\n释放空间: {self.cleaned_size:.2f}GB"
+        ))
+    
+    def check_pending_clean(self):
+        """上次清理没有完成（程序被关闭或取消）时，在后台恢复现场"""
+        journal = CleanJournal.open_pending()
+        if journal is None:
+            return
+        thread = threading.Thread(target=self.recover_clean_thread, args=(journal,))
+        thread.daemon = True
+        thread.start()
+    
+    def recover_clean_thread(self, journal):
+        """重新启动被停止的 Windows Update 服务，再询问是否继续清理"""
+        if journal.service_stopped:
+            self.add_log("[恢复] 上次清理中断时 Windows Update 服务未恢复，正在启动...")
+            self.start_wuauserv()
+            journal.service_state(False)
+            self.add_log("[恢复] Windows Update服务已启动")
+        if journal.resumable:
+            self.post_ui(lambda: self.ask_resume_clean(journal))
+        else:
+            journal.finish()
+    
+    def ask_resume_clean(self, journal):
+        if self.is_cleaning:
+            journal.close()
+            return
+        plan = journal.plan
+        dirs_left = len(plan["subtrees"]) - journal.done_subtrees
+        files_left = plan["file_count"] - journal.done_files
+        started = datetime.fromtimestamp(plan["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        if messagebox.askyesno(
+            "继续清理",
+            f"{started} 开始的清理没有完成\n"
+            f"还剩 {dirs_left} 个目录和 {files_left} 个文件未处理\n\n"
+            "是否继续清理（不需要重新扫描）？"
+        ):
+            self.add_log("[清理] 从上次中断处继续清理...")
+            self.begin_clean(journal)
+        else:
+            journal.finish()
+
+    def start_find_duplicates(self):
+        """在下载文件夹中查找重复文件"""
+        if self.is_scanning or self.is_cleaning:
+            messagebox.showwarning("警告", "正在扫描或清理中，请稍候...")
+            return
+        roots = get_duplicate_roots(self.get_junk_paths())
+        if not roots:
+            messagebox.showinfo("提示", "没有找到下载文件夹")
+            return
+        self.add_log("[查重] 正在查找下载文件夹中的重复文件...")
+        thread = threading.Thread(target=self.find_duplicates_thread, args=(roots,))
+        thread.daemon = True
+        thread.start()
+    
+    def find_duplicates_thread(self, roots):
+        """查重线程：复用新鲜的扫描结果，否则只扫描下载文件夹"""
+        result = self.last_scan
+        if result is not None and result.is_fresh():
+            files = files_under(result.files, roots)
+        else:
+            files = JunkScanner(roots, workers=self.scan_workers, index=self.scan_index, rules=self.rules).scan().files
+        report = find_duplicates(files, workers=self.clean_workers)
+        self.add_log(f"[查重] 发现 {len(report.groups)} 组重复文件，可释放 {report.wasted/(1024*1024):.1f}MB")
+        if report.total_bytes:
+            self.add_log(f"[查重] 完整读取 {report.full_hashed_bytes/(1024*1024):.1f}MB，"
+                         f"占 {report.full_hashed_bytes*100/report.total_bytes:.1f}%")
+        if report.groups:
+            self.post_ui(lambda: self.show_duplicates(report))
+    
+    def show_duplicates(self, report):
+        """重复文件面板：每组列出保留的文件和将删除的副本"""
+        window = tk.Toplevel(self)
+        window.title("重复文件")
+        window.geometry("720x440")
+        window.configure(bg="#2d4a6f")
+        
+        list_frame = tk.Frame(window, bg="#2d4a6f")
+        list_frame.pack(fill="both", expand=True, padx=10, pady=(10, 0))
+        scrollbar = tk.Scrollbar(list_frame)
+        scrollbar.pack(side="right", fill="y")
+        listbox = tk.Listbox(
+            list_frame,
+            font=("Consolas", 10),
+            bg="#1e2836",
+            fg="#c8d8e8",
+            relief="flat",
+            yscrollcommand=scrollbar.set
+        )
+        listbox.pack(side="left", fill="both", expand=True)
+        scrollbar.config(command=listbox.yview)
+        for group in report.groups:
+            listbox.insert("end", f"保留 {group.keep} ({group.size/(1024*1024):.2f}MB)")
+            for path in group.removable:
+                listbox.insert("end", f"    删除 {path}")
+        
+        def remove():
+            if not messagebox.askyesno(
+                "确认删除",
+                f"删除 {len(report.removable_files())} 个重复副本，释放约 {report.wasted/(1024*1024):.1f}MB？",
+                parent=window
+            ):
+                return
+            window.destroy()
+            thread = threading.Thread(target=self.remove_duplicates_thread, args=(report,))
+            thread.daemon = True
+            thread.start()
+        
+        tk.Button(
+            window,
+            text=f"删除重复副本（{report.wasted/(1024*1024):.1f}MB）",
+            font=("Microsoft YaHei UI", 11, "bold"),
+            bg="#5b9dd9",
+            fg="white",
+            relief="flat",
+            cursor="hand2",
+            command=remove
+        ).pack(pady=10)
+    
+    def remove_duplicates_thread(self, report):
+        stats = remove_files(
+            report.removable_files(),
+            workers=self.clean_workers,
+            max_ops_per_sec=self.clean_max_ops,
+            max_bytes_per_sec=self.clean_max_bytes,
+            metrics=self.metrics
+        )
+        self.invalidate_scan()
+        self.add_log(f"[查重] 已删除 {stats.cleaned_count} 个重复副本，释放 {stats.cleaned_size/(1024*1024):.1f}MB")
+        if stats.failed_count:
+            self.add_log(f"[警告] {stats.failed_count} 个文件删除失败（可能正在使用）")
         self.update_disk_info()
-        self.after(0, self.create_stats_cards)
-        
-        # 清空已找到的文件列表
+        self.post_ui(self.update_metrics_label)
+    
+    def invalidate_scan(self):
+        """文件已变化，之前的扫描结果不再可用：清空结果并禁用「立即清理」"""
         self.found_files = []
+        self.last_scan = None
+        self.post_ui(lambda: self.clean_btn.config(state="disabled"))
+    
+    def start_quarantine_purge(self, expired_only=True):
+        """后台以最低 CPU/I/O 优先级删除隔离区中的文件（默认只删除已过保留期的）"""
+        if self.quarantine is None:
+            return
         
-        # 启动Windows Update服务
-        self.add_log("[结束] 正在启动Windows Update服务...")
-        self.start_wuauserv()
-        self.add_log("[结束] Windows Update服务已启动")
-        
-        # 清空回收站
-        self.empty_recycle_bin()
-        self.add_log("[核弹] 已清空回收站")
-        
-        # 重新启用按钮
-        self.after(0, lambda: self.scan_btn.config(state="normal"))
+        def on_done(stats):
+            if stats.cleaned_count:
+                self.add_log(f"[隔离] 已从隔离区释放 {stats.cleaned_count} 个文件，{stats.cleaned_size/(1024**3):.2f}GB")
+                self.update_disk_info()
         
-        self.is_cleaning = False
+        self.quarantine.purge_in_background(expired_only, on_done)
+    
+    def show_quarantine(self):
+        """隔离区面板：列出各批次，可恢复或立即释放"""
+        if self.quarantine is None:
+            messagebox.showinfo("提示", "隔离区不可用（无法写入数据目录）")
+            return
+        batches = self.quarantine.batches()
+        if not batches:
+            messagebox.showinfo("提示", "隔离区为空")
+            return
+        window = tk.Toplevel(self)
+        window.title("隔离区")
+        window.geometry("640x360")
+        window.configure(bg="#2d4a6f")
         
-        # 显示完成消息
-        self.after(0, lambda: messagebox.showinfo(
-            "清理完成",
-            f"成功清理 {cleaned_count} 个文件\n释放空间: {self.cleaned_size:.2f}GB"
-        ))
-
-    def empty_recycle_bin(self):
-        """清空回收站"""
+        listbox = tk.Listbox(
+            window,
+            font=("Consolas", 10),
+            bg="#1e2836",
+            fg="#c8d8e8",
+            relief="flat"
+        )
+        listbox.pack(fill="both", expand=True, padx=10, pady=(10, 0))
+        for batch in batches:
+            created = datetime.fromtimestamp(batch.created_at).strftime("%Y-%m-%d %H:%M")
+            expires = datetime.fromtimestamp(batch.expires_at).strftime("%m-%d %H:%M")
+            listbox.insert("end", f"{created}  {batch.file_count:>8} 个文件  "
+                                  f"{batch.total_size/(1024**2):>10.1f}MB  到期 {expires}")
+        
+        def restore():
+            selection = listbox.curselection()
+            if not selection:
+                return
+            batch = batches[selection[0]]
+            window.destroy()
+            thread = threading.Thread(target=self.restore_quarantine_thread, args=(batch,))
+            thread.daemon = True
+            thread.start()
+        
+        def purge_now():
+            if not messagebox.askyesno("确认释放", "立即删除隔离区中的全部文件？删除后无法恢复。", parent=window):
+                return
+            window.destroy()
+            self.add_log("[隔离] 正在后台释放隔离区...")
+            self.start_quarantine_purge(expired_only=False)
+        
+        btn_frame = tk.Frame(window, bg="#2d4a6f")
+        btn_frame.pack(pady=10)
+        for text, command in (("恢复所选", restore), ("立即释放全部", purge_now)):
+            tk.Button(
+                btn_frame,
+                text=text,
+                font=("Microsoft YaHei UI", 10),
+                bg="#5b9dd9",
+                fg="white",
+                relief="flat",
+                cursor="hand2",
+                command=command
+            ).pack(side="left", padx=10)
+    
+    def restore_quarantine_thread(self, batch):
+        restored, failed = self.quarantine.restore(batch)
+        self.invalidate_scan()
+        self.add_log(f"[隔离] 已恢复 {restored} 项")
+        for path in failed[:20]:
+            self.add_log(f"[警告] 无法恢复（原位置已存在或被占用）: {path}")
+    
+    def update_metrics_label(self):
+        lines = self.metrics.summary_lines()
+        self.metrics_label.config(text="\n".join(lines[:6]) if lines else "指标：未扫描")
+    
+    def export_metrics(self):
+        """导出指标：.prom 为 Prometheus 文本格式，.json 为 JSON"""
+        path = filedialog.asksaveasfilename(
+            title="导出指标",
+            defaultextension=".prom",
+            filetypes=[("Prometheus 文本", "*.prom"), ("JSON", "*.json")]
+        )
+        if not path:
+            return
         try:
-            # SHEmptyRecycleBinW = 0 (清空所有盘符)
-            ctypes.windll.shell32.SHEmptyRecycleBinW(None, None, 0)
-        except:
-            pass
+            self.metrics.export(path)
+        except OSError as e:
+            messagebox.showerror("导出失败", str(e))
+            return
+        self.add_log(f"[指标] 已导出到 {path}")
+    
+    def empty_recycle_bin(self):
+        """清空回收站，返回是否成功"""
+        return empty_recycle_bin()
 
     def safe_remove(self, path):
         """安全删除文件"""
-        try:
-            if os.path.isfile(path):
-                os.chmod(path, 0o777)  # 解除只读
-                os.remove(path)
-                return True
-        except Exception as e:
-            # 文件被占用就跳过
-            pass
-        return False
+        return safe_remove(path)
 
 if __name__ == "__main__":
     app = CDriveCleaner()
@@ -0,0 +1,279 @@
+"""扫描/清理热路径指标：按根目录汇总，可导出为 Prometheus 文本或 JSON
+
+扫描计数由扫描引擎按目录汇总到 RootStats（始终开启，每个目录几次整数加法），
+这里只在扫描结束后读取。删除延迟需要在每次 unlink 前后取时间，只有把
+Metrics 传给清理函数时才计时；不传（metrics=None）时删除路径上只多一次
+判断。
+"""
+import json
+import os
+import threading
+import time
+
+# 删除延迟直方图：第 i 个桶为 <= 2**i 微秒，最后一个桶收容更慢的删除
+LATENCY_BUCKETS = 24
+
+
+class LatencyHistogram:
+    """以 2 的幂微秒分桶的延迟直方图"""
+
+    def __init__(self):
+        self.counts = [0] * (LATENCY_BUCKETS + 1)
+        self.total_seconds = 0.0
+
+    def observe(self, seconds):
+        us = int(seconds * 1e6)
+        bucket = (us - 1).bit_length() if us > 1 else 0
+        self.counts[bucket if bucket < LATENCY_BUCKETS else LATENCY_BUCKETS] += 1
+        self.total_seconds += seconds
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.total_seconds += other.total_seconds
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        """按桶上界估算分位数（秒），没有数据时返回 None"""
+        total = self.count
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return (2 ** i) / 1e6
+        return (2 ** LATENCY_BUCKETS) / 1e6
+
+    def buckets(self):
+        """返回 [(上界秒数或 None 表示 +Inf, 累计次数)]"""
+        result = []
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            result.append(((2 ** i) / 1e6 if i < LATENCY_BUCKETS else None, seen))
+        return result
+
+
+class RootMetrics:
+    """单个根目录的指标"""
+
+    def __init__(self, root):
+        self.root = root
+        # 扫描
+        self.scan_seconds = 0.0
+        self.scan_files = 0
+        self.scan_bytes = 0
+        self.scan_dirs = 0
+        self.entries = 0
+        self.stat_calls = 0
+        self.scan_errors = 0
+        self.permission_errors = 0
+        # 删除
+        self.deleted_files = 0
+        self.deleted_bytes = 0
+        self.delete_failures = 0
+        self.delete_started_at = None  # time.perf_counter()
+        self.delete_finished_at = None
+        self.delete_latency = LatencyHistogram()
+
+    @property
+    def delete_seconds(self):
+        if self.delete_started_at is None:
+            return 0.0
+        return self.delete_finished_at - self.delete_started_at
+
+    def to_dict(self):
+        return {
+            "root": self.root,
+            "scan": {
+                "seconds": round(self.scan_seconds, 6),
+                "files": self.scan_files,
+                "bytes": self.scan_bytes,
+                "dirs": self.scan_dirs,
+                "entries": self.entries,
+                "stat_calls": self.stat_calls,
+                "errors": self.scan_errors,
+                "permission_errors": self.permission_errors,
+            },
+            "delete": {
+                "seconds": round(self.delete_seconds, 6),
+                "files": self.deleted_files,
+                "bytes": self.deleted_bytes,
+                "failures": self.delete_failures,
+                "latency_seconds_sum": round(self.delete_latency.total_seconds, 6),
+                "latency_buckets": [
+                    ["+Inf" if le is None else le, n] for le, n in self.delete_latency.buckets()
+                ],
+            },
+        }
+
+
+class _DeleteBatch:
+    """一个删除批次的本地计数，批次结束时由 Metrics.merge_batch 加锁并入"""
+
+    def __init__(self, metrics):
+        self._root_for = metrics.root_for
+        self.roots = {}  # 根目录 -> [成功数, 字节数, 失败数, LatencyHistogram, 开始, 结束]
+
+    def record(self, path, size, started, finished, removed):
+        """started/finished 为这次 unlink 前后的 time.perf_counter()"""
+        root = self._root_for(path)
+        entry = self.roots.get(root)
+        if entry is None:
+            entry = self.roots[root] = [0, 0, 0, LatencyHistogram(), started, finished]
+        if removed:
+            entry[0] += 1
+            entry[1] += size or 0
+        elif removed is False:
+            entry[2] += 1
+        entry[3].observe(finished - started)
+        entry[5] = finished
+
+
+class Metrics:
+    """一次运行的指标集合，线程安全"""
+
+    def __init__(self):
+        self.roots = {}
+        self._lock = threading.Lock()
+        self._root_cache = {}  # 目录 -> 所属根目录
+        self._root_paths = ()  # 已登记的根目录快照，删除线程只读
+        self.created_at = time.time()
+
+    def _get(self, root):
+        metrics = self.roots.get(root)
+        if metrics is None:
+            metrics = self.roots[root] = RootMetrics(root)
+            if root != "other":
+                self._root_paths = tuple(self._root_paths) + (root,)
+                self._root_cache = {}
+        return metrics
+
+    def register_roots(self, roots):
+        """预先登记根目录，删除时据此把文件归到各自的根目录"""
+        with self._lock:
+            for root in roots:
+                self._get(root)
+
+    def root_for(self, path):
+        """文件所属的根目录（最长前缀匹配），不属于任何根目录时返回 "other" """
+        dirpath = os.path.dirname(path)
+        root = self._root_cache.get(dirpath)
+        if root is None:
+            root = "other"
+            best = -1
+            for candidate in self._root_paths:
+                if len(candidate) > best and (
+                    path == candidate or path.startswith(candidate.rstrip("\\/") + os.sep)
+                ):
+                    root, best = candidate, len(candidate)
+            self._root_cache[dirpath] = root
+        return root
+
+    def record_scan(self, result):
+        """从 ScanResult 读取每个根目录的扫描计数"""
+        with self._lock:
+            for stats in result.root_stats.values():
+                m = self._get(stats.root)
+                m.scan_seconds = stats.seconds
+                m.scan_files = stats.file_count
+                m.scan_bytes = stats.total_size
+                m.scan_dirs = stats.dir_count
+                m.entries = stats.entry_count
+                m.stat_calls = stats.stat_calls
+                m.scan_errors = stats.error_count
+                m.permission_errors = stats.permission_errors
+
+    def new_batch(self):
+        return _DeleteBatch(self)
+
+    def merge_batch(self, batch):
+        with self._lock:
+            for root, (files, size, failures, latency, started, finished) in batch.roots.items():
+                m = self._get(root)
+                m.deleted_files += files
+                m.deleted_bytes += size
+                m.delete_failures += failures
+                m.delete_latency.merge(latency)
+                if m.delete_started_at is None or started < m.delete_started_at:
+                    m.delete_started_at = started
+                if m.delete_finished_at is None or finished > m.delete_finished_at:
+                    m.delete_finished_at = finished
+
+    def to_dict(self):
+        with self._lock:
+            return {"created_at": self.created_at, "roots": [m.to_dict() for m in self.roots.values()]}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """Prometheus 文本格式（可交给 node_exporter 的 textfile 收集器）"""
+        with self._lock:
+            roots = list(self.roots.values())
+        lines = []
+
+        def metric(name, kind, help_text, value_of):
+            lines.append(f"# HELP cdrive_cleaner_{name} {help_text}")
+            lines.append(f"# TYPE cdrive_cleaner_{name} {kind}")
+            for m in roots:
+                lines.append(f'cdrive_cleaner_{name}{{root="{_escape_label(m.root)}"}} {value_of(m)}')
+
+        metric("scan_seconds", "gauge", "Wall time of the last scan per root.", lambda m: f"{m.scan_seconds:.6f}")
+        metric("scan_entries_total", "counter", "Directory entries enumerated.", lambda m: m.entries)
+        metric("scan_stat_calls_total", "counter", "stat system calls issued while scanning.",
+               lambda m: m.stat_calls)
+        metric("scan_permission_errors_total", "counter", "Permission errors while scanning.",
+               lambda m: m.permission_errors)
+        metric("scan_errors_total", "counter", "Unreadable directories and files while scanning.",
+               lambda m: m.scan_errors)
+        metric("scan_files", "gauge", "Junk files found.", lambda m: m.scan_files)
+        metric("scan_bytes", "gauge", "Bytes in junk files found.", lambda m: m.scan_bytes)
+        metric("delete_seconds", "gauge", "Wall time spent deleting per root.",
+               lambda m: f"{m.delete_seconds:.6f}")
+        metric("deleted_files_total", "counter", "Files deleted.", lambda m: m.deleted_files)
+        metric("deleted_bytes_total", "counter", "Bytes freed.", lambda m: m.deleted_bytes)
+        metric("delete_failures_total", "counter", "Files that could not be deleted.", lambda m: m.delete_failures)
+
+        lines.append("# HELP cdrive_cleaner_delete_latency_seconds Latency of a single unlink.")
+        lines.append("# TYPE cdrive_cleaner_delete_latency_seconds histogram")
+        for m in roots:
+            label = _escape_label(m.root)
+            for le, n in m.delete_latency.buckets():
+                bound = "+Inf" if le is None else repr(le)
+                lines.append(f'cdrive_cleaner_delete_latency_seconds_bucket{{root="{label}",le="{bound}"}} {n}')
+            lines.append(f'cdrive_cleaner_delete_latency_seconds_sum{{root="{label}"}} '
+                         f'{m.delete_latency.total_seconds:.6f}')
+            lines.append(f'cdrive_cleaner_delete_latency_seconds_count{{root="{label}"}} {m.delete_latency.count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """按扩展名导出：.json 为 JSON，其余为 Prometheus 文本"""
+        text = self.to_json() + "\n" if path.lower().endswith(".json") else self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def summary_lines(self):
+        """系统信息面板中每个根目录一行的摘要"""
+        lines = []
+        with self._lock:
+            roots = list(self.roots.values())
+        for m in roots:
+            name = os.path.basename(m.root.rstrip("\\/")) or m.root
+            line = f"{name}: 扫描 {m.scan_seconds:.2f}s {m.entries}项 stat {m.stat_calls}"
+            if m.permission_errors:
+                line += f" 拒绝 {m.permission_errors}"
+            p99 = m.delete_latency.quantile(0.99)
+            if p99 is not None:
+                line += f" | 删除 {m.deleted_files}个 p99 {p99 * 1000:.1f}ms"
+            lines.append(line)
+        return lines
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
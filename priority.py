@@ -0,0 +1,86 @@
+"""降低 CPU 和 I/O 优先级，后台删除时不影响前台程序
+
+Windows 用线程后台模式（THREAD_MODE_BACKGROUND_BEGIN，同时降低 CPU、
+I/O 和内存优先级）；Linux 用 setpriority 和 ioprio_set（IDLE 类，只在
+磁盘空闲时得到 I/O）。其他系统上 nice 按进程生效，只能降低整个进程。
+都是尽力而为，失败时照常以普通优先级运行。
+"""
+import os
+import platform
+import sys
+import threading
+
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+PROCESS_MODE_BACKGROUND_BEGIN = 0x00100000
+
+# ioprio_set 的系统调用号（各架构不同，Python 没有封装）
+_IOPRIO_SET = {
+    "x86_64": 251, "amd64": 251, "i386": 289, "i686": 289,
+    "aarch64": 30, "arm64": 30, "armv7l": 314, "ppc64le": 273,
+}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+
+# 后台线程的 nice 值（Linux 上 nice 按线程生效）
+BACKGROUND_NICE = 19
+
+
+def _set_idle_ioprio(tid):
+    number = _IOPRIO_SET.get(platform.machine().lower())
+    if number is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.syscall(number, IOPRIO_WHO_PROCESS, tid, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) == 0
+    except (OSError, AttributeError):
+        return False
+
+
+def lower_process_priority():
+    """把整个进程切换为最低的 CPU 和 I/O 优先级，返回是否至少有一项成功
+
+    Linux 上 nice 和 I/O 优先级按线程生效，新线程继承创建者的设置，
+    因此应在启动其他线程之前由主线程调用。
+    """
+    if os.name == 'nt':
+        try:
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            return bool(kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), PROCESS_MODE_BACKGROUND_BEGIN))
+        except (OSError, AttributeError):
+            return False
+    if not sys.platform.startswith("linux"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, 0, BACKGROUND_NICE)
+            return True
+        except (OSError, AttributeError):
+            return False
+    return lower_thread_priority()
+
+
+def lower_thread_priority():
+    """把调用线程切换为最低的 CPU 和 I/O 优先级，返回是否至少有一项成功
+
+    之后由该线程创建的线程在 Linux 上继承同样的优先级。只有 Linux 上
+    线程 id 可以交给 setpriority（其他系统上它不是 pid，可能改到别的进程），
+    其他系统返回 False。
+    """
+    if os.name == 'nt':
+        try:
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN))
+        except (OSError, AttributeError):
+            return False
+    if not sys.platform.startswith("linux"):
+        return False
+    tid = threading.get_native_id()
+    ok = False
+    try:
+        os.setpriority(os.PRIO_PROCESS, tid, BACKGROUND_NICE)
+        ok = True
+    except (OSError, AttributeError):
+        pass
+    return _set_idle_ioprio(tid) or ok
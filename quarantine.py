@@ -0,0 +1,358 @@
+"""隔离模式：把垃圾移到同一卷上的隔离区，保留一段时间可恢复，之后在后台删除
+
+完整扫描过的子树整棵重命名（一次 rename，与其中文件数量无关），根目录
+本身不移动，改为逐个移动其中的条目；其余文件逐个重命名。移动完成即
+视为清理完成，真正的删除由 purge 以最低 I/O 优先级在后台进行。
+
+与数据目录同卷的条目放在数据目录的 quarantine 下，其他卷放在该卷挂载点
+下的 .cdrive_cleaner_quarantine 中；两处都不可用时（跨卷、没有写权限）
+照常直接删除。每批的清单为数据目录下的 <批次>.jsonl，首行为批次信息，
+之后每移动一项追加一行，中途被关闭也不会丢失已移动条目的记录。
+"""
+import json
+import os
+import threading
+import time
+
+from appdata import get_app_data_dir
+from cleaner import CleanStats, remove_files, remove_tree, subtree_limits
+from priority import lower_thread_priority
+from rules import RESERVED_DIRNAME
+
+QUARANTINE_DIRNAME = "quarantine"
+
+# 其他卷上的隔离区目录名（位于该卷挂载点下，扫描时总是跳过）
+VOLUME_DIRNAME = RESERVED_DIRNAME
+
+# 默认保留时间（小时），过期后才会被 purge 删除
+DEFAULT_RETENTION_HOURS = 24
+
+MANIFEST_VERSION = 1
+
+
+def _mount_point(path):
+    """path 所在卷的挂载点（Windows 上为盘符根目录）"""
+    path = os.path.abspath(path)
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+class QuarantineBatch:
+    """一次隔离清理：items 为 [{"from": 原路径, "to": 隔离区中的路径, "files": 文件数, "bytes": 字节数}]"""
+
+    def __init__(self, batch_id, manifest, created_at, expires_at, items):
+        self.id = batch_id
+        self.manifest = manifest
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.items = items
+
+    @property
+    def file_count(self):
+        return sum(item["files"] for item in self.items)
+
+    @property
+    def total_size(self):
+        return sum(item["bytes"] for item in self.items)
+
+    def expired(self, now=None):
+        return (time.time() if now is None else now) >= self.expires_at
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at,
+            "items": len(self.items),
+            "files": self.file_count,
+            "bytes": self.total_size,
+        }
+
+
+class _Stager:
+    """一批条目的移动：按卷分配隔离目录，逐项追加清单"""
+
+    def __init__(self, quarantine, batch_id, manifest):
+        self.quarantine = quarantine
+        self.batch_id = batch_id
+        self.manifest = manifest
+        self.home_dev = os.stat(quarantine.path).st_dev
+        self.targets = {}  # st_dev -> 本批在该卷上的隔离目录，不可用时为 None
+        self.next_id = 0
+
+    def _target_dir(self, path):
+        try:
+            dev = os.lstat(os.path.dirname(path)).st_dev
+        except OSError:
+            return None
+        if dev in self.targets:
+            return self.targets[dev]
+        if dev == self.home_dev:
+            base = self.quarantine.path
+        else:
+            base = os.path.join(_mount_point(path), VOLUME_DIRNAME)
+        target = os.path.join(base, self.batch_id)
+        try:
+            os.makedirs(target, exist_ok=True)
+            if os.stat(target).st_dev != dev:
+                target = None
+        except OSError:
+            target = None
+        self.targets[dev] = target
+        return target
+
+    def move(self, path, files, size):
+        """把 path 移入隔离区，返回是否成功"""
+        target = self._target_dir(path)
+        if target is None:
+            return False
+        stored = os.path.join(target, str(self.next_id))
+        try:
+            os.rename(path, stored)
+        except OSError:
+            return False
+        self.next_id += 1
+        self.manifest.write(json.dumps({"from": path, "to": stored, "files": files, "bytes": size}) + "\n")
+        self.manifest.flush()
+        return True
+
+
+def _units(result):
+    """把扫描结果分成移动单位：[(路径, 是否目录, 扫描到的文件数, 字节数)]
+
+    非根目录的完整子树整棵为一个单位；完整扫描过的根目录中，扫描到的
+    子目录各为一个单位，其余文件逐个为单位。扫描之后才出现在根目录中的
+    条目不在结果中，保持原样。
+    """
+    roots = set(result.roots)
+    units = {}
+    complete_roots = set()
+    for dirpath, is_root in result.complete_subtrees():
+        if is_root:
+            complete_roots.add(dirpath)
+        else:
+            units[dirpath] = [True, 0, 0]
+    if complete_roots:
+        for dirpath in result.files.dirs:
+            if dirpath not in complete_roots and os.path.dirname(dirpath) in complete_roots:
+                units[dirpath] = [True, 0, 0]
+
+    loose = []
+    dir_unit = {}  # 目录编号 -> 所属单位路径（None 为不在任何整棵移动的单位中）
+    dirs = result.files.dirs
+    for dir_id, path, size in result.files.items():
+        unit = dir_unit.get(dir_id, "")
+        if unit == "":
+            unit = None
+            p = dirs[dir_id]
+            while True:
+                if p in units:
+                    unit = p
+                    break
+                parent = os.path.dirname(p)
+                if p in roots or parent == p:
+                    break
+                p = parent
+            dir_unit[dir_id] = unit
+        if unit is None:
+            loose.append((path, size))
+        else:
+            counts = units[unit]
+            counts[1] += 1
+            counts[2] += size
+    return [(path, is_dir, files, size) for path, (is_dir, files, size) in units.items()], loose
+
+
+class Quarantine:
+    def __init__(self, path=None, retention_hours=DEFAULT_RETENTION_HOURS):
+        self.path = path or os.path.join(get_app_data_dir(), QUARANTINE_DIRNAME)
+        self.retention_hours = retention_hours
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.Lock()  # 恢复与后台 purge 不同时处理同一批
+
+    def _new_batch_id(self):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        n = 0
+        while True:
+            batch_id = f"{stamp}-{n}"
+            if not os.path.exists(os.path.join(self.path, batch_id + ".jsonl")):
+                return batch_id
+            n += 1
+
+    def stage(self, result, on_cleaned=None, rules=None):
+        """把一次扫描（ScanResult）找到的全部文件移入隔离区，返回 (CleanStats, QuarantineBatch)
+
+        移动成功的单位按扫描时的文件数和大小计入统计；无法移动的照常删除，
+        与 clean_files 一样只删除扫描到的文件（溢出的结果按 rules 重新判断）。
+        on_cleaned(path, size) 对每个移走的单位（整个目录时 size 为其中文件的总大小）回调。
+        """
+        stats = CleanStats()
+        units, loose = _units(result)
+        batch_id = self._new_batch_id()
+        created_at = time.time()
+        expires_at = created_at + self.retention_hours * 3600
+        manifest_path = os.path.join(self.path, batch_id + ".jsonl")
+        with open(manifest_path, "w", encoding="utf-8") as manifest:
+            manifest.write(json.dumps({"version": MANIFEST_VERSION, "id": batch_id,
+                                       "created_at": created_at, "expires_at": expires_at}) + "\n")
+            stager = _Stager(self, batch_id, manifest)
+            failed_dirs = []
+            failed_files = []
+            for path, is_dir, files, size in units:
+                if stager.move(path, files, size):
+                    if files:
+                        stats.add_cleaned(size, files)
+                        if on_cleaned:
+                            on_cleaned(path, size)
+                elif is_dir:
+                    failed_dirs.append(path)
+                else:
+                    failed_files.append((path, size))
+            for path, size in loose:
+                if stager.move(path, 1, size):
+                    stats.add_cleaned(size)
+                    if on_cleaned:
+                        on_cleaned(path, size)
+                else:
+                    failed_files.append((path, size))
+
+        # 移不走的（跨卷、被占用等）直接删除
+        if failed_dirs:
+            expected, rule_filter = subtree_limits(result, rules)
+            for path in failed_dirs:
+                stats.merge(remove_tree(path, expected=expected, rule_filter=rule_filter, on_cleaned=on_cleaned))
+        if failed_files:
+            stats.merge(remove_files(failed_files, on_cleaned=on_cleaned))
+        stats.finished_at = time.time()
+        return stats, self._load(manifest_path)
+
+    def _load(self, manifest_path):
+        batch_id = os.path.basename(manifest_path)[:-len(".jsonl")]
+        items = []
+        header = None
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        continue  # 写到一半被中断的行
+                    if header is None:
+                        header = data
+                    else:
+                        items.append(data)
+        except OSError:
+            return None
+        if header is None or header.get("version") != MANIFEST_VERSION:
+            return None
+        return QuarantineBatch(batch_id, manifest_path, header["created_at"], header["expires_at"], items)
+
+    def batches(self):
+        """隔离区中的全部批次，按时间从早到晚"""
+        batches = []
+        for name in sorted(os.listdir(self.path)):
+            if name.endswith(".jsonl"):
+                batch = self._load(os.path.join(self.path, name))
+                if batch is not None:
+                    batches.append(batch)
+        return batches
+
+    def get(self, batch_id):
+        return self._load(os.path.join(self.path, batch_id + ".jsonl"))
+
+    def restore(self, batch):
+        """把一批移回原位置，返回 (恢复的单位数, 失败的原路径列表)
+
+        原位置已有同名条目（如程序已重新创建缓存目录）时不覆盖，留在隔离区。
+        """
+        restored = 0
+        failed = []
+        remaining = []
+        with self._lock:
+            for item in batch.items:
+                source, stored = item["from"], item["to"]
+                try:
+                    if os.path.lexists(source):
+                        raise FileExistsError(source)
+                    os.makedirs(os.path.dirname(source), exist_ok=True)
+                    os.rename(stored, source)
+                    restored += 1
+                except FileNotFoundError:
+                    if os.path.lexists(stored):
+                        failed.append(source)
+                        remaining.append(item)
+                except OSError:
+                    failed.append(source)
+                    remaining.append(item)
+            self._rewrite(batch, remaining)
+        return restored, failed
+
+    def _rewrite(self, batch, items):
+        """只保留 items 的清单，没有剩余条目时删除整批"""
+        targets = {os.path.dirname(item["to"]) for item in batch.items}
+        batch.items = items
+        if not items:
+            self._drop(batch, targets)
+            return
+        tmp = batch.manifest + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": MANIFEST_VERSION, "id": batch.id,
+                                "created_at": batch.created_at, "expires_at": batch.expires_at}) + "\n")
+            for item in items:
+                f.write(json.dumps(item) + "\n")
+        os.replace(tmp, batch.manifest)
+
+    def _drop(self, batch, targets):
+        """删除批次的清单和各卷上已清空的隔离目录"""
+        for target in targets | {os.path.join(self.path, batch.id)}:
+            try:
+                os.rmdir(target)
+            except OSError:
+                pass
+        try:
+            os.unlink(batch.manifest)
+        except OSError:
+            pass
+
+    def purge(self, expired_only=True, now=None, max_ops_per_sec=None, max_bytes_per_sec=None):
+        """删除隔离区中的批次（默认只删除已过保留期的），返回按实际大小计数的 CleanStats"""
+        stats = CleanStats()
+        for batch in self.batches():
+            if expired_only and not batch.expired(now):
+                continue
+            with self._lock:
+                stored_dirs = set()
+                for item in batch.items:
+                    stored = item["to"]
+                    stored_dirs.add(os.path.dirname(stored))
+                    if os.path.isdir(stored) and not os.path.islink(stored):
+                        stats.merge(remove_tree(stored, max_ops_per_sec=max_ops_per_sec,
+                                                max_bytes_per_sec=max_bytes_per_sec))
+                    else:
+                        try:
+                            size = os.lstat(stored).st_size
+                        except OSError:
+                            continue
+                        stats.merge(remove_files([(stored, size)], workers=1,
+                                                 max_ops_per_sec=max_ops_per_sec,
+                                                 max_bytes_per_sec=max_bytes_per_sec))
+                remaining = [item for item in batch.items if os.path.lexists(item["to"])]
+                self._rewrite(batch, remaining)
+        stats.finished_at = time.time()
+        return stats
+
+    def purge_in_background(self, expired_only=True, on_done=None):
+        """在后台线程中以最低 CPU/I/O 优先级 purge，完成后在该线程中回调 on_done(CleanStats)"""
+        def run():
+            lower_thread_priority()
+            stats = self.purge(expired_only)
+            if on_done is not None:
+                on_done(stats)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
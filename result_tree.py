@@ -0,0 +1,328 @@
+"""扫描结果浏览的数据模型：按根目录和目录分组、按大小或年龄排序、逐项勾选
+
+不依赖 Tk。界面只向模型要当前可见的几十行（row(i)），模型本身也不为
+每个文件创建对象：文件按目录分组后只是 FileStore 中的下标，展开的目录
+在行表中只占一段（起点、长度），排序下标在第一次需要时整体计算并缓存。
+勾选状态为每个文件一个字节，目录和根目录的勾选数随勾选增量维护。
+
+只支持未溢出到磁盘的结果（需要按下标访问 FileStore）。
+"""
+import bisect
+import os
+import time
+from array import array
+
+from scanner import ScanResult
+
+# 排序方式
+SORT_SIZE = "size"  # 从大到小
+SORT_AGE = "age"  # 从旧到新
+
+# 行类型
+ROOT = "root"
+DIR = "dir"
+FILE = "file"
+
+# 勾选状态
+CHECKED = 2
+PARTIAL = 1
+UNCHECKED = 0
+
+
+class ResultTree:
+    """ScanResult 的分组视图
+
+    根目录 → 含有结果文件的目录（相对根目录的路径，平铺） → 文件。
+    """
+
+    def __init__(self, result, sort=SORT_SIZE):
+        store = result.files
+        if store.spilled:
+            raise ValueError("扫描结果已溢出到磁盘，不能按下标浏览")
+        self.result = result
+        self.store = store
+        self.sort = sort
+        starts, order = store.group_by_dir()
+        self._starts = starts
+        self._order = order  # 按目录分组的文件下标
+        self._checked = bytearray(b"\1" * len(store.sizes))  # 默认全部勾选，与清理全部一致
+
+        # 每个目录的文件数、字节数和最旧文件的 mtime
+        dir_count = len(store.dirs)
+        self.dir_files = array('q', (starts[d + 1] - starts[d] for d in range(dir_count)))
+        self.dir_bytes = array('q', bytes(8 * dir_count))
+        self.dir_oldest = array('q', [2**62] * dir_count)
+        sizes, mtimes = store.sizes, store.mtimes
+        for i, dir_id in enumerate(store.dir_ids):
+            self.dir_bytes[dir_id] += sizes[i]
+            if mtimes[i] < self.dir_oldest[dir_id]:
+                self.dir_oldest[dir_id] = mtimes[i]
+        self.dir_checked = array('q', self.dir_files)  # 每个目录中勾选的文件数
+
+        # 目录归属：向上找到的第一个根目录；根目录本身是文件时归到它所在的目录
+        roots = set(result.roots)
+        self.groups = []  # [分组路径]
+        self.group_dirs = []  # 每个分组中有文件的目录编号
+        group_index = {}
+        owner = {}
+        for dir_id, dirpath in enumerate(store.dirs):
+            if not self.dir_files[dir_id]:
+                continue
+            path = dirpath
+            group = None
+            while True:
+                if path in owner:
+                    group = owner[path]
+                    break
+                if path in roots:
+                    group = path
+                    break
+                parent = os.path.dirname(path)
+                if parent == path:
+                    break
+                path = parent
+            if group is None:
+                group = dirpath
+            owner[dirpath] = group
+            g = group_index.get(group)
+            if g is None:
+                g = group_index[group] = len(self.groups)
+                self.groups.append(group)
+                self.group_dirs.append([])
+            self.group_dirs[g].append(dir_id)
+        self.group_files = [sum(self.dir_files[d] for d in dirs) for dirs in self.group_dirs]
+        self.group_bytes = [sum(self.dir_bytes[d] for d in dirs) for dirs in self.group_dirs]
+        self.group_checked = list(self.group_files)
+        self.checked_files = len(store.sizes)
+        self.checked_bytes = store.total_size
+
+        self._dir_group = {}
+        for g, dirs in enumerate(self.group_dirs):
+            for d in dirs:
+                self._dir_group[d] = g
+        self._expanded_groups = set()
+        self._expanded_dirs = set()
+        self._sorted_files = {}  # (目录编号, 排序方式) -> 排好序的文件下标
+        self._sorted_dirs = {}  # 排序方式 -> (分组顺序, [各分组的目录顺序])
+        self._sorted_all = {}  # 排序方式 -> 全部文件排好序的下标（平铺视图）
+        self.flat = False  # 平铺视图：不分组，全部文件一起排序
+        self._segments = None
+        self._segment_starts = None
+
+    # 排序
+
+    def set_sort(self, sort):
+        if sort != self.sort:
+            self.sort = sort
+            self._segments = None
+
+    def set_flat(self, flat):
+        if flat != self.flat:
+            self.flat = flat
+            self._segments = None
+
+    def _sort_key(self, column):
+        """按当前排序方式比较某一列的 key：大小从大到小，年龄从旧到新"""
+        if self.sort == SORT_SIZE:
+            return lambda i: -column[i]
+        return column.__getitem__
+
+    def _dir_orders(self):
+        orders = self._sorted_dirs.get(self.sort)
+        if orders is None:
+            if self.sort == SORT_SIZE:
+                group_key = self._sort_key(self.group_bytes)
+            else:
+                group_key = lambda g: min(self.dir_oldest[d] for d in self.group_dirs[g])
+            dir_key = self._sort_key(self.dir_bytes if self.sort == SORT_SIZE else self.dir_oldest)
+            orders = self._sorted_dirs[self.sort] = (
+                sorted(range(len(self.groups)), key=group_key),
+                [sorted(dirs, key=dir_key) for dirs in self.group_dirs],
+            )
+        return orders
+
+    def _files_of(self, dir_id):
+        """目录中按当前方式排好序的文件下标（展开时才计算，结果缓存）"""
+        key = (dir_id, self.sort)
+        files = self._sorted_files.get(key)
+        if files is None:
+            files = self._order[self._starts[dir_id]:self._starts[dir_id + 1]]
+            column = self.store.sizes if self.sort == SORT_SIZE else self.store.mtimes
+            files = array('q', sorted(files, key=self._sort_key(column)))
+            self._sorted_files[key] = files
+        return files
+
+    def sorted_all(self, sort=None):
+        """全部文件按 sort 排好序的下标，第一次调用时计算（文件很多时较慢，可在后台线程中预先调用）"""
+        sort = sort or self.sort
+        files = self._sorted_all.get(sort)
+        if files is None:
+            store = self.store
+            if sort == SORT_SIZE:
+                files = sorted(range(len(store.sizes)), key=store.sizes.__getitem__, reverse=True)
+            else:
+                files = sorted(range(len(store.mtimes)), key=store.mtimes.__getitem__)
+            files = self._sorted_all[sort] = array('q', files)
+        return files
+
+    # 展开/折叠
+
+    def toggle_expand(self, kind, key):
+        expanded = self._expanded_groups if kind == ROOT else self._expanded_dirs
+        if kind == FILE:
+            return
+        if key in expanded:
+            expanded.discard(key)
+        else:
+            expanded.add(key)
+        self._segments = None
+
+    def expanded(self, kind, key):
+        return key in (self._expanded_groups if kind == ROOT else self._expanded_dirs)
+
+    def _build(self):
+        """行表：[(层级, 类型, 键, 长度)]，展开的目录中的文件为一段"""
+        segments = []
+        if self.flat:
+            segments.append((0, FILE, None, len(self._checked)))
+        group_order, dir_orders = self._dir_orders() if not self.flat else ((), ())
+        for g in group_order:
+            segments.append((0, ROOT, g, 1))
+            if g not in self._expanded_groups:
+                continue
+            for d in dir_orders[g]:
+                segments.append((1, DIR, d, 1))
+                if d in self._expanded_dirs:
+                    segments.append((2, FILE, d, self.dir_files[d]))
+        starts = array('q', [0])
+        for segment in segments:
+            starts.append(starts[-1] + segment[3])
+        self._segments = segments
+        self._segment_starts = starts
+
+    def __len__(self):
+        if self._segments is None:
+            self._build()
+        return self._segment_starts[-1]
+
+    def row(self, i):
+        """第 i 行：(层级, 类型, 键)，文件行的键为 FileStore 下标，目录行为目录编号，根目录行为分组编号"""
+        if self._segments is None:
+            self._build()
+        s = bisect.bisect_right(self._segment_starts, i) - 1
+        level, kind, key, _ = self._segments[s]
+        if kind == FILE:
+            files = self.sorted_all() if key is None else self._files_of(key)
+            return level, kind, files[i - self._segment_starts[s]]
+        return level, kind, key
+
+    def find(self, kind, key):
+        """某个根目录或目录所在的行号，不可见时返回 None"""
+        if self._segments is None:
+            self._build()
+        for s, segment in enumerate(self._segments):
+            if segment[1] == kind and segment[2] == key:
+                return self._segment_starts[s]
+        return None
+
+    # 显示
+
+    def label(self, kind, key):
+        store = self.store
+        if kind == ROOT:
+            return self.groups[key]
+        if kind == DIR:
+            group = self.groups[self._dir_group[key]]
+            rel = os.path.relpath(store.dirs[key], group) if store.dirs[key] != group else "."
+            return rel
+        return store.name(key)
+
+    def totals(self, kind, key):
+        """(文件数, 字节数, 最旧文件的 mtime)"""
+        if kind == ROOT:
+            dirs = self.group_dirs[key]
+            return self.group_files[key], self.group_bytes[key], min(self.dir_oldest[d] for d in dirs)
+        if kind == DIR:
+            return self.dir_files[key], self.dir_bytes[key], self.dir_oldest[key]
+        return 1, self.store.sizes[key], self.store.mtimes[key]
+
+    def root_checked(self, root):
+        """根目录下的文件是否全部勾选（没有文件的根目录视为全部勾选）"""
+        for g, path in enumerate(self.groups):
+            if path == root:
+                return self.group_checked[g] == self.group_files[g]
+        return True
+
+    def check_state(self, kind, key):
+        if kind == FILE:
+            return CHECKED if self._checked[key] else UNCHECKED
+        if kind == ROOT:
+            checked, total = self.group_checked[key], self.group_files[key]
+        else:
+            checked, total = self.dir_checked[key], self.dir_files[key]
+        if checked == total:
+            return CHECKED
+        return UNCHECKED if checked == 0 else PARTIAL
+
+    # 勾选
+
+    def _set_file(self, i, value):
+        if self._checked[i] == value:
+            return
+        self._checked[i] = value
+        dir_id = self.store.dir_ids[i]
+        delta = 1 if value else -1
+        self.dir_checked[dir_id] += delta
+        self.group_checked[self._dir_group[dir_id]] += delta
+        self.checked_files += delta
+        self.checked_bytes += delta * self.store.sizes[i]
+
+    def _set_dir(self, dir_id, value):
+        for i in self._order[self._starts[dir_id]:self._starts[dir_id + 1]]:
+            self._set_file(i, value)
+
+    def toggle_check(self, kind, key):
+        """切换勾选：部分勾选的目录和根目录变为全部勾选"""
+        value = 0 if self.check_state(kind, key) == CHECKED else 1
+        if kind == FILE:
+            self._set_file(key, value)
+        elif kind == DIR:
+            self._set_dir(key, value)
+        else:
+            for d in self.group_dirs[key]:
+                self._set_dir(d, value)
+
+    def set_all(self, value):
+        n = len(self._checked)
+        self._checked[:] = (b"\1" if value else b"\0") * n
+        self.dir_checked = array('q', self.dir_files) if value else array('q', bytes(8 * len(self.dir_files)))
+        self.group_checked = list(self.group_files) if value else [0] * len(self.group_files)
+        self.checked_files = n if value else 0
+        self.checked_bytes = self.store.total_size if value else 0
+
+    # 清理
+
+    def selection(self):
+        """只含勾选文件的 ScanResult，可直接交给 clean_files / Quarantine.stage
+
+        全部勾选时返回原结果；有未勾选的文件时，所在目录标记为不完整，
+        清理时不会整棵删除，未勾选的文件保持原样。
+        """
+        result = self.result
+        if self.checked_files == len(self._checked):
+            return result
+        store = self.store
+        selected = ScanResult(result.roots)
+        selected.partial_dirs = set(result.partial_dirs)
+        for dir_id, dirpath in enumerate(store.dirs):
+            new_id = selected.add_dir(dirpath)
+            if self.dir_checked[dir_id] != self.dir_files[dir_id]:
+                selected.partial_dirs.add(dirpath)
+            for i in self._order[self._starts[dir_id]:self._starts[dir_id + 1]]:
+                if self._checked[i]:
+                    selected.add_file(new_id, store.name(i), store.sizes[i], store.mtimes[i])
+        selected.dir_count = result.dir_count
+        selected.root_stats = result.root_stats
+        selected.started_at = result.started_at
+        selected.finished_at = time.time()
+        return selected
@@ -0,0 +1,173 @@
+"""垃圾根目录：各平台的根目录来源，以及去重、去嵌套的规范化
+
+每个平台一个 RootProvider，available() 为真的来源都会参与，新平台或
+额外的目录来源用 register_provider 加入。候选目录经 normalize_roots
+处理后才交给扫描引擎：同一目录只保留一次，位于另一根目录之下的根目录
+被丢弃，否则其中的文件会被重复遍历、重复计数。
+"""
+import os
+import sys
+
+from browsers import browser_cache_dirs
+
+# 路径 trie 中标记「此处是一个根目录」的键（不会与路径分量冲突）
+_ROOT = ""
+
+
+def _components(path):
+    """规范化后的路径分量；Windows 上不区分大小写，盘符根目录为第一个分量"""
+    path = os.path.normcase(os.path.abspath(path))
+    drive, rest = os.path.splitdrive(path)
+    return [drive or os.sep] + [part for part in rest.split(os.sep) if part]
+
+
+def normalize_roots(paths):
+    """去掉重复和嵌套的根目录，保持原有顺序和写法
+
+    把每个路径按分量插入 trie：途中遇到已有的根目录说明它被包含，丢弃；
+    自己成为根目录时，其下已插入的更深的根目录都被包含，一并丢弃。
+    被丢弃的根目录按外层根目录的规则（扫描深度等）扫描。
+    """
+    trie = {}
+    kept = []  # [(路径, 对应的 trie 节点)]
+    for path in paths:
+        node = trie
+        nested = False
+        for part in _components(path):
+            if _ROOT in node:
+                nested = True
+                break
+            node = node.setdefault(part, {})
+        if nested or _ROOT in node:
+            continue
+        node.clear()
+        node[_ROOT] = path
+        kept.append((path, node))
+    # 后来的外层根目录会清空其下的子树，仍在 trie 中的才保留
+    alive = set()
+    stack = [trie]
+    while stack:
+        node = stack.pop()
+        if _ROOT in node:
+            alive.add(id(node))
+        else:
+            stack.extend(node.values())
+    return [path for path, node in kept if id(node) in alive]
+
+
+def is_recycle_bin(path):
+    """是否为某个盘符的回收站根目录（empty_recycle_bin 会把它整个清空）"""
+    name = path.replace("\\", "/").rstrip("/").rsplit("/", 1)[-1]
+    return name.lower() == "$recycle.bin"
+
+
+class RootProvider:
+    """一个平台的垃圾根目录来源"""
+
+    name = ""
+
+    def available(self):
+        """当前系统是否适用"""
+        return False
+
+    def candidates(self):
+        """候选根目录（可能不存在、可能重复）"""
+        return []
+
+
+class WindowsProvider(RootProvider):
+    """系统更新缓存、转储、临时目录、回收站和下载目录（按体积排序）"""
+
+    name = "windows"
+
+    def available(self):
+        return os.name == 'nt'
+
+    def candidates(self):
+        paths = []
+
+        # 1. Windows Update 缓存（最大头目，动辄 5-15GB）
+        paths.append(r"C:\Windows\SoftwareDistribution\Download")
+
+        # 2. 旧版系统升级残留（Win10→Win11 后留下的 Windows.old，20-40GB）
+        paths.append(r"C:\Windows.old")
+
+        # 3. 系统错误转储 + 内存 dump（单文件 1-8GB）
+        paths.append(r"C:\Windows\Minidump")
+        paths.append(r"C:\Windows\Memory.dmp")
+
+        # 4. 升级日志 + 安装缓存
+        paths.append(r"C:\Windows\Logs")
+        paths.append(r"C:\Windows\Panther")
+        paths.append(r"C:\Windows\Temp")
+        paths.append(r"C:\Windows\Prefetch")
+
+        # 5. 磁盘清理向导的隐藏缓存
+        paths.append(r"C:\Windows\ServiceProfiles\LocalService\AppData\Local\Microsoft\Windows\DeliveryOptimization\Cache")
+
+        # 6. 用户临时目录（浏览器缓存由 BrowserProvider 按配置文件发现）
+        userprof = os.getenv("USERPROFILE") or os.path.expanduser("~")
+        paths.append(os.path.join(userprof, r"AppData\Local\Temp"))
+
+        # 7. 回收站（所有盘符）
+        for drive in "CDEFG":
+            paths.append(f"{drive}:\\$Recycle.Bin")
+
+        # 8. 用户下载临时包（微信/QQ/钉钉）
+        paths.append(os.path.join(userprof, r"Downloads"))
+        return paths
+
+
+class LinuxProvider(RootProvider):
+    """用户缓存、临时目录、journald 归档日志、apt 软件包缓存和回收站
+
+    /var 下的目录通常需要 root 权限才能删除，普通用户运行时删除失败的
+    文件计入失败数，不影响其他目录。
+    """
+
+    name = "linux"
+
+    def available(self):
+        return sys.platform.startswith("linux")
+
+    def candidates(self):
+        home = os.path.expanduser("~")
+        cache = os.getenv("XDG_CACHE_HOME") or os.path.join(home, ".cache")
+        data = os.getenv("XDG_DATA_HOME") or os.path.join(home, ".local", "share")
+        return [
+            cache,
+            "/var/cache/apt/archives",  # 已安装过的 .deb 包
+            "/var/log/journal",  # 只清理轮转后的归档日志，见内置规则
+            "/var/tmp",
+            "/tmp",
+            os.path.join(data, "Trash"),
+        ]
+
+
+class BrowserProvider(RootProvider):
+    """各浏览器全部配置文件的缓存目录，见 browsers.py"""
+
+    name = "browsers"
+
+    def available(self):
+        return os.name == 'nt' or sys.platform.startswith("linux")
+
+    def candidates(self):
+        return browser_cache_dirs()
+
+
+PROVIDERS = [WindowsProvider(), BrowserProvider(), LinuxProvider()]
+
+
+def register_provider(provider):
+    """加入一个根目录来源，排在已有来源之后"""
+    PROVIDERS.append(provider)
+
+
+def get_junk_paths(providers=None):
+    """当前系统所有能删的垃圾根目录：存在的候选目录，已去重、去嵌套"""
+    paths = []
+    for provider in PROVIDERS if providers is None else providers:
+        if provider.available():
+            paths.extend(provider.candidates())
+    return normalize_roots(p for p in paths if os.path.exists(p))
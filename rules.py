@@ -0,0 +1,241 @@
+"""清理规则：每个垃圾根目录的扫描深度、包含/排除通配符、最小文件年龄和大小
+
+规则文件为 JSON（Python 3.11+ 也可用 TOML），放在数据目录下的 rules.json /
+rules.toml 中，或由 --rules 指定：
+
+    {"rules": [
+        {"root": "*Chrome*", "max_depth": 3, "exclude": ["Network", "*.lock"]},
+        {"root": "*\\\\Downloads", "max_depth": 1, "include": ["*.exe", "*.msi", "*.zip"],
+         "min_age_days": 30, "min_size": 1048576}
+    ]}
+
+root 为匹配扫描根目录完整路径的通配符，支持 %LOCALAPPDATA% 等环境变量，
+按顺序取第一条匹配的规则，都不匹配时只扫描一层。include/exclude 中不含
+路径分隔符的通配符匹配文件名（排除时也匹配目录名），含分隔符的匹配相对
+根目录、以 / 分隔的路径。被排除的目录不会进入。
+
+所有通配符在加载时编译为一个合并的正则表达式，扫描时对每个 DirEntry
+只做一次正则匹配，年龄和大小取自枚举时已有的 stat 结果，不产生额外
+系统调用。
+"""
+import copy
+import fnmatch
+import json
+import os
+import re
+import time
+
+from appdata import get_app_data_dir
+
+RULES_FILENAMES = ("rules.toml", "rules.json")
+
+# 其他卷上隔离区的目录名（见 quarantine.py）。卷的挂载点本身可能就在垃圾
+# 根目录中（如单独挂载的 /tmp），任何规则下扫描、估计、监视和删除都不进入，
+# 隔离中的条目在保留期内不会被当作垃圾删除
+RESERVED_DIRNAME = ".cdrive_cleaner_quarantine"
+
+# Linux 临时目录中不能删除的条目
+_TMP_EXCLUDE = [".X11-unix", ".ICE-unix", ".XIM-unix", ".font-unix", "systemd-private-*", "snap-private-tmp",
+                "*.sock", "*.socket", "*.lock", "*.pid"]
+
+# 内置规则，与此前按目录名判断扫描深度的逻辑一致
+DEFAULT_RULES = [
+    {"root": "*Chrome*", "max_depth": 3},  # 浏览器缓存深度扫描
+    {"root": "*Firefox*", "max_depth": 3},
+    {"root": "*Edge*", "max_depth": 3},
+    {"root": "*Cache_Data", "max_depth": 3},  # 其他 Chromium 系浏览器（browsers.py 发现的缓存目录）
+    {"root": "*Code Cache", "max_depth": 3},
+    {"root": "*GPUCache", "max_depth": 3},
+    {"root": "*cache2", "max_depth": 3},
+    {"root": "*Recycle*", "max_depth": 2},  # 回收站
+    {"root": "*Download*", "max_depth": 1},  # Windows更新下载
+    {"root": "*Prefetch*", "max_depth": 1},  # 预读取
+    {"root": "*Explorer*", "max_depth": 2},  # 缩略图缓存
+    {"root": "*Windows.old*", "max_depth": 1},
+    {"root": "*SoftwareDistribution*", "max_depth": 2},  # Windows更新缓存
+    # Linux（roots.LinuxProvider）
+    {"root": "*/.cache", "max_depth": 8},  # 用户缓存
+    {"root": "*/Trash", "max_depth": 8},  # 回收站（files 和 info）
+    {"root": "/var/cache/apt/archives", "max_depth": 0, "include": ["*.deb"]},
+    {"root": "/var/log/journal", "max_depth": 1, "include": ["*@*.journal", "*@*.journal~"]},  # 只删归档日志
+    # 临时目录：正在运行的程序的套接字、锁和私有目录不动，只删两天前的文件
+    {"root": "/tmp", "max_depth": 4, "min_age_days": 2, "exclude": _TMP_EXCLUDE},
+    {"root": "/var/tmp", "max_depth": 4, "min_age_days": 2, "exclude": _TMP_EXCLUDE},
+]
+
+_RULE_KEYS = {"root", "max_depth", "include", "exclude", "min_age_days", "min_size"}
+
+_FLAGS = re.IGNORECASE if os.name == 'nt' else 0
+
+
+class RuleError(ValueError):
+    """规则文件格式错误"""
+
+
+def _compile(patterns):
+    """把一组通配符编译成 (匹配文件名的正则, 匹配相对路径的正则)，没有对应通配符时为 None"""
+    names, paths = [], []
+    for pattern in patterns:
+        pattern = pattern.replace("\\", "/").strip("/")
+        (paths if "/" in pattern else names).append(fnmatch.translate(pattern))
+    name_re = re.compile("|".join(names), _FLAGS) if names else None
+    path_re = re.compile("|".join(paths), _FLAGS) if paths else None
+    return name_re, path_re
+
+
+class Rule:
+    """编译后的单条规则"""
+
+    def __init__(self, root="*", max_depth=1, include=(), exclude=(), min_age_days=0, min_size=0):
+        self.root = root
+        self.max_depth = max_depth
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self.min_age_days = min_age_days
+        self.min_size = min_size
+        self._root_re = re.compile(fnmatch.translate(os.path.expandvars(root)), _FLAGS)
+        self._include_name, self._include_path = _compile(self.include)
+        self._exclude_name, self._exclude_path = _compile(self.exclude)
+        self._uses_path = self._include_path is not None or self._exclude_path is not None
+        # 是否需要逐个检查条目；为 False 时扫描热路径完全不调用本规则
+        self.filters = bool(self.include or self.exclude or min_age_days or min_size)
+        self.uses_mtime = bool(min_age_days)
+        self.cutoff = None  # 早于该时间戳的文件才算足够旧，由 bind() 设置
+
+    def matches_root(self, root):
+        return self._root_re.match(root) is not None
+
+    def bind(self, now):
+        """返回以 now 为当前时间计算年龄下限的副本"""
+        bound = copy.copy(self)
+        if self.min_age_days:
+            bound.cutoff = now - self.min_age_days * 86400
+        return bound
+
+    def rel_prefix(self, root, dirpath):
+        """目录相对根目录的路径前缀（以 / 结尾），没有路径通配符时返回 None"""
+        if not self._uses_path:
+            return None
+        rel = os.path.relpath(dirpath, root)
+        if rel == os.curdir:
+            return ""
+        return rel.replace(os.sep, "/") + "/"
+
+    def _excluded(self, prefix, name):
+        if self._exclude_name is not None and self._exclude_name.match(name):
+            return True
+        return self._exclude_path is not None and self._exclude_path.match(prefix + name) is not None
+
+    def excludes_dir(self, prefix, name):
+        """子目录是否被排除（排除的目录整棵不进入）"""
+        return bool(self.exclude) and self._excluded(prefix, name)
+
+    def accepts_file(self, prefix, name, size, mtime):
+        """文件是否计入结果；mtime 为 None 时不检查年龄（调用方需保证规则不要求年龄）"""
+        if size < self.min_size:
+            return False
+        if self.cutoff is not None and mtime is not None and mtime > self.cutoff:
+            return False
+        if self.exclude and self._excluded(prefix, name):
+            return False
+        if self.include:
+            if self._include_name is not None and self._include_name.match(name):
+                return True
+            return self._include_path is not None and self._include_path.match(prefix + name) is not None
+        return True
+
+
+def _parse_rule(data, where):
+    if not isinstance(data, dict):
+        raise RuleError(f"{where}: 规则必须是对象")
+    unknown = set(data) - _RULE_KEYS
+    if unknown:
+        raise RuleError(f"{where}: 未知字段 {', '.join(sorted(unknown))}")
+    if not isinstance(data.get("root"), str):
+        raise RuleError(f"{where}: 缺少 root")
+    max_depth = data.get("max_depth", 1)
+    if not isinstance(max_depth, int) or isinstance(max_depth, bool) or max_depth < 0:
+        raise RuleError(f"{where}: max_depth 必须是非负整数")
+    for key in ("include", "exclude"):
+        value = data.get(key, [])
+        if not isinstance(value, list) or not all(isinstance(p, str) for p in value):
+            raise RuleError(f"{where}: {key} 必须是字符串列表")
+    for key in ("min_age_days", "min_size"):
+        value = data.get(key, 0)
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+            raise RuleError(f"{where}: {key} 必须是非负数")
+    return Rule(
+        data["root"], max_depth, data.get("include", []), data.get("exclude", []),
+        data.get("min_age_days", 0), data.get("min_size", 0)
+    )
+
+
+class RuleSet:
+    """按顺序排列的规则，for_root 返回第一条匹配根目录的规则"""
+
+    def __init__(self, rules, source=None):
+        self.rules = list(rules)
+        self.source = source  # 规则文件路径，内置规则为 None
+        self.fallback = Rule()
+
+    @classmethod
+    def from_data(cls, data, source=None):
+        if isinstance(data, dict):
+            data = data.get("rules")
+        if not isinstance(data, list):
+            raise RuleError(f"{source or '规则'}: 顶层应为规则列表或包含 rules 列表的对象")
+        return cls([_parse_rule(item, f"{source or '规则'} 第 {i + 1} 条") for i, item in enumerate(data)],
+                   source)
+
+    @classmethod
+    def default(cls):
+        return cls.from_data(DEFAULT_RULES)
+
+    @classmethod
+    def load(cls, path):
+        """从 JSON 或 TOML 文件加载，格式错误时抛出 RuleError"""
+        try:
+            if path.lower().endswith(".toml"):
+                try:
+                    import tomllib
+                except ImportError:
+                    raise RuleError(f"{path}: 需要 Python 3.11+ 才能读取 TOML，请改用 JSON")
+                with open(path, "rb") as f:
+                    data = tomllib.load(f)
+            else:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+        except RuleError:
+            raise
+        except (OSError, ValueError) as e:
+            raise RuleError(f"{path}: {e}")
+        return cls.from_data(data, path)
+
+    def for_root(self, root, now=None):
+        """根目录对应的规则（已按 now 计算年龄下限）"""
+        for rule in self.rules:
+            if rule.matches_root(root):
+                return rule.bind(time.time() if now is None else now)
+        return self.fallback
+
+
+def find_rules_file():
+    """数据目录中的用户规则文件，没有时返回 None"""
+    try:
+        base = get_app_data_dir()
+    except OSError:
+        return None
+    for name in RULES_FILENAMES:
+        path = os.path.join(base, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def load_rules(path=None):
+    """加载 path 或数据目录中的规则文件，都没有时返回内置规则；格式错误时抛出 RuleError"""
+    if path is None:
+        path = find_rules_file()
+    if path is None:
+        return RuleSet.default()
+    return RuleSet.load(path)
@@ -0,0 +1,143 @@
+"""持久化的增量扫描索引：按目录 mtime 判断是否需要重新枚举"""
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+from appdata import get_app_data_dir
+
+INDEX_FILENAME = "scan_index.db"
+
+# mtime 距扫描开始不足这么多纳秒的目录不写入索引：
+# 同一时间戳精度内的后续修改无法通过 mtime 区分
+RACY_WINDOW_NS = 2 * 10**9
+
+# 表结构版本（PRAGMA user_version），不一致时丢弃旧索引重建
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    file_count INTEGER NOT NULL,
+    total_size INTEGER NOT NULL,
+    names BLOB NOT NULL,
+    sizes BLOB NOT NULL,
+    mtimes BLOB NOT NULL,
+    subdirs BLOB NOT NULL
+)
+"""
+
+
+def _pack_names(names):
+    return b'\0'.join(os.fsencode(name) for name in names)
+
+
+def _unpack_names(blob):
+    if not blob:
+        return []
+    return [os.fsdecode(name) for name in blob.split(b'\0')]
+
+
+class IndexScan:
+    """一轮扫描在索引上的状态：待写入的目录、本轮见过的目录和开始时间
+
+    由 ScanIndex.begin() 创建，传给同一轮的 lookup/record/commit。
+    多个扫描（界面扫描和查重扫描等）共用一个索引时各自持有一份，
+    互不清空对方的待写入记录，也不会把对方见过的目录当作已消失。
+    """
+
+    def __init__(self):
+        self.started_ns = time.time_ns()
+        self.pending = []
+        self.visited = set()
+
+
+class ScanIndex:
+    """记录每个已扫描目录的 mtime、文件名、文件大小和子目录
+
+    目录的 mtime 只在其直接条目增删改名时变化，因此 mtime 不变的目录
+    可以直接使用缓存的文件列表和子目录列表，只需对每个目录 stat 一次，
+    不必再枚举。文件原地改写导致的大小变化不会反映到 mtime 上，因此
+    命中缓存时的大小可能已经过时：它计入扫描统计，是清理时对照的
+    扫描大小（决定 cleaned_size 的计数），规则有大小条件时还决定文件
+    是否计入结果、是否被删除。
+
+    lookup/record 可在多个扫描线程中调用；写入先缓存在本轮的
+    IndexScan 中，由 commit() 在扫描结束后一次性落盘。
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(get_app_data_dir(), INDEX_FILENAME)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS dirs")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    @classmethod
+    def open_default(cls):
+        """打开默认位置的索引，失败（只读目录、文件损坏等）时返回 None"""
+        try:
+            return cls()
+        except (OSError, sqlite3.Error):
+            return None
+
+    def begin(self):
+        """开始新一轮扫描，返回本轮的 IndexScan"""
+        return IndexScan()
+
+    def lookup(self, scan, dirpath, mtime_ns):
+        """mtime 未变时返回 (文件名列表, 大小列表, 文件 mtime 列表, 子目录名列表)，否则返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns, names, sizes, mtimes, subdirs FROM dirs WHERE path = ?", (dirpath,)
+            ).fetchone()
+            if row is None or row[0] != mtime_ns:
+                return None
+            scan.visited.add(dirpath)
+        sizes = array('q')
+        sizes.frombytes(row[2])
+        mtimes = array('d')
+        mtimes.frombytes(row[3])
+        return _unpack_names(row[1]), sizes, mtimes, _unpack_names(row[4])
+
+    def record(self, scan, dirpath, mtime_ns, names, sizes, mtimes, subdirs):
+        """记录一个完整枚举过的目录"""
+        with self._lock:
+            scan.visited.add(dirpath)
+            if mtime_ns >= scan.started_ns - RACY_WINDOW_NS:
+                return
+            scan.pending.append((
+                dirpath, mtime_ns, len(names), sum(sizes),
+                _pack_names(names), array('q', sizes).tobytes(), array('d', mtimes).tobytes(),
+                _pack_names(subdirs)
+            ))
+
+    def commit(self, scan, roots):
+        """写入 scan 这一轮的扫描结果，并删除 roots 下这一轮没有再出现的目录"""
+        with self._lock:
+            conn = self._conn
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?, ?, ?)", scan.pending
+                )
+                for root in roots:
+                    prefix = root.rstrip(os.sep) + os.sep
+                    # 前缀范围查询：[root\, root]) 覆盖 root 下的所有路径
+                    rows = conn.execute(
+                        "SELECT path FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                        (root, prefix, prefix[:-1] + chr(ord(os.sep) + 1))
+                    ).fetchall()
+                    stale = [(path,) for (path,) in rows if path not in scan.visited]
+                    conn.executemany("DELETE FROM dirs WHERE path = ?", stale)
+            scan.pending = []
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,505 @@
+"""扫描引擎：基于 os.scandir 单遍遍历垃圾目录，不依赖 Tk"""
+import os
+import stat
+import threading
+import time
+from collections import deque
+
+from file_store import FileStore
+from insights import DEFAULT_TOP_N, ScanInsights
+from roots import normalize_roots
+from rules import RESERVED_DIRNAME, RuleSet
+
+# 扫描结果在多少秒内视为新鲜，「开始扫描」可直接复用
+SCAN_FRESH_SECONDS = 300
+
+# POSIX 上 DirEntry.stat() 需要一次 lstat 系统调用；Windows 上枚举时已带回，不再调用
+_ENTRY_STAT_IS_SYSCALL = os.name != 'nt'
+
+# 并行扫描的默认线程数：目录枚举主要在等待系统调用，线程数可多于 CPU 核数
+DEFAULT_SCAN_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+
+def is_link_dir(entry):
+    """DirEntry 是否为指向目录的链接（符号链接或 Windows 目录联接），不应进入"""
+    if entry.is_symlink():
+        return True
+    if os.name == 'nt':
+        # Windows 上 DirEntry.stat 的属性在枚举时已取得，不产生额外系统调用
+        return bool(entry.stat(follow_symlinks=False).st_file_attributes & stat.FILE_ATTRIBUTE_REPARSE_POINT)
+    return False
+
+
+def should_skip_root(root):
+    """跳过需要管理员权限的某些系统文件夹"""
+    return 'System32' in root or 'WinSxS' in root
+
+
+class RootStats:
+    """单个根目录的扫描统计
+
+    计数按目录汇总后才累加到这里（每个目录一次），扫描热路径上只有局部变量自增。
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.file_count = 0
+        self.total_size = 0
+        self.error_count = 0
+        self.dir_count = 0
+        self.entry_count = 0  # 枚举到的目录条目数
+        self.stat_calls = 0  # 实际发生的 stat 系统调用数
+        self.permission_errors = 0
+        self.started_at = None  # time.monotonic()
+        self.finished_at = None
+
+    @property
+    def seconds(self):
+        """扫描耗时（秒），并行扫描时为该根目录第一个到最后一个目录完成的时间跨度"""
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    def add(self, file_count, total_size, error_count, counters=(0, 0, 0, 0)):
+        """counters 为 _scan_dir 返回的 (目录数, 条目数, stat 调用数, 权限错误数)"""
+        self.file_count += file_count
+        self.total_size += total_size
+        self.error_count += error_count
+        dirs, entries, stat_calls, permission_errors = counters
+        self.dir_count += dirs
+        self.entry_count += entries
+        self.stat_calls += stat_calls
+        self.permission_errors += permission_errors
+        self.finished_at = time.monotonic()
+
+    def to_dict(self):
+        return {
+            "path": self.root,
+            "files": self.file_count,
+            "bytes": self.total_size,
+            "dirs": self.dir_count,
+            "entries": self.entry_count,
+            "stat_calls": self.stat_calls,
+            "errors": self.error_count,
+            "permission_errors": self.permission_errors,
+            "seconds": round(self.seconds, 3),
+        }
+
+
+class ScanResult:
+    """一次扫描的结果，供临时文件卡片和清理共用"""
+
+    def __init__(self, roots, keep_files=True, top_n=DEFAULT_TOP_N, memory_budget=None):
+        self.roots = list(roots)
+        self.keep_files = keep_files  # False 时只统计总量，不保留文件列表
+        self.files = FileStore(memory_budget)  # 超过 memory_budget 字节后溢出到磁盘
+        self.insights = ScanInsights(top_n)  # 最大文件和大小/年龄分布
+        self.total_size = 0
+        self.file_count = 0
+        self.dir_count = 0
+        self.cached_dir_count = 0  # 命中增量索引、未重新枚举的目录数
+        self.errors = []  # 无法访问的目录
+        self.partial_dirs = set()  # 没有完整枚举的目录（深度截断、出错、含符号链接等）
+        self.root_stats = {}  # 根目录 -> RootStats
+        self.started_at = time.time()
+        self.finished_at = None
+
+    def add_dir(self, dirpath):
+        """登记目录并返回编号，不保留文件列表时返回 -1"""
+        if not self.keep_files:
+            return -1
+        return self.files.add_dir(dirpath)
+
+    def add_file(self, dir_id, name, size, mtime=0):
+        """dir_id 为 add_dir() 返回的目录编号"""
+        if self.keep_files:
+            self.files.add(dir_id, name, size, mtime)
+        self.total_size += size
+        self.file_count += 1
+
+    def _partial_closure(self):
+        """不完整的目录及其全部祖先（直到根目录）"""
+        roots = set(self.roots)
+        partial = set()
+        for path in self.partial_dirs:
+            while path not in partial:
+                partial.add(path)
+                parent = os.path.dirname(path)
+                if path in roots or parent == path:
+                    break
+                path = parent
+        return partial
+
+    def complete_subtrees(self):
+        """返回完整扫描过的最大子树 [(目录, 是否为根目录)]
+
+        子树中的每个目录都被完整枚举、每个文件都在结果中时，清理可以
+        整棵删除。某个目录不完整时，它的所有祖先也都不完整。
+        """
+        roots = set(self.roots)
+        partial = self._partial_closure()
+        subtrees = []
+        for dirpath in self.files.dirs:
+            if dirpath in partial:
+                continue
+            if dirpath in roots:
+                subtrees.append((dirpath, True))
+            elif os.path.dirname(dirpath) in partial:
+                subtrees.append((dirpath, False))
+        return subtrees
+
+    def loose_files(self):
+        """不在任何完整子树中、需要逐个删除的 (路径, 大小)
+
+        目录不完整时才不在完整子树中，按目录编号过滤，溢出的结果也只需顺序读一遍。
+        """
+        partial = self._partial_closure()
+        partial_ids = {dir_id for dir_id, dirpath in enumerate(self.files.dirs) if dirpath in partial}
+        for dir_id, path, size in self.files.items():
+            if dir_id in partial_ids:
+                yield path, size
+
+    def age(self):
+        """距扫描完成的秒数，未完成返回 None"""
+        if self.finished_at is None:
+            return None
+        return time.time() - self.finished_at
+
+    def is_fresh(self, max_age=SCAN_FRESH_SECONDS):
+        age = self.age()
+        return age is not None and age <= max_age
+
+
+class JunkScanner:
+    """单遍扫描所有垃圾目录
+
+    直接复用 os.scandir 返回的 DirEntry 中的类型和 stat 信息，
+    Windows 上枚举目录时即可拿到文件大小，不再为每个文件额外 stat。
+
+    workers > 1 时以目录为任务单位并行遍历：每个线程优先处理自己队列
+    末尾的子目录，空闲时从其他线程队列头部窃取，单个巨大的根目录
+    （Windows.old、浏览器缓存）也能被多个线程分担。找到的文件集合与
+    总量和串行遍历完全一致，只是 files 中的顺序不同。
+
+    传入 index（ScanIndex）时为增量扫描：mtime 未变的目录直接取索引中的
+    文件列表，只有变化过的目录才重新枚举，结束后把新结果写回索引。
+    索引保存未经规则过滤的完整列表，规则改动后无需重建；带年龄条件
+    的规则需要文件 mtime，对应根目录不使用索引。
+
+    rules（rules.RuleSet，默认为内置规则）决定每个根目录的扫描深度和
+    包含/排除条件。被规则排除的文件不计入结果、被排除的目录不进入，
+    所在目录视为不完整，清理时不会整棵删除。
+
+    回调均在扫描线程中执行：
+      on_root(root)                 开始扫描某个根目录
+      on_progress(result)           每扫描约 progress_interval 个文件一次
+      on_file(path, size)           每个文件一次（流式处理用）
+    keep_files=False 时结果中不保留文件列表，配合 on_file 可使内存占用
+    与目录树大小无关；memory_budget（字节）为保留文件列表时的内存预算，
+    超过后文件列表溢出到磁盘。最大的 top_n 个文件和大小/年龄分布总是在扫描中
+    顺带统计到 result.insights。
+    """
+
+    def __init__(self, roots, on_root=None, on_progress=None, progress_interval=100, workers=1,
+                 index=None, on_file=None, keep_files=True, rules=None, top_n=DEFAULT_TOP_N,
+                 memory_budget=None):
+        self.roots = normalize_roots(roots)  # 重复、嵌套的根目录只扫描一次
+        self.on_root = on_root
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.workers = max(1, workers)
+        self.index = index
+        self.on_file = on_file
+        self.keep_files = keep_files
+        self.rules = rules if rules is not None else RuleSet.default()
+        self.top_n = top_n
+        self.memory_budget = memory_budget
+        self._root_rules = {}
+        self._index_scan = None  # 本轮扫描的 scan_index.IndexScan
+
+    def scan(self):
+        """扫描全部根目录并返回 ScanResult"""
+        result = ScanResult(self.roots, self.keep_files, self.top_n, self.memory_budget)
+        roots = [root for root in self.roots if not should_skip_root(root)]
+        now = time.time()
+        for root in roots:
+            result.root_stats[root] = RootStats(root)
+            self._root_rules[root] = self.rules.for_root(root, now)
+        if self.index is not None:
+            self._index_scan = self.index.begin()
+        if self.workers > 1:
+            self._scan_parallel(roots, result)
+        else:
+            for root in roots:
+                self._scan_root(root, result)
+        if self.index is not None:
+            self.index.commit(self._index_scan, roots)
+        result.finished_at = time.time()
+        return result
+
+    def _progress_due(self, result, before):
+        """文件数是否跨过了 progress_interval 的整数倍"""
+        return bool(self.on_progress) and \
+            result.file_count // self.progress_interval > before // self.progress_interval
+
+    def _report_progress(self, result, before):
+        """文件数跨过 progress_interval 的整数倍时回调一次"""
+        if self._progress_due(result, before):
+            self.on_progress(result)
+
+    def _scan_root_file(self, root, result):
+        """根目录本身是文件（如 Memory.dmp）时直接计入并返回计数，不是文件返回 None"""
+        try:
+            if not os.path.isfile(root):
+                return None
+            st = os.lstat(root)
+        except OSError as e:
+            result.errors.append(root)
+            return (0, 1, 2, int(isinstance(e, PermissionError)))
+        dirpath, name = os.path.split(root)
+        # 只取了父目录中的一个文件，父目录不能整体删除
+        result.partial_dirs.add(dirpath)
+        rule = self._root_rules[root]
+        if not rule.filters or rule.accepts_file("", name, st.st_size, st.st_mtime):
+            self._add_found(result, result.add_dir(dirpath), dirpath, name, st.st_size, st.st_mtime)
+        return (0, 1, 2, 0)
+
+    def _scan_root(self, root, result):
+        if self.on_root:
+            self.on_root(root)
+        stats = result.root_stats[root]
+        stats.started_at = time.monotonic()
+        count_before, size_before, errors_before = result.file_count, result.total_size, len(result.errors)
+        counters = self._scan_root_file(root, result)
+        if counters is not None:
+            self._report_progress(result, count_before)
+        else:
+            dirs = entries = stat_calls = permission_errors = 0
+            rule = self._root_rules[root]
+            stack = [(root, 0)]
+            while stack:
+                dirpath, depth = stack.pop()
+                before = result.file_count
+                d, e, s, p = self._scan_dir(dirpath, depth, root, rule, result, stack)
+                dirs += d
+                entries += e
+                stat_calls += s
+                permission_errors += p
+                self._report_progress(result, before)
+            counters = (dirs, entries, stat_calls, permission_errors)
+        stats.add(result.file_count - count_before, result.total_size - size_before,
+                  len(result.errors) - errors_before, counters)
+
+    def _add_found(self, result, dir_id, dirpath, name, size, mtime):
+        result.add_file(dir_id, name, size, mtime)
+        result.insights.add(dirpath, name, size, mtime)
+        if self.on_file is not None:
+            self.on_file(os.path.join(dirpath, name), size)
+
+    def _scan_dir(self, dirpath, depth, root, rule, result, subdirs):
+        """枚举单个目录：文件计入 result，需要继续深入的子目录以 (路径, 深度) 追加到 subdirs
+
+        返回 (目录数, 条目数, stat 调用数, 权限错误数)，由调用方按根目录汇总。
+        """
+        max_depth = rule.max_depth
+        filters = rule.filters
+        prefix = rule.rel_prefix(root, dirpath) if filters else None
+        index = self.index if not rule.uses_mtime else None
+        stat_calls = 0
+        if index is not None:
+            # 先取 mtime 再枚举：枚举期间目录若有变化，下次 mtime 必然对不上
+            stat_calls = 1
+            try:
+                mtime_ns = os.stat(dirpath).st_mtime_ns
+            except OSError as e:
+                result.errors.append(dirpath)
+                result.partial_dirs.add(dirpath)
+                return (0, 0, stat_calls, int(isinstance(e, PermissionError)))
+            cached = index.lookup(self._index_scan, dirpath, mtime_ns)
+            if cached is not None:
+                names, sizes, mtimes, subdir_names = cached
+                result.dir_count += 1
+                result.cached_dir_count += 1
+                dir_id = result.add_dir(dirpath)
+                excluded = False
+                for name, size, mtime in zip(names, sizes, mtimes):
+                    if filters and not rule.accepts_file(prefix, name, size, None):
+                        excluded = True
+                        continue
+                    self._add_found(result, dir_id, dirpath, name, size, mtime)
+                for name in subdir_names:
+                    if name == RESERVED_DIRNAME or (filters and rule.excludes_dir(prefix, name)):
+                        excluded = True
+                    elif depth < max_depth:
+                        subdirs.append((os.path.join(dirpath, name), depth + 1))
+                    else:
+                        excluded = True
+                if excluded:
+                    result.partial_dirs.add(dirpath)
+                return (1, len(names) + len(subdir_names), stat_calls, 0)
+            names, sizes, mtimes, subdir_names = [], [], [], []
+
+        try:
+            it = os.scandir(dirpath)
+        except OSError as e:
+            result.errors.append(dirpath)
+            result.partial_dirs.add(dirpath)
+            return (0, 0, stat_calls, int(isinstance(e, PermissionError)))
+
+        result.dir_count += 1
+        dir_id = result.add_dir(dirpath)
+        # 除深度截断外，是否还有没能计入结果的条目（这样的目录不写入索引）
+        skipped = False
+        # 是否有被规则排除的条目（目录不完整，但列表本身完整，仍写入索引）
+        excluded = False
+        entries = 0
+        file_stats = 0
+        permission_errors = 0
+        try:
+            with it:
+                for entry in it:
+                    entries += 1
+                    try:
+                        if entry.is_dir():
+                            # 与 os.walk 一致：不进入指向目录的符号链接
+                            if is_link_dir(entry):
+                                skipped = True
+                                continue
+                            if index is not None:
+                                subdir_names.append(entry.name)
+                            if entry.name == RESERVED_DIRNAME or (filters and rule.excludes_dir(prefix, entry.name)):
+                                excluded = True
+                            elif depth < max_depth:
+                                subdirs.append((entry.path, depth + 1))
+                            else:
+                                excluded = True
+                            continue
+                        file_stats += 1
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError as e:
+                        if isinstance(e, PermissionError):
+                            permission_errors += 1
+                        skipped = True
+                        continue
+                    size = st.st_size
+                    if index is not None:
+                        names.append(entry.name)
+                        sizes.append(size)
+                        mtimes.append(st.st_mtime)
+                    if filters and not rule.accepts_file(prefix, entry.name, size, st.st_mtime):
+                        excluded = True
+                        continue
+                    self._add_found(result, dir_id, dirpath, entry.name, size, st.st_mtime)
+        except OSError:
+            # 枚举中途出错（目录被删除等），保留已得到的部分
+            result.errors.append(dirpath)
+            skipped = True
+
+        if skipped or excluded:
+            result.partial_dirs.add(dirpath)
+        if not skipped and index is not None:
+            index.record(self._index_scan, dirpath, mtime_ns, names, sizes, mtimes, subdir_names)
+        if _ENTRY_STAT_IS_SYSCALL:
+            stat_calls += file_stats
+        return (1, entries, stat_calls, permission_errors)
+
+    def _scan_parallel(self, roots, result):
+        """多线程工作窃取遍历
+
+        每个线程有自己的双端队列，任务为 (目录, 深度, 规则, 所属根目录)。
+        deque 的 append/pop/popleft 本身是线程安全的，只有未完成任务计数
+        和汇总进度需要加锁，且每个目录只加一次锁；on_progress 在锁外回调。
+        任一线程出错（索引数据库错误、回调抛出异常等）时其余线程停止，
+        异常在全部线程结束后重新抛出，与单线程扫描一致。
+        """
+        queues = [deque() for _ in range(self.workers)]
+        for i, root in enumerate(roots):
+            queues[i % self.workers].append((root, 0, self._root_rules[root], root))
+
+        cond = threading.Condition()
+        state = {'pending': len(roots), 'error': None}
+        # 各线程的结果分摊内存预算，合并时只引用各自的溢出文件
+        part_budget = self.memory_budget // self.workers if self.memory_budget is not None else None
+        parts = [ScanResult((), self.keep_files, self.top_n, part_budget) for _ in range(self.workers)]
+
+        def next_task(index):
+            try:
+                return queues[index].pop()
+            except IndexError:
+                pass
+            # 自己的队列空了，从其他线程队列头部（更靠近根、子树更大）窃取
+            for offset in range(1, self.workers):
+                try:
+                    return queues[(index + offset) % self.workers].popleft()
+                except IndexError:
+                    continue
+            return None
+
+        def worker(index):
+            own = queues[index]
+            part = parts[index]
+            while True:
+                task = next_task(index) if state['error'] is None else None
+                if task is None:
+                    with cond:
+                        if state['pending'] == 0 or state['error'] is not None:
+                            cond.notify_all()
+                            return
+                        cond.wait(0.05)
+                    continue
+
+                dirpath, depth, rule, root = task
+                count_before, size_before, errors_before = part.file_count, part.total_size, len(part.errors)
+                subdirs = []
+                counters = None
+                try:
+                    if depth == 0:
+                        if self.on_root:
+                            self.on_root(dirpath)
+                        result.root_stats[root].started_at = time.monotonic()
+                        counters = self._scan_root_file(dirpath, part)
+                    if counters is None:
+                        counters = self._scan_dir(dirpath, depth, root, rule, part, subdirs)
+                except BaseException as e:
+                    # 记下第一个异常，扣掉当前任务并唤醒其他线程退出
+                    with cond:
+                        if state['error'] is None:
+                            state['error'] = e
+                        state['pending'] -= 1
+                        cond.notify_all()
+                    return
+                with cond:
+                    # 先入队子目录再扣掉当前任务，保证计数归零时确实没有剩余工作
+                    for path, sub_depth in subdirs:
+                        own.append((path, sub_depth, rule, root))
+                    state['pending'] += len(subdirs) - 1
+                    before = result.file_count
+                    file_delta = part.file_count - count_before
+                    size_delta = part.total_size - size_before
+                    result.file_count += file_delta
+                    result.total_size += size_delta
+                    result.root_stats[root].add(file_delta, size_delta, len(part.errors) - errors_before, counters)
+                    report = self._progress_due(result, before)
+                    if subdirs or state['pending'] == 0:
+                        cond.notify_all()
+                # 在锁外回调：on_progress 可能阻塞（如守护模式暂停时），不能卡住其他线程
+                if report:
+                    self.on_progress(result)
+
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if state['error'] is not None:
+            for part in parts:
+                part.files.close()
+            raise state['error']
+
+        for part in parts:
+            result.files.extend(part.files)
+            result.dir_count += part.dir_count
+            result.cached_dir_count += part.cached_dir_count
+            result.errors.extend(part.errors)
+            result.partial_dirs.update(part.partial_dirs)
+            result.insights.merge(part.insights)
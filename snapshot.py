@@ -0,0 +1,524 @@
+"""扫描快照：把扫描结果压缩保存为列式文件，流式比较两次快照的增长
+
+文件格式（整数均为小端）：
+  头部      MAGIC、版本号（uint16）、元数据长度（uint32），随后是 UTF-8 JSON 元数据：
+            主机名、平台、创建时间、家目录、根目录列表及各根目录的文件数/字节数
+  目录块    按路径排序的目录表，每块最多 BLOCK_DIRS 个目录：
+            路径（前缀压缩：与上一路径的公共前缀长度 + 后缀）、所属根目录编号、
+            文件数、字节数、最旧文件的 mtime
+  文件块    每块最多 BLOCK_FILES 个文件：所在目录在目录表中的序号、大小、mtime
+每块为「压缩后长度（uint32）、条数（uint32）」加 zlib 压缩的各列，条数为 0
+的块表示该部分结束。不保存文件名。
+
+目录表在文件块之前且已排好序，比较两个快照只需顺序读两边的目录块做
+归并连接，不读文件块，内存占用与目录数无关；汇总全机队的快照时每个
+快照同样只读头部和目录块。
+"""
+import heapq
+import json
+import os
+import platform
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+from datetime import datetime
+
+MAGIC = b"CDSNAP\0\0"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".cdsnap"
+
+BLOCK_DIRS = 4096
+BLOCK_FILES = 65536
+
+_HEADER = struct.Struct('<8sHI')
+_BLOCK_HEADER = struct.Struct('<II')
+
+# 路径用 UTF-8 保存；surrogatepass 让 Windows 的孤立代理项和 Linux 上
+# surrogateescape 得到的字符都能原样往返。UTF-8 字节序与码位序一致，
+# 按 str 排序即按编码后的字节排序。
+_PATH_ENCODING = "utf-8"
+_PATH_ERRORS = "surrogatepass"
+
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+class SnapshotError(ValueError):
+    """快照文件格式错误或版本不支持"""
+
+
+def _pack(column):
+    if _BIG_ENDIAN:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _unpack(typecode, data, start, count):
+    column = array(typecode)
+    end = start + column.itemsize * count
+    column.frombytes(data[start:end])
+    if _BIG_ENDIAN:
+        column.byteswap()
+    return column, end
+
+
+def _write_block(f, count, columns):
+    payload = zlib.compress(b"".join(columns))
+    f.write(_BLOCK_HEADER.pack(len(payload), count))
+    f.write(payload)
+
+
+def _owner_roots(dirs, roots):
+    """每个目录所属的根目录编号：向上找到的第一个根目录
+
+    找不到时目录中的文件来自作为文件给出的根目录（如 Memory.dmp），
+    归到以该目录为父目录的根目录；仍找不到为 -1。
+    """
+    root_index = {root: i for i, root in enumerate(roots)}
+    parent_index = {}
+    for i, root in enumerate(roots):
+        parent_index.setdefault(os.path.dirname(root), i)
+    owner = {}
+    result = []
+    for dirpath in dirs:
+        path = dirpath
+        visited = []
+        root_id = -1
+        while True:
+            if path in owner:
+                root_id = owner[path]
+                break
+            if path in root_index:
+                root_id = root_index[path]
+                break
+            visited.append(path)
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        if root_id < 0:
+            root_id = parent_index.get(dirpath, -1)
+            visited = visited[1:]  # 父目录的归属不能传给其他子目录
+        for path in visited:
+            owner[path] = root_id
+        result.append(root_id)
+    return result
+
+
+def write_snapshot(result, path, host=None):
+    """把 ScanResult 写成快照文件，返回元数据
+
+    按列顺序读两遍文件列表（先按目录汇总，再写文件块），溢出到磁盘的
+    结果同样可以导出。先写临时文件再替换，中途失败不会留下半个快照。
+    """
+    store = result.files
+    if not result.keep_files:
+        raise ValueError("扫描结果没有保留文件列表，无法导出快照")
+
+    # 第一遍：每个目录的文件数、字节数和最旧文件的 mtime
+    dir_count = len(store.dirs)
+    dir_files = array('q', bytes(8 * dir_count))
+    dir_bytes = array('q', bytes(8 * dir_count))
+    dir_oldest = array('I', [0xFFFFFFFF]) * dir_count
+    for dir_ids, sizes, mtimes in store.columns():
+        for i, dir_id in enumerate(dir_ids):
+            dir_files[dir_id] += 1
+            dir_bytes[dir_id] += sizes[i]
+            if mtimes[i] < dir_oldest[dir_id]:
+                dir_oldest[dir_id] = mtimes[i]
+
+    order = sorted((d for d in range(dir_count) if dir_files[d]), key=store.dirs.__getitem__)
+    position = array('I', bytes(4 * dir_count))  # 目录编号 -> 目录表中的序号
+    for pos, dir_id in enumerate(order):
+        position[dir_id] = pos
+    roots = list(result.roots)
+    owners = _owner_roots([store.dirs[d] for d in order], roots)
+    root_files = [0] * len(roots)
+    root_bytes = [0] * len(roots)
+    for pos, dir_id in enumerate(order):
+        if owners[pos] >= 0:
+            root_files[owners[pos]] += dir_files[dir_id]
+            root_bytes[owners[pos]] += dir_bytes[dir_id]
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "host": host or platform.node(),
+        "platform": f"{platform.system()} {platform.release()}",
+        "created_at": time.time(),
+        "scan_started_at": result.started_at,
+        "home": os.path.expanduser("~"),
+        "roots": [{"path": root, "files": root_files[i], "bytes": root_bytes[i]}
+                  for i, root in enumerate(roots)],
+        "files": sum(dir_files),
+        "bytes": sum(dir_bytes),
+        "dirs": len(order),
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+
+    target_dir = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".snapshot_", suffix=".tmp", dir=target_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, SNAPSHOT_VERSION, len(meta_bytes)))
+            f.write(meta_bytes)
+
+            # 目录块：每块的第一个路径不做前缀压缩，块之间互不依赖
+            for start in range(0, len(order), BLOCK_DIRS):
+                block = order[start:start + BLOCK_DIRS]
+                prefix_lens = array('I')
+                suffix_lens = array('I')
+                suffixes = bytearray()
+                previous = b""
+                for dir_id in block:
+                    encoded = store.dirs[dir_id].encode(_PATH_ENCODING, _PATH_ERRORS)
+                    common = 0
+                    limit = min(len(previous), len(encoded))
+                    while common < limit and previous[common] == encoded[common]:
+                        common += 1
+                    prefix_lens.append(common)
+                    suffix_lens.append(len(encoded) - common)
+                    suffixes += encoded[common:]
+                    previous = encoded
+                _write_block(f, len(block), (
+                    _pack(prefix_lens),
+                    _pack(suffix_lens),
+                    _pack(array('i', owners[start:start + len(block)])),
+                    _pack(array('q', (dir_files[d] for d in block))),
+                    _pack(array('q', (dir_bytes[d] for d in block))),
+                    _pack(array('I', (dir_oldest[d] for d in block))),
+                    bytes(suffixes),
+                ))
+            f.write(_BLOCK_HEADER.pack(0, 0))
+
+            # 第二遍：文件块，目录编号换成目录表中的序号
+            for dir_ids, sizes, mtimes in store.columns():
+                for start in range(0, len(sizes), BLOCK_FILES):
+                    end = start + BLOCK_FILES
+                    positions = array('I', map(position.__getitem__, dir_ids[start:end]))
+                    _write_block(f, len(positions), (
+                        _pack(positions), _pack(sizes[start:end]), _pack(mtimes[start:end])))
+            f.write(_BLOCK_HEADER.pack(0, 0))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return meta
+
+
+def snapshot_name(host=None, when=None):
+    """自动生成的快照文件名：主机名-时间"""
+    host = "".join(c if c.isalnum() or c in "-_." else "_" for c in (host or platform.node() or "host"))
+    return f"{host}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(when))}{SNAPSHOT_SUFFIX}"
+
+
+class SnapshotReader:
+    """顺序读取快照：打开时只读头部，目录块和文件块按需逐块解压"""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "rb")
+        try:
+            header = self._f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise SnapshotError(f"{path} 不是扫描快照")
+            magic, version, meta_len = _HEADER.unpack(header)
+            if magic != MAGIC:
+                raise SnapshotError(f"{path} 不是扫描快照")
+            if version > SNAPSHOT_VERSION:
+                raise SnapshotError(f"{path} 的快照版本 {version} 过新，当前只支持到 {SNAPSHOT_VERSION}")
+            try:
+                self.meta = json.loads(self._f.read(meta_len).decode("utf-8"))
+            except ValueError:
+                raise SnapshotError(f"{path} 的元数据已损坏") from None
+        except BaseException:
+            self._f.close()
+            raise
+        self.version = version
+        self.roots = [root["path"] for root in self.meta.get("roots", [])]
+        self._data_start = _HEADER.size + meta_len
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _blocks(self):
+        """当前位置起一个部分的各块：(条数, 解压后的数据)"""
+        f = self._f
+        while True:
+            header = f.read(_BLOCK_HEADER.size)
+            if len(header) < _BLOCK_HEADER.size:
+                raise SnapshotError(f"{self.path} 不完整")
+            length, count = _BLOCK_HEADER.unpack(header)
+            if count == 0:
+                return
+            try:
+                yield count, zlib.decompress(f.read(length))
+            except zlib.error:
+                raise SnapshotError(f"{self.path} 的数据块已损坏") from None
+
+    def _skip_dirs(self):
+        f = self._f
+        f.seek(self._data_start)
+        while True:
+            header = f.read(_BLOCK_HEADER.size)
+            if len(header) < _BLOCK_HEADER.size:
+                raise SnapshotError(f"{self.path} 不完整")
+            length, count = _BLOCK_HEADER.unpack(header)
+            if count == 0:
+                return
+            f.seek(length, os.SEEK_CUR)
+
+    def dirs(self):
+        """按路径顺序产出 (目录, 所属根目录或 None, 文件数, 字节数, 最旧文件的 mtime)"""
+        self._f.seek(self._data_start)
+        roots = self.roots
+        for count, data in self._blocks():
+            prefix_lens, pos = _unpack('I', data, 0, count)
+            suffix_lens, pos = _unpack('I', data, pos, count)
+            root_ids, pos = _unpack('i', data, pos, count)
+            files, pos = _unpack('q', data, pos, count)
+            sizes, pos = _unpack('q', data, pos, count)
+            oldest, pos = _unpack('I', data, pos, count)
+            previous = b""
+            for i in range(count):
+                end = pos + suffix_lens[i]
+                encoded = previous[:prefix_lens[i]] + data[pos:end]
+                pos = end
+                previous = encoded
+                root_id = root_ids[i]
+                yield (encoded.decode(_PATH_ENCODING, _PATH_ERRORS),
+                       roots[root_id] if root_id >= 0 else None,
+                       files[i], sizes[i], oldest[i])
+
+    def files(self):
+        """按块产出 (目录序号, 大小, mtime) 三列，目录序号对应 dirs() 的顺序"""
+        self._skip_dirs()
+        for count, data in self._blocks():
+            positions, pos = _unpack('I', data, 0, count)
+            sizes, pos = _unpack('q', data, pos, count)
+            mtimes, pos = _unpack('I', data, pos, count)
+            yield positions, sizes, mtimes
+
+
+def portable_path(path, home):
+    """把家目录前缀换成 ~，不同机器、不同用户名下的同一位置可以合并统计"""
+    if home:
+        norm_path = os.path.normcase(path)
+        norm_home = os.path.normcase(home.rstrip("/\\"))
+        if norm_path == norm_home:
+            return "~"
+        if norm_path.startswith(norm_home) and norm_path[len(norm_home)] in "/\\":
+            return "~" + path[len(norm_home):]
+    return path
+
+
+class RootGrowth:
+    """一个根目录在两次快照间的变化"""
+
+    def __init__(self, root):
+        self.root = root
+        self.old_files = 0
+        self.old_bytes = 0
+        self.new_files = 0
+        self.new_bytes = 0
+
+    @property
+    def growth(self):
+        return self.new_bytes - self.old_bytes
+
+    def add(self, other):
+        self.old_files += other.old_files
+        self.old_bytes += other.old_bytes
+        self.new_files += other.new_files
+        self.new_bytes += other.new_bytes
+
+    def to_dict(self):
+        return {
+            "root": self.root,
+            "old_files": self.old_files,
+            "new_files": self.new_files,
+            "old_bytes": self.old_bytes,
+            "new_bytes": self.new_bytes,
+            "growth_bytes": self.growth,
+        }
+
+
+class SnapshotDiff:
+    """两次快照的比较结果
+
+    roots 为各根目录的变化；top_dirs 为增长最多的 top_n 个目录
+    [(增长字节数, 目录, 旧字节数, 新字节数, 新文件数)]，从大到小。
+    """
+
+    def __init__(self, old_meta, new_meta, top_n):
+        self.old_meta = old_meta
+        self.new_meta = new_meta
+        self.top_n = top_n
+        self.roots = {}  # 根目录 -> RootGrowth
+        self.top_dirs = []
+        self.added_dirs = 0  # 只在新快照中有垃圾文件的目录数
+        self.removed_dirs = 0  # 只在旧快照中有垃圾文件的目录数
+        self.common_dirs = 0
+
+    def root(self, root):
+        growth = self.roots.get(root)
+        if growth is None:
+            growth = self.roots[root] = RootGrowth(root)
+        return growth
+
+    @property
+    def growth(self):
+        return sum(root.growth for root in self.roots.values())
+
+    def to_dict(self):
+        def summary(meta):
+            summary = {key: meta.get(key) for key in ("host", "files", "bytes", "dirs")}
+            created_at = meta.get("created_at")
+            summary["created_at"] = (datetime.fromtimestamp(created_at).isoformat(timespec="seconds")
+                                     if created_at else None)
+            return summary
+
+        return {
+            "old": summary(self.old_meta),
+            "new": summary(self.new_meta),
+            "growth_bytes": self.growth,
+            "added_dirs": self.added_dirs,
+            "removed_dirs": self.removed_dirs,
+            "common_dirs": self.common_dirs,
+            "roots": [root.to_dict() for root in sorted(self.roots.values(), key=lambda r: -r.growth)],
+            "top_dirs": [{"dir": d, "growth_bytes": g, "old_bytes": old, "new_bytes": new, "new_files": files}
+                         for g, d, old, new, files in self.top_dirs],
+        }
+
+
+def diff_snapshots(old_path, new_path, top_n=20, portable=False):
+    """比较两个快照：两边的目录块按路径顺序归并连接，只保留各根目录的
+    合计和增长最多的 top_n 个目录
+
+    portable 为 True 时根目录和目录都把各自快照中的家目录换成 ~，
+    供汇总多台机器时合并同一位置。
+    """
+    with SnapshotReader(old_path) as old, SnapshotReader(new_path) as new:
+        diff = SnapshotDiff(old.meta, new.meta, top_n)
+        old_home = old.meta.get("home") if portable else None
+        new_home = new.meta.get("home") if portable else None
+        old_roots = {root: diff.root(portable_path(root, old_home)) for root in old.roots}
+        new_roots = {root: diff.root(portable_path(root, new_home)) for root in new.roots}
+        heap = []  # 最小堆，保留增长最多的 top_n 个目录
+        old_dirs, new_dirs = old.dirs(), new.dirs()
+        a, b = next(old_dirs, None), next(new_dirs, None)
+        while a is not None or b is not None:
+            if b is None or (a is not None and a[0] < b[0]):
+                # 只在旧快照中：目录已被清理或不再有垃圾
+                diff.removed_dirs += 1
+                if a[1] is not None:
+                    growth = old_roots[a[1]]
+                    growth.old_files += a[2]
+                    growth.old_bytes += a[3]
+                a = next(old_dirs, None)
+                continue
+            if a is None or b[0] < a[0]:
+                diff.added_dirs += 1
+                old_bytes = 0
+            else:
+                diff.common_dirs += 1
+                old_bytes = a[3]
+                if a[1] is not None:
+                    growth = old_roots[a[1]]
+                    growth.old_files += a[2]
+                    growth.old_bytes += a[3]
+                a = next(old_dirs, None)
+            dirpath, root, files, size, _ = b
+            if root is not None:
+                growth = new_roots[root]
+                growth.new_files += files
+                growth.new_bytes += size
+            delta = size - old_bytes
+            if delta > 0 and top_n and (len(heap) < top_n or delta > heap[0][0]):
+                item = (delta, portable_path(dirpath, new_home), old_bytes, size, files)
+                if len(heap) < top_n:
+                    heapq.heappush(heap, item)
+                else:
+                    heapq.heapreplace(heap, item)
+            b = next(new_dirs, None)
+        diff.top_dirs = sorted(heap, reverse=True)
+    return diff
+
+
+def find_snapshots(paths):
+    """展开参数中的目录：目录中的全部快照文件，加上直接给出的文件"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(SNAPSHOT_SUFFIX):
+                    found.append(os.path.join(path, name))
+        else:
+            found.append(path)
+    return found
+
+
+def aggregate_snapshots(paths, top_n=20):
+    """汇总多台机器的快照：按主机分组，比较每台主机最早和最新的快照
+
+    分组只读各快照的头部；每台主机的比较与 diff_snapshots 相同，只流式
+    读取两个快照的目录块。根目录按 ~ 替换家目录后合并；增长最多的目录
+    在各主机间按 (主机, 目录) 取前 top_n 个。
+    """
+    hosts = {}  # 主机 -> [(创建时间, 路径)]
+    skipped = []
+    for path in paths:
+        try:
+            with SnapshotReader(path) as reader:
+                meta = reader.meta
+        except (OSError, SnapshotError) as e:
+            skipped.append({"path": path, "error": str(e)})
+            continue
+        hosts.setdefault(meta.get("host") or "", []).append((meta.get("created_at") or 0, path))
+
+    roots = {}
+    top_dirs = []
+    compared = []
+    baseline_only = []
+    for host in sorted(hosts):
+        snapshots = sorted(hosts[host])
+        if len(snapshots) < 2:
+            baseline_only.append(host)
+            continue
+        try:
+            diff = diff_snapshots(snapshots[0][1], snapshots[-1][1], top_n, portable=True)
+        except (OSError, SnapshotError) as e:
+            skipped.append({"path": snapshots[-1][1], "error": str(e)})
+            continue
+        compared.append({"host": host, "old": snapshots[0][1], "new": snapshots[-1][1],
+                         "growth_bytes": diff.growth})
+        for root, growth in diff.roots.items():
+            total = roots.get(root)
+            if total is None:
+                total = roots[root] = RootGrowth(root)
+            total.add(growth)
+        for item in diff.top_dirs:
+            top_dirs.append((item[0], host) + item[1:])
+    top_dirs = heapq.nlargest(top_n, top_dirs)
+    return {
+        "hosts": len(hosts),
+        "compared": compared,
+        "baseline_only": baseline_only,
+        "skipped": skipped,
+        "growth_bytes": sum(root.growth for root in roots.values()),
+        "roots": [root.to_dict() for root in sorted(roots.values(), key=lambda r: -r.growth)],
+        "top_dirs": [{"host": host, "dir": d, "growth_bytes": g, "old_bytes": old, "new_bytes": new,
+                      "new_files": files}
+                     for g, host, d, old, new, files in top_dirs],
+    }
@@ -0,0 +1,145 @@
+"""系统负载采样：CPU 使用率、磁盘繁忙时间比例、平均负载
+
+Linux 读取 /proc/stat 和 /proc/diskstats（io_ticks），Windows 用
+GetSystemTimes 和 PDH 计数器「PhysicalDisk(_Total)\\% Idle Time」。
+使用率是两次采样之间的差值，第一次采样和拿不到的项为 None。
+"""
+import os
+import sys
+import time
+
+_LINUX = sys.platform.startswith("linux")
+
+# 不计入磁盘繁忙度的虚拟块设备
+_VIRTUAL_DISKS = ("loop", "ram", "zram", "dm-", "md", "sr", "fd")
+
+
+class LoadSample:
+    def __init__(self, cpu=None, disk_busy=None, load=None):
+        self.cpu = cpu  # CPU 使用率，百分比
+        self.disk_busy = disk_busy  # 最繁忙的物理磁盘的繁忙时间比例，百分比
+        self.load = load  # 每个 CPU 的 1 分钟平均负载（仅类 Unix）
+
+    def to_dict(self):
+        return {"cpu": self.cpu, "disk_busy": self.disk_busy, "load": self.load}
+
+
+def _read_cpu_times():
+    """(忙碌时间, 总时间)，单位任意"""
+    if _LINUX:
+        try:
+            with open("/proc/stat") as f:
+                fields = [int(x) for x in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        idle = fields[3] + (fields[4] if len(fields) > 4 else 0)  # idle + iowait
+        total = sum(fields[:8])  # guest 已包含在 user 中
+        return total - idle, total
+    if os.name == 'nt':
+        try:
+            import ctypes
+            idle, kernel, user = ctypes.c_ulonglong(), ctypes.c_ulonglong(), ctypes.c_ulonglong()
+            if not ctypes.windll.kernel32.GetSystemTimes(ctypes.byref(idle), ctypes.byref(kernel),
+                                                          ctypes.byref(user)):
+                return None
+        except (OSError, AttributeError):
+            return None
+        total = kernel.value + user.value  # kernel 时间包含 idle
+        return total - idle.value, total
+    return None
+
+
+def _read_disk_ticks():
+    """{磁盘名: 累计繁忙毫秒数}"""
+    try:
+        with open("/proc/diskstats") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    ticks = {}
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 13:
+            continue
+        name = fields[2]
+        if name.startswith(_VIRTUAL_DISKS) or not os.path.exists(f"/sys/block/{name}"):
+            continue  # 跳过分区和虚拟设备
+        ticks[name] = int(fields[12])
+    return ticks
+
+
+class _PdhDiskIdle:
+    """Windows 上通过 PDH 读取全部物理磁盘的空闲时间比例"""
+
+    PDH_FMT_DOUBLE = 0x00000200
+
+    def __init__(self):
+        import ctypes
+
+        class PDH_FMT_COUNTERVALUE(ctypes.Structure):
+            _fields_ = [("CStatus", ctypes.c_ulong), ("doubleValue", ctypes.c_double)]
+
+        self._ctypes = ctypes
+        self._value_type = PDH_FMT_COUNTERVALUE
+        self._pdh = ctypes.windll.pdh
+        self._query = ctypes.c_void_p()
+        self._counter = ctypes.c_void_p()
+        if self._pdh.PdhOpenQueryW(None, 0, ctypes.byref(self._query)) != 0:
+            raise OSError("PdhOpenQuery failed")
+        if self._pdh.PdhAddEnglishCounterW(self._query, "\\PhysicalDisk(_Total)\\% Idle Time", 0,
+                                           ctypes.byref(self._counter)) != 0:
+            raise OSError("PdhAddEnglishCounter failed")
+        self._pdh.PdhCollectQueryData(self._query)
+
+    def busy(self):
+        ctypes = self._ctypes
+        if self._pdh.PdhCollectQueryData(self._query) != 0:
+            return None
+        value = self._value_type()
+        if self._pdh.PdhGetFormattedCounterValue(self._counter, self.PDH_FMT_DOUBLE, None,
+                                                 ctypes.byref(value)) != 0:
+            return None
+        return max(0.0, min(100.0, 100.0 - value.doubleValue))
+
+
+class LoadMonitor:
+    """保存上一次的累计值，每次 sample() 返回与上次之间的使用率"""
+
+    def __init__(self):
+        self._cpu = _read_cpu_times()
+        self._disk = _read_disk_ticks() if _LINUX else None
+        self._at = time.monotonic()
+        self._pdh = None
+        if os.name == 'nt':
+            try:
+                self._pdh = _PdhDiskIdle()
+            except (OSError, AttributeError):
+                self._pdh = None
+
+    def sample(self):
+        now = time.monotonic()
+        elapsed_ms = (now - self._at) * 1000
+        self._at = now
+        result = LoadSample()
+
+        cpu = _read_cpu_times()
+        if cpu is not None and self._cpu is not None and cpu[1] > self._cpu[1]:
+            result.cpu = 100.0 * (cpu[0] - self._cpu[0]) / (cpu[1] - self._cpu[1])
+        self._cpu = cpu
+
+        if self._pdh is not None:
+            result.disk_busy = self._pdh.busy()
+        elif _LINUX:
+            disk = _read_disk_ticks()
+            if disk and self._disk and elapsed_ms > 0:
+                busy = [disk[name] - self._disk[name] for name in disk if name in self._disk]
+                if busy:
+                    result.disk_busy = min(100.0, 100.0 * max(busy) / elapsed_ms)
+            self._disk = disk
+
+        if hasattr(os, "getloadavg"):
+            try:
+                result.load = os.getloadavg()[0] / (os.cpu_count() or 1)
+            except OSError:
+                pass
+        return result
@@ -0,0 +1,82 @@
+import json
+import os
+
+from browsers import browser_cache_dirs, chromium_cache_dirs, chromium_profiles, firefox_cache_dirs
+from rules import RuleSet
+
+
+def _mkdir(*parts):
+    path = os.path.join(*parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _local_state(user_data_dir, names):
+    with open(os.path.join(user_data_dir, "Local State"), "w", encoding="utf-8") as f:
+        json.dump({"profile": {"info_cache": {name: {} for name in names}}}, f)
+
+
+def test_chromium_profiles_from_local_state(tmp_path):
+    user_data = str(tmp_path / "google-chrome")
+    for name in ("Default", "Profile 2", "Work"):
+        _mkdir(user_data, name)
+    _local_state(user_data, ["Default", "Work", "../evil", "Missing"])
+    assert sorted(chromium_profiles(user_data)) == ["Default", "Work"]
+
+
+def test_chromium_profiles_without_local_state(tmp_path):
+    user_data = str(tmp_path / "chromium")
+    for name in ("Default", "Profile 1", "Other"):
+        _mkdir(user_data, name)
+    assert chromium_profiles(user_data) == ["Default", "Profile 1"]
+
+
+def test_chromium_cache_dirs_only_returns_caches(tmp_path):
+    user_data = str(tmp_path / "config" / "google-chrome")
+    cache_base = str(tmp_path / "cache" / "google-chrome")
+    _mkdir(user_data, "Default", "Code Cache", "js")
+    _mkdir(user_data, "Default", "Bookmarks")
+    _mkdir(user_data, "Work", "GPUCache")
+    _mkdir(cache_base, "Default", "Cache", "Cache_Data")
+    _mkdir(user_data, "Work", "Cache")  # 旧版 Chrome：没有 Cache_Data 时取 Cache 本身
+    _local_state(user_data, ["Default", "Work"])
+    dirs = chromium_cache_dirs(user_data, cache_base)
+    assert sorted(os.path.relpath(d, str(tmp_path)) for d in dirs) == sorted([
+        os.path.join("config", "google-chrome", "Default", "Code Cache"),
+        os.path.join("cache", "google-chrome", "Default", "Cache", "Cache_Data"),
+        os.path.join("config", "google-chrome", "Work", "Cache"),
+        os.path.join("config", "google-chrome", "Work", "GPUCache"),
+    ])
+
+
+def test_firefox_cache_dirs_from_profiles_ini(tmp_path):
+    config = _mkdir(str(tmp_path), "mozilla", "firefox")
+    local = str(tmp_path / "cache" / "mozilla" / "firefox")
+    absolute = str(tmp_path / "custom")
+    with open(os.path.join(config, "profiles.ini"), "w", encoding="utf-8") as f:
+        f.write("[General]\nStartWithLastProfile=1\n"
+                "[Profile0]\nName=a\nIsRelative=1\nPath=Profiles/abc.default-release\n"
+                f"[Profile1]\nName=b\nIsRelative=0\nPath={absolute}\n"
+                "[Profile2]\nName=c\nIsRelative=1\nPath=../../etc\n"
+                "[Install123]\nDefault=Profiles/abc.default-release\n")
+    _mkdir(local, "Profiles", "abc.default-release", "cache2", "entries")
+    _mkdir(config, "Profiles", "abc.default-release", "storage")
+    _mkdir(absolute, "cache2")
+    assert firefox_cache_dirs(config, local) == [
+        os.path.join(local, "Profiles", "abc.default-release", "cache2"),
+        os.path.join(absolute, "cache2"),
+    ]
+
+
+def test_firefox_without_profiles_ini(tmp_path):
+    assert firefox_cache_dirs(str(tmp_path), str(tmp_path)) == []
+
+
+def test_discovered_caches_get_browser_depth(tmp_path):
+    user_data = str(tmp_path / "BraveSoftware" / "Brave-Browser")
+    _mkdir(user_data, "Default", "Cache", "Cache_Data")
+    _mkdir(user_data, "Default", "GPUCache")
+    dirs = browser_cache_dirs(chromium=[(user_data, None)], firefox=[])
+    rules = RuleSet.default()
+    assert len(dirs) == 2
+    assert all(rules.for_root(d).max_depth == 3 for d in dirs)
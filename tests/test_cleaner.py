@@ -0,0 +1,100 @@
+import os
+import time
+
+import cleaner
+from cleaner import clean_files, resume_clean, safe_remove
+from journal import CleanJournal
+from rules import RuleSet
+from scanner import JunkScanner
+
+OLD = time.time() - 30 * 86400
+
+
+def _write(path, data=b"x", mtime=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def _tree(root):
+    """根目录下一棵完整的子树：cache/a、cache/sub/b"""
+    _write(os.path.join(root, "cache", "a.tmp"), b"aa", OLD)
+    _write(os.path.join(root, "cache", "sub", "b.tmp"), b"bbb", OLD)
+
+
+def _remaining(root):
+    return sorted(os.path.relpath(os.path.join(d, name), root)
+                  for d, _, names in os.walk(root) for name in names)
+
+
+def test_complete_subtree_is_removed(tmp_path):
+    root = str(tmp_path)
+    _tree(root)
+    rules = RuleSet.from_data([{"root": "*", "max_depth": 3}])
+    result = JunkScanner([root], rules=rules).scan()
+    assert result.complete_subtrees()
+    stats = clean_files(result, workers=1, rules=rules)
+    assert stats.cleaned_count == 2
+    assert stats.cleaned_size == 5
+    assert not os.path.exists(os.path.join(root, "cache"))
+
+
+def test_files_created_after_scan_are_kept(tmp_path):
+    root = str(tmp_path)
+    _tree(root)
+    rules = RuleSet.from_data([{"root": "*", "max_depth": 3}])
+    result = JunkScanner([root], rules=rules).scan()
+    _write(os.path.join(root, "cache", "new.tmp"))
+    _write(os.path.join(root, "cache", "sub", "newdir", "c.tmp"))
+    stats = clean_files(result, workers=1, rules=rules)
+    assert stats.cleaned_count == 2
+    assert _remaining(root) == [os.path.join("cache", "new.tmp"),
+                                os.path.join("cache", "sub", "newdir", "c.tmp")]
+
+
+def test_spilled_result_rechecks_rules(tmp_path):
+    """溢出的结果没有按目录的文件表，扫描后新出现的文件按规则（年龄、深度）重新判断"""
+    root = str(tmp_path)
+    _tree(root)
+    rules = RuleSet.from_data([{"root": "*", "max_depth": 2, "min_age_days": 7}])
+    result = JunkScanner([root], rules=rules, memory_budget=1).scan()
+    assert result.files.spilled
+    _write(os.path.join(root, "cache", "fresh.tmp"))
+    _write(os.path.join(root, "cache", "old.tmp"), b"o", OLD)
+    _write(os.path.join(root, "cache", "sub", "deep", "d.tmp"), b"d", OLD)
+    stats = clean_files(result, workers=1, rules=rules)
+    assert stats.cleaned_count == 3
+    assert _remaining(root) == [os.path.join("cache", "fresh.tmp"),
+                                os.path.join("cache", "sub", "deep", "d.tmp")]
+
+
+def test_resume_rechecks_rules(tmp_path):
+    root = str(tmp_path / "root")
+    _tree(root)
+    rules = RuleSet.from_data([{"root": "*", "max_depth": 3, "exclude": ["*.keep"]}])
+    result = JunkScanner([root], rules=rules).scan()
+    journal = CleanJournal.create(str(tmp_path / "journal"))
+    journal.write_plan(result.roots, result.complete_subtrees(), result.loose_files())
+    _write(os.path.join(root, "cache", "c.keep"), b"k", OLD)
+    stats = resume_clean(journal, workers=1, rules=rules)
+    journal.finish()
+    assert stats.cleaned_count == 2
+    assert _remaining(root) == [os.path.join("cache", "c.keep")]
+
+
+def test_permission_error_never_chmods_link_target(tmp_path, monkeypatch):
+    """POSIX 上删除失败时不 chmod：/tmp 中的符号链接可能指向任意文件"""
+    target = tmp_path / "target"
+    target.write_bytes(b"x")
+    target.chmod(0o400)
+    link = tmp_path / "link"
+    link.symlink_to(target)
+
+    def unlink(name, dir_fd=None):
+        raise PermissionError(name)
+
+    monkeypatch.setattr(cleaner.os, "unlink", unlink)
+    assert safe_remove(str(link)) is False
+    assert target.stat().st_mode & 0o777 == 0o400
@@ -0,0 +1,63 @@
+import json
+import os
+import sys
+
+import pytest
+
+import cli
+
+
+@pytest.fixture
+def junk(tmp_path, monkeypatch):
+    # 数据目录（日志、索引、清理日志）放在临时目录中
+    monkeypatch.setenv("CDRIVE_CLEANER_HOME", str(tmp_path / "home"))
+    root = tmp_path / "junk"
+    (root / "sub" / "deeper").mkdir(parents=True)
+    (root / "a.tmp").write_bytes(b"a" * 10)
+    (root / "b.log").write_bytes(b"b" * 20)
+    (root / "sub" / "c.tmp").write_bytes(b"c" * 40)
+    (root / "sub" / "deeper" / "d.tmp").write_bytes(b"d" * 80)  # 默认规则只进入一层子目录
+    return root
+
+
+def _run(tmp_path, *args):
+    report_path = tmp_path / "report.json"
+    code = cli.main(["--headless", *args, "-q", "--report", str(report_path)])
+    with open(report_path, encoding="utf-8") as f:
+        return code, json.load(f)
+
+
+def test_dry_run_with_custom_roots(tmp_path, junk):
+    code, report = _run(tmp_path, "clean", "--dry-run", "--roots", str(junk))
+    assert code == 0
+    assert report["command"] == "clean"
+    assert report["dry_run"] is True
+    assert report["scan"]["files"] == 3
+    assert report["scan"]["bytes"] == 70
+    assert report["clean"] is None
+    assert [root["path"] for root in report["roots"]] == [str(junk)]
+    assert sorted(os.listdir(junk)) == ["a.tmp", "b.log", "sub"]
+
+
+def test_clean_with_custom_roots(tmp_path, junk):
+    code, report = _run(tmp_path, "clean", "--roots", str(junk), "--no-index")
+    assert code == 0
+    assert report["clean"]["cleaned_files"] == 3
+    assert report["clean"]["cleaned_bytes"] == 70
+    assert report["clean"]["failed_files"] == 0
+    # 根目录本身和超出扫描深度的文件保留
+    assert os.listdir(junk) == ["sub"]
+    assert os.listdir(junk / "sub") == ["deeper"]
+    assert os.listdir(junk / "sub" / "deeper") == ["d.tmp"]
+
+
+def test_headless_does_not_import_tk(tmp_path, junk):
+    _run(tmp_path, "scan", "--roots", str(junk))
+    assert "tkinter" not in sys.modules
+
+
+def test_help(capsys):
+    with pytest.raises(SystemExit) as exc:
+        cli.main(["--headless", "--help"])
+    assert exc.value.code == 0
+    assert "95% 置信区间" in capsys.readouterr().out
@@ -0,0 +1,68 @@
+import os
+
+import duplicates
+from duplicates import PARTIAL_SIZE, find_duplicates
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path), len(data)
+
+
+def test_finds_identical_files(tmp_path):
+    files = [
+        _write(tmp_path / "a.txt", b"same"),
+        _write(tmp_path / "a (1).txt", b"same"),
+        _write(tmp_path / "b.txt", b"diff"),
+    ]
+    report = find_duplicates(files, use_processes=False)
+    assert len(report.groups) == 1
+    group = report.groups[0]
+    assert group.keep == str(tmp_path / "a.txt")
+    assert group.removable == [str(tmp_path / "a (1).txt")]
+    assert group.digest is not None
+
+
+def test_large_files_compare_full_content(tmp_path):
+    head = b"h" * PARTIAL_SIZE
+    tail = b"t" * PARTIAL_SIZE
+    files = [
+        _write(tmp_path / "x.bin", head + b"1" + tail),
+        _write(tmp_path / "y.bin", head + b"2" + tail),
+    ]
+    report = find_duplicates(files, use_processes=False)
+    assert report.groups == []
+    assert report.full_hashed_files == 2
+
+
+def test_unreadable_files_are_never_grouped(tmp_path, monkeypatch):
+    """读取失败的同样大小的文件不能因为都「没有哈希」而被当成重复"""
+    files = [
+        _write(tmp_path / "a.txt", b"aaaa"),
+        _write(tmp_path / "b.txt", b"bbbb"),
+        _write(tmp_path / "c.txt", b"cccc"),
+    ]
+    unreadable = {str(tmp_path / "a.txt"), str(tmp_path / "b.txt")}
+    real_partial_hash = duplicates.partial_hash
+
+    def partial_hash(path, size):
+        if path in unreadable:
+            raise PermissionError(path)
+        return real_partial_hash(path, size)
+
+    monkeypatch.setattr(duplicates, "partial_hash", partial_hash)
+    report = find_duplicates(files, use_processes=False)
+    assert report.groups == []
+    assert report.removable_files() == []
+
+
+def test_unreadable_large_file_is_not_confirmed(tmp_path, monkeypatch):
+    data = os.urandom(3 * PARTIAL_SIZE)
+    files = [
+        _write(tmp_path / "a.bin", data),
+        _write(tmp_path / "b.bin", data),
+    ]
+    monkeypatch.setattr(duplicates, "full_hash", lambda path: None)
+    report = find_duplicates(files, use_processes=False)
+    assert report.groups == []
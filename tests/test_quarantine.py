@@ -0,0 +1,63 @@
+import os
+import time
+
+from cleaner import clean_files
+from estimator import estimate_roots
+from quarantine import VOLUME_DIRNAME, Quarantine
+from rules import RuleSet
+from scanner import JunkScanner
+
+OLD = time.time() - 30 * 86400
+
+
+def _write(path, mtime=OLD):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x")
+    os.utime(path, (mtime, mtime))
+
+
+def test_volume_quarantine_inside_junk_root_is_skipped(tmp_path):
+    """卷的挂载点就是垃圾根目录（单独挂载的 /tmp）时，其中的隔离区不被扫描、删除"""
+    root = str(tmp_path)
+    staged = os.path.join(root, VOLUME_DIRNAME, "20250101-000000-0", "0", "a.tmp")
+    _write(staged)
+    _write(os.path.join(root, "junk.tmp"))
+    rules = RuleSet.from_data([{"root": "*", "max_depth": 4, "min_age_days": 2}])
+
+    result = JunkScanner([root], rules=rules).scan()
+    assert result.file_count == 1
+    total, _ = estimate_roots([root], rules=rules)
+    assert total.files == 1
+
+    clean_files(result, workers=1, rules=rules)
+    assert os.path.exists(staged)
+    assert not os.path.exists(os.path.join(root, "junk.tmp"))
+
+
+def test_spilled_clean_skips_volume_quarantine(tmp_path):
+    root = str(tmp_path)
+    staged = os.path.join(root, VOLUME_DIRNAME, "batch", "0", "a.tmp")
+    _write(os.path.join(root, "junk.tmp"))
+    rules = RuleSet.from_data([{"root": "*", "max_depth": 4}])
+    result = JunkScanner([root], rules=rules, memory_budget=1).scan()
+    # 扫描之后才移入隔离区：溢出的结果按规则重新判断时同样跳过
+    _write(staged)
+    clean_files(result, workers=1, rules=rules)
+    assert os.path.exists(staged)
+
+
+def test_stage_keeps_entries_created_after_scan(tmp_path):
+    root = str(tmp_path / "root")
+    _write(os.path.join(root, "junk.tmp"))
+    _write(os.path.join(root, "cache", "a.tmp"))
+    rules = RuleSet.from_data([{"root": "*", "max_depth": 4}])
+    result = JunkScanner([root], rules=rules).scan()
+    assert (root, True) in result.complete_subtrees()
+    _write(os.path.join(root, "new_download.docx"))
+    _write(os.path.join(root, "new_dir", "b.tmp"))
+
+    stats, batch = Quarantine(path=str(tmp_path / "quarantine")).stage(result, rules=rules)
+    assert stats.cleaned_count == 2
+    assert sorted(os.listdir(root)) == ["new_dir", "new_download.docx"]
+    assert sorted(os.path.basename(item["from"]) for item in batch.items) == ["cache", "junk.tmp"]
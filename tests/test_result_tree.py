@@ -0,0 +1,30 @@
+from result_tree import FILE, ResultTree
+from roots import is_recycle_bin
+from scanner import ScanResult
+
+
+def _result():
+    result = ScanResult(["/bin1", "/tmp1"])
+    d = result.add_dir("/bin1")
+    result.add_file(d, "a", 10)
+    result.add_file(d, "b", 20)
+    d = result.add_dir("/tmp1")
+    result.add_file(d, "c", 30)
+    return result
+
+
+def test_root_checked_follows_unchecked_files():
+    tree = ResultTree(_result())
+    assert tree.root_checked("/bin1")
+    tree.toggle_check(FILE, 0)
+    assert not tree.root_checked("/bin1")
+    assert tree.root_checked("/tmp1")
+    assert tree.root_checked("/empty")
+    tree.set_all(True)
+    assert tree.root_checked("/bin1")
+
+
+def test_is_recycle_bin():
+    assert is_recycle_bin("D:\\$Recycle.Bin")
+    assert is_recycle_bin("C:\\$RECYCLE.BIN\\")
+    assert not is_recycle_bin("C:\\Windows\\Temp")
@@ -0,0 +1,145 @@
+import os
+import threading
+
+import pytest
+
+from rules import RuleSet
+from scan_index import ScanIndex
+from scanner import JunkScanner
+
+
+def _walk_reference(root, max_depth):
+    """此前界面中的 os.walk 扫描：深度达到 max_depth 的目录不再深入"""
+    found = set()
+    for dirpath, dirnames, filenames in os.walk(root):
+        if dirpath[len(root):].count(os.sep) >= max_depth:
+            dirnames.clear()
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            found.add((path, os.path.getsize(path)))
+    return found
+
+
+def _make_tree(root, levels=5, fanout=2):
+    """每层 fanout 个子目录，每个目录中两个大小不同的文件"""
+    def fill(path, level):
+        os.makedirs(path, exist_ok=True)
+        for i in range(2):
+            with open(os.path.join(path, f"f{level}_{i}.tmp"), "wb") as f:
+                f.write(b"x" * (level * 10 + i + 1))
+        if level < levels:
+            for i in range(fanout):
+                fill(os.path.join(path, f"d{i}"), level + 1)
+    fill(root, 0)
+    # 刚修改过的目录不写入索引（防止同一时间片内的修改被漏掉），把 mtime 调早
+    old = os.stat(root).st_mtime - 3600
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, (old, old))
+
+
+@pytest.fixture
+def roots(tmp_path):
+    """内置规则下扫描深度分别为 3（浏览器）、2（回收站）和 1（其他）的根目录"""
+    paths = {
+        str(tmp_path / "Google" / "Chrome" / "Cache"): 3,
+        str(tmp_path / "Recycle.Bin"): 2,
+        str(tmp_path / "Temp"): 1,
+    }
+    for path in paths:
+        _make_tree(path)
+    return paths
+
+
+def _found(result):
+    return {(path, size) for _, path, size in result.files.items()}
+
+
+def _expected(roots):
+    found = set()
+    for root, depth in roots.items():
+        found |= _walk_reference(root, depth)
+    return found
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_scan_matches_walk_depth(roots, workers):
+    result = JunkScanner(list(roots), workers=workers, rules=RuleSet.default()).scan()
+    expected = _expected(roots)
+    assert _found(result) == expected
+    assert result.file_count == len(expected)
+    assert result.total_size == sum(size for _, size in expected)
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_index_scan_matches_walk_depth(roots, tmp_path, workers):
+    index = ScanIndex(str(tmp_path / "index.db"))
+    try:
+        cold = JunkScanner(list(roots), workers=workers, index=index, rules=RuleSet.default()).scan()
+        warm = JunkScanner(list(roots), workers=workers, index=index, rules=RuleSet.default()).scan()
+    finally:
+        index.close()
+    expected = _expected(roots)
+    assert _found(cold) == expected
+    assert _found(warm) == expected
+    assert warm.cached_dir_count == warm.dir_count > 0
+
+
+def test_index_sees_changed_directory(roots, tmp_path):
+    index = ScanIndex(str(tmp_path / "index.db"))
+    try:
+        JunkScanner(list(roots), index=index, rules=RuleSet.default()).scan()
+        temp = next(root for root, depth in roots.items() if depth == 1)
+        with open(os.path.join(temp, "new.tmp"), "wb") as f:
+            f.write(b"new")
+        result = JunkScanner(list(roots), index=index, rules=RuleSet.default()).scan()
+    finally:
+        index.close()
+    assert (os.path.join(temp, "new.tmp"), 3) in _found(result)
+    assert result.cached_dir_count == result.dir_count - 1
+    assert _found(result) == _expected(roots)
+
+
+def test_overlapping_scans_keep_each_others_index_rows(tmp_path):
+    """界面扫描进行中又开始一轮查重扫描：两轮的待写入和已见目录互不影响"""
+    index = ScanIndex(str(tmp_path / "index.db"))
+    try:
+        first = index.begin()
+        index.record(first, "/a", 1, ["f"], [1], [0.0], [])
+        second = index.begin()
+        index.record(second, "/b", 1, ["g"], [2], [0.0], [])
+        index.commit(second, ["/b"])
+        index.commit(first, ["/a"])
+        check = index.begin()
+        assert index.lookup(check, "/a", 1) is not None
+        assert index.lookup(check, "/b", 1) is not None
+    finally:
+        index.close()
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_callback_error_is_raised(roots, workers):
+    def on_file(path, size):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        JunkScanner(list(roots), workers=workers, on_file=on_file).scan()
+
+
+def test_blocked_progress_callback_does_not_stall_other_workers(roots):
+    """一个线程在 on_progress 中阻塞（守护模式暂停）时，其他线程照常扫描并回调"""
+    released = threading.Event()
+    lock = threading.Lock()
+    state = {}
+
+    def on_progress(result):
+        me = threading.get_ident()
+        with lock:
+            blocker = state.setdefault("blocker", me)
+        if blocker == me:
+            if "released" not in state:
+                state["released"] = released.wait(5)
+        else:
+            released.set()
+
+    JunkScanner(list(roots), workers=4, on_progress=on_progress, progress_interval=1).scan()
+    assert state["released"]
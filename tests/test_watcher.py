@@ -0,0 +1,67 @@
+import os
+import queue
+
+from rules import RuleSet
+from watcher import JunkWatcher, WatchBackend
+
+
+class FakeBackend(WatchBackend):
+    """按目录添加监视；failing 中的目录添加失败（模拟超出 inotify 监视数上限）"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.watched = set()
+        self.queue = queue.Queue()
+
+    def add(self, path):
+        if path in self.failing:
+            raise OSError(28, "No space left on device")
+        self.watched.add(path)
+
+    def events(self, timeout):
+        try:
+            return [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+
+
+def _write(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x")
+
+
+def _watch(root, backend):
+    watcher = JunkWatcher([root], rules=RuleSet.from_data([{"root": "*", "max_depth": 3}]), backend=backend)
+    watcher.start()
+    assert watcher.ready.wait(10)
+    return watcher
+
+
+def test_unwatched_directory_is_not_a_complete_subtree(tmp_path):
+    root = str(tmp_path)
+    sub = os.path.join(root, "cache")
+    _write(os.path.join(sub, "a.tmp"))
+    _write(os.path.join(root, "other", "b.tmp"))
+    watcher = _watch(root, FakeBackend(failing=[sub]))
+    try:
+        assert watcher.unwatched == 1
+        result = watcher.snapshot()
+    finally:
+        watcher.stop()
+    subtrees = dict(result.complete_subtrees())
+    assert sub not in subtrees
+    assert os.path.join(root, "other") in subtrees
+    assert sorted(path for path, _ in result.loose_files()) == [os.path.join(sub, "a.tmp")]
+
+
+def test_watched_tree_is_complete(tmp_path):
+    root = str(tmp_path)
+    _write(os.path.join(root, "cache", "a.tmp"))
+    watcher = _watch(root, FakeBackend())
+    try:
+        assert watcher.totals() == (1, 1)
+        result = watcher.snapshot()
+    finally:
+        watcher.stop()
+    assert dict(result.complete_subtrees()) == {root: True}
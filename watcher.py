@@ -0,0 +1,516 @@
+"""实时统计：一次基线扫描之后，按文件系统变更通知增减各根目录的垃圾总量
+
+后端可替换：Linux 用 inotify（每个目录一个监视），Windows 用
+ReadDirectoryChangesW（每个根目录一个递归监视），都通过 ctypes 调用，
+其他系统没有可用后端时 get_backend() 返回 None，不提供实时统计。
+
+监视范围与扫描一致：只跟踪规则允许进入的目录，只计入规则接受的文件。
+事件只带路径，变化的条目用一次 lstat 确认，新出现的目录按规则枚举；
+通知队列溢出时重新枚举整个根目录。snapshot() 把当前状态转成
+ScanResult，清理可以直接使用，不必重新扫描。
+
+根目录本身是文件（如 Memory.dmp）时只在基线和重新枚举时统计；带年龄
+条件的规则按启动时的时间判断，文件变旧后要等重新枚举才会计入。
+"""
+import os
+import queue
+import stat
+import struct
+import sys
+import threading
+import time
+
+from roots import normalize_roots
+from rules import RESERVED_DIRNAME, RuleSet
+from scanner import ScanResult, is_link_dir, should_skip_root
+
+# 事件类型
+CHANGED = "changed"  # 新建、修改、移入
+REMOVED = "removed"  # 删除、移出
+OVERFLOW = "overflow"  # 通知丢失，需要重新枚举（路径为根目录，None 为全部）
+
+# 等待事件的超时（秒），也是 stop() 的最长响应时间
+EVENT_TIMEOUT = 0.5
+
+# 收到事件后再等这么久，把一批事件合并处理，减少回调次数
+COALESCE_SECONDS = 0.2
+
+
+class WatchBackend:
+    """变更通知后端
+
+    recursive 为 True 时 add(根目录) 即覆盖整棵子树，否则需要对每个目录
+    调用 add。events(timeout) 返回 [(事件类型, 路径)]，超时返回空列表。
+    本类本身是不产生任何通知的后端：只有基线枚举，之后的统计不再变化。
+    """
+
+    recursive = False
+
+    def add(self, path):
+        pass
+
+    def remove(self, path):
+        pass
+
+    def events(self, timeout):
+        time.sleep(timeout)
+        return []
+
+    def close(self):
+        pass
+
+
+class InotifyBackend(WatchBackend):
+    """Linux inotify：每个目录一个监视描述符，子目录需要逐个添加
+
+    监视数量受 /proc/sys/fs/inotify/max_user_watches 限制，超出时 add 抛出 OSError。
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_DONT_FOLLOW = 0x02000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+            | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+    CHANGE_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    REMOVE_MASK = IN_MOVED_FROM | IN_DELETE
+
+    _HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+    def __init__(self):
+        import ctypes
+        self._ctypes = ctypes
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._paths = {}  # wd -> 目录
+        self._wds = {}  # 目录 -> wd
+
+    def add(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            errno = self._ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        self._paths[wd] = path
+        self._wds[path] = wd
+
+    def remove(self, path):
+        wd = self._wds.pop(path, None)
+        if wd is not None:
+            self._paths.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def events(self, timeout):
+        import select
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            buf = os.read(self._fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        header = self._HEADER
+        while offset + header.size <= len(buf):
+            wd, mask, _, length = header.unpack_from(buf, offset)
+            offset += header.size
+            name = os.fsdecode(buf[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                events.append((OVERFLOW, None))
+                continue
+            dirpath = self._paths.get(wd)
+            if dirpath is None:
+                continue
+            if mask & self.IN_IGNORED:
+                # 目录已删除或监视被移除，内核已释放描述符
+                self._paths.pop(wd, None)
+                if self._wds.get(dirpath) == wd:
+                    del self._wds[dirpath]
+                continue
+            if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                events.append((REMOVED, dirpath))
+            elif name:
+                path = os.path.join(dirpath, name)
+                if mask & self.REMOVE_MASK:
+                    events.append((REMOVED, path))
+                elif mask & self.CHANGE_MASK:
+                    events.append((CHANGED, path))
+        return events
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class WindowsBackend(WatchBackend):
+    """Windows ReadDirectoryChangesW：每个根目录一个递归监视，各由一个线程阻塞读取"""
+
+    recursive = True
+
+    FILE_LIST_DIRECTORY = 0x0001
+    FILE_SHARE_ALL = 0x00000007  # READ | WRITE | DELETE
+    OPEN_EXISTING = 3
+    FILE_FLAG_BACKUP_SEMANTICS = 0x02000000
+    NOTIFY_FILTER = 0x00000001 | 0x00000002 | 0x00000008 | 0x00000010  # 文件名、目录名、大小、写入时间
+    BUFFER_SIZE = 64 * 1024  # 网络共享上的上限
+
+    # FILE_NOTIFY_INFORMATION.Action
+    _ACTIONS = {1: CHANGED, 2: REMOVED, 3: CHANGED, 4: REMOVED, 5: CHANGED}
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        kernel32 = self._kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        # 句柄在 64 位系统上超出 int 范围，必须声明参数类型
+        kernel32.CreateFileW.restype = wintypes.HANDLE
+        kernel32.CreateFileW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD, wintypes.LPVOID,
+                                         wintypes.DWORD, wintypes.DWORD, wintypes.HANDLE]
+        kernel32.ReadDirectoryChangesW.argtypes = [wintypes.HANDLE, wintypes.LPVOID, wintypes.DWORD, wintypes.BOOL,
+                                                   wintypes.DWORD, ctypes.POINTER(wintypes.DWORD),
+                                                   wintypes.LPVOID, wintypes.LPVOID]
+        kernel32.CancelIoEx.argtypes = [wintypes.HANDLE, wintypes.LPVOID]
+        kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+        self._wintypes = wintypes
+        self._invalid = wintypes.HANDLE(-1).value
+        self._queue = queue.Queue()
+        self._handles = {}  # 根目录 -> 句柄
+
+    def add(self, path):
+        if path in self._handles:
+            return
+        handle = self._kernel32.CreateFileW(path, self.FILE_LIST_DIRECTORY, self.FILE_SHARE_ALL, None,
+                                            self.OPEN_EXISTING, self.FILE_FLAG_BACKUP_SEMANTICS, None)
+        if handle is None or handle == self._invalid:
+            raise self._ctypes.WinError(self._ctypes.get_last_error())
+        self._handles[path] = handle
+        threading.Thread(target=self._read_loop, args=(path, handle), daemon=True).start()
+
+    def _read_loop(self, root, handle):
+        ctypes = self._ctypes
+        buf = ctypes.create_string_buffer(self.BUFFER_SIZE)
+        returned = self._wintypes.DWORD()
+        while self._handles.get(root) == handle:
+            ok = self._kernel32.ReadDirectoryChangesW(handle, buf, self.BUFFER_SIZE, True, self.NOTIFY_FILTER,
+                                                      ctypes.byref(returned), None, None)
+            if not ok:
+                if self._handles.get(root) == handle:
+                    # 根目录被删除等，之后不再有通知
+                    self._queue.put((REMOVED, root))
+                return
+            if returned.value == 0:
+                # 缓冲区放不下，这段时间的变化都丢失了
+                self._queue.put((OVERFLOW, root))
+                continue
+            raw = buf.raw[:returned.value]
+            offset = 0
+            while True:
+                next_offset, action, length = struct.unpack_from("III", raw, offset)
+                name = raw[offset + 12:offset + 12 + length].decode("utf-16-le")
+                kind = self._ACTIONS.get(action)
+                if kind is not None:
+                    self._queue.put((kind, os.path.join(root, name)))
+                if not next_offset:
+                    break
+                offset += next_offset
+
+    def remove(self, path):
+        handle = self._handles.pop(path, None)
+        if handle is not None:
+            self._kernel32.CancelIoEx(handle, None)
+            self._kernel32.CloseHandle(handle)
+
+    def events(self, timeout):
+        try:
+            events = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        for path in list(self._handles):
+            self.remove(path)
+
+
+def get_backend():
+    """当前系统可用的后端，没有时返回 None"""
+    try:
+        if sys.platform.startswith("linux"):
+            return InotifyBackend()
+        if os.name == 'nt':
+            return WindowsBackend()
+    except (OSError, AttributeError):
+        pass
+    return None
+
+
+class JunkWatcher:
+    """在后台线程中维护各根目录的文件数和总大小
+
+    start() 后先做一次基线枚举，之后按变更通知更新；每处理完一批变化
+    回调 on_change(files, size)（在监视线程中）。ready 在基线完成后置位。
+    """
+
+    def __init__(self, roots, rules=None, on_change=None, backend=None):
+        self.roots = [root for root in normalize_roots(roots) if not should_skip_root(root)]
+        self.rules = rules if rules is not None else RuleSet.default()
+        self.on_change = on_change
+        self.backend = backend
+        self.ready = threading.Event()
+        self.unwatched = 0  # 无法添加监视（超出系统上限等）的目录数，其中的变化不会反映到统计中
+        self.events_handled = 0
+        self._lock = threading.Lock()
+        self._root_rules = {}
+        self._dirs = {}  # 目录 -> (根目录, 深度, {文件名: (大小, mtime)})
+        self._partial = set()  # 有未计入条目的目录，快照中不能整棵删除
+        self._file_roots = {}  # 根目录本身是文件时：根目录 -> (大小, mtime)，不被规则接受时为 None
+        self._totals = {}  # 根目录 -> [文件数, 字节数]
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.backend is None:
+            self.backend = get_backend()
+            if self.backend is None:
+                raise OSError("当前系统不支持文件变更通知")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.backend is not None:
+            self.backend.close()
+
+    def totals(self):
+        """(文件数, 字节数) 合计"""
+        with self._lock:
+            return (sum(t[0] for t in self._totals.values()),
+                    sum(t[1] for t in self._totals.values()))
+
+    def root_totals(self):
+        """{根目录: (文件数, 字节数)}"""
+        with self._lock:
+            return {root: tuple(t) for root, t in self._totals.items()}
+
+    def snapshot(self, memory_budget=None):
+        """当前状态的 ScanResult，可直接交给 clean_files / Quarantine.stage"""
+        result = ScanResult(self.roots, memory_budget=memory_budget)
+        with self._lock:
+            for dirpath, (_, _, files) in self._dirs.items():
+                dir_id = result.add_dir(dirpath)
+                for name, (size, mtime) in files.items():
+                    result.add_file(dir_id, name, size, mtime)
+                    result.insights.add(dirpath, name, size, mtime)
+            for root, found in self._file_roots.items():
+                dirpath, name = os.path.split(root)
+                result.partial_dirs.add(dirpath)
+                if found is not None:
+                    size, mtime = found
+                    result.add_file(result.add_dir(dirpath), name, size, mtime)
+                    result.insights.add(dirpath, name, size, mtime)
+            result.partial_dirs |= self._partial
+            result.dir_count = len(self._dirs)
+        result.finished_at = time.time()
+        return result
+
+    def _run(self):
+        now = time.time()
+        for root in self.roots:
+            self._root_rules[root] = self.rules.for_root(root, now)
+            self._rescan_root(root)
+        self.ready.set()
+        self._notify()
+        backend = self.backend
+        while not self._stop.is_set():
+            events = backend.events(EVENT_TIMEOUT)
+            if not events:
+                continue
+            # 短时间内的一串事件（解压、下载）合并处理，同一路径只看最后一次
+            deadline = time.monotonic() + COALESCE_SECONDS
+            while time.monotonic() < deadline and not self._stop.is_set():
+                events.extend(backend.events(max(0.0, deadline - time.monotonic())))
+            latest = {}
+            overflow = set()
+            for kind, path in events:
+                if kind == OVERFLOW:
+                    overflow.add(path)
+                else:
+                    latest.pop(path, None)
+                    latest[path] = kind
+            if None in overflow:
+                overflow = set(self.roots)
+            for root in overflow:
+                self._rescan_root(root)
+            for path, kind in latest.items():
+                if not any(path == root or path.startswith(root.rstrip("\\/") + os.sep) for root in overflow):
+                    self._apply(kind, path)
+            self.events_handled += len(events)
+            self._notify()
+
+    def _notify(self):
+        if self.on_change is not None:
+            self.on_change(*self.totals())
+
+    def _rescan_root(self, root):
+        """丢弃根目录的状态并重新枚举"""
+        with self._lock:
+            self._drop_tree(root)
+            self._file_roots.pop(root, None)
+            self._totals[root] = [0, 0]
+        rule = self._root_rules[root]
+        if os.path.isfile(root):
+            try:
+                st = os.lstat(root)
+            except OSError:
+                return
+            accepted = not rule.filters or rule.accepts_file("", os.path.basename(root), st.st_size, st.st_mtime)
+            with self._lock:
+                self._file_roots[root] = (st.st_size, st.st_mtime) if accepted else None
+                if accepted:
+                    self._totals[root] = [1, st.st_size]
+            return
+        if os.path.isdir(root):
+            self._add_tree(root, root, 0)
+            if self.backend.recursive:
+                self._watch(root)
+
+    def _watch(self, dirpath):
+        try:
+            self.backend.add(dirpath)
+        except OSError:
+            # 监视不到的目录（如超出 inotify 监视数上限）中的变化无从得知，
+            # 快照中不能整棵删除；递归后端监视失败时整棵子树都收不到通知
+            with self._lock:
+                self.unwatched += 1
+                self._partial.add(dirpath)
+                if self.backend.recursive:
+                    prefix = dirpath.rstrip("\\/") + os.sep
+                    self._partial.update(d for d in self._dirs if d.startswith(prefix))
+
+    def _add_tree(self, top, root, top_depth):
+        """按规则枚举 top 开始的子树并登记到状态中"""
+        rule = self._root_rules[root]
+        stack = [(top, top_depth)]
+        while stack:
+            dirpath, depth = stack.pop()
+            with self._lock:
+                if dirpath in self._dirs:
+                    continue  # 已由更早的事件登记
+            if not self.backend.recursive:
+                # 先监视再枚举，枚举期间新建的条目不会漏掉
+                self._watch(dirpath)
+            prefix = rule.rel_prefix(root, dirpath) if rule.filters else None
+            files = {}
+            partial = False
+            try:
+                with os.scandir(dirpath) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir():
+                                if is_link_dir(entry) or entry.name == RESERVED_DIRNAME \
+                                        or (rule.filters and rule.excludes_dir(prefix, entry.name)) \
+                                        or depth >= rule.max_depth:
+                                    partial = True
+                                else:
+                                    stack.append((entry.path, depth + 1))
+                                continue
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            partial = True
+                            continue
+                        if rule.filters and not rule.accepts_file(prefix, entry.name, st.st_size, st.st_mtime):
+                            partial = True
+                            continue
+                        files[entry.name] = (st.st_size, st.st_mtime)
+            except OSError:
+                partial = True
+            with self._lock:
+                self._dirs[dirpath] = (root, depth, files)
+                if partial:
+                    self._partial.add(dirpath)
+                totals = self._totals[root]
+                totals[0] += len(files)
+                totals[1] += sum(size for size, _ in files.values())
+
+    def _drop_tree(self, top):
+        """从状态中移除 top 及其下的全部目录（调用方持有锁）"""
+        prefix = top.rstrip("\\/") + os.sep
+        for dirpath in [d for d in self._dirs if d == top or d.startswith(prefix)]:
+            root, _, files = self._dirs.pop(dirpath)
+            self._partial.discard(dirpath)
+            totals = self._totals.get(root)
+            if totals is not None:
+                totals[0] -= len(files)
+                totals[1] -= sum(size for size, _ in files.values())
+            if not self.backend.recursive:
+                self.backend.remove(dirpath)
+
+    def _apply(self, kind, path):
+        with self._lock:
+            if path in self._dirs:
+                if kind == REMOVED or not os.path.isdir(path) or os.path.islink(path):
+                    self._drop_tree(path)
+                    if path in self._totals:
+                        return  # 根目录本身没了
+                else:
+                    return  # 目录自身的属性变化，其中的条目各有事件
+            parent, name = os.path.split(path)
+            info = self._dirs.get(parent)
+        if info is None:
+            return  # 不在跟踪范围内（超出深度、被排除的目录中）
+        root, depth, files = info
+        rule = self._root_rules[root]
+        st = None
+        if kind == CHANGED:
+            try:
+                st = os.lstat(path)
+            except OSError:
+                st = None
+        if st is not None and (stat.S_ISDIR(st.st_mode) or (stat.S_ISLNK(st.st_mode) and os.path.isdir(path))):
+            prefix = rule.rel_prefix(root, parent) if rule.filters else None
+            if stat.S_ISLNK(st.st_mode) or depth >= rule.max_depth or name == RESERVED_DIRNAME \
+                    or (rule.filters and rule.excludes_dir(prefix, name)):
+                with self._lock:
+                    self._partial.add(parent)
+            else:
+                self._add_tree(path, root, depth + 1)
+            return
+        with self._lock:
+            totals = self._totals[root]
+            old = files.pop(name, None)
+            if old is not None:
+                totals[0] -= 1
+                totals[1] -= old[0]
+            if st is None:
+                return
+            prefix = rule.rel_prefix(root, parent) if rule.filters else None
+            if rule.filters and not rule.accepts_file(prefix, name, st.st_size, st.st_mtime):
+                self._partial.add(parent)
+                return
+            files[name] = (st.st_size, st.st_mtime)
+            totals[0] += 1
+            totals[1] += st.st_size